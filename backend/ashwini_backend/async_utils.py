@@ -0,0 +1,27 @@
+"""
+Helpers for the async views (adrf's @api_view on `async def` functions).
+
+Async views run on the event loop under ASGI (app.py with SERVER_MODE=asgi)
+and through async_to_sync under WSGI, so they work with either server. ORM
+calls go through the a-prefixed queryset/model methods or sync_to_async().
+"""
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
+from django.shortcuts import _get_queryset
+
+try:
+    from django.shortcuts import aget_object_or_404
+except ImportError:  # Django < 5.0
+    async def aget_object_or_404(klass, *args, **kwargs):
+        """Async get_object_or_404()."""
+        queryset = _get_queryset(klass)
+        try:
+            return await queryset.aget(*args, **kwargs)
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+def is_asgi(request):
+    """Whether the request is served by an ASGI server (DRF requests included)."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
@@ -0,0 +1,185 @@
+"""
+Release steps - database migrations and the default superuser - and the boot
+fast path that skips them once they are done.
+
+    python manage.py release     # one-shot: run every step
+
+Each step has a fingerprint:
+
+- migrations: the migration files on disk (every installed app, Django's
+  included) and the database they go to,
+- superuser: the DJANGO_SUPERUSER_* settings (an HMAC, not the password) and
+  the database.
+
+After a release the fingerprints are stored in the database
+(monitoring.ReleaseState), so they survive new containers. At boot,
+gunicorn.conf.py calls release(only_changed=True): one query reads them,
+and a step whose fingerprint is unchanged is skipped. Otherwise it checks
+django_migrations and only runs `migrate` when migrations are pending.
+Before the first release (no table yet) every step is checked. With
+RELEASE_ON_BOOT=False - set where the platform runs `manage.py release` on
+each deploy - the boot only reports pending migrations.
+
+Timings collects how long each step took, for the boot report.
+"""
+
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import pkgutil
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils.crypto import salted_hmac
+
+logger = logging.getLogger(__name__)
+
+
+class Timings:
+    """Named durations, reported as 'total 2.10s: load 1.20s, migrations 0.01s (unchanged), ...'."""
+
+    def __init__(self):
+        self.steps = []
+
+    def add(self, name, seconds, note=''):
+        self.steps.append((name, seconds, note))
+
+    @contextmanager
+    def step(self, name):
+        """Time the block; it may set `.note` on the yielded step."""
+        step = _Step()
+        started = time.monotonic()
+        try:
+            yield step
+        finally:
+            self.add(name, time.monotonic() - started, step.note)
+
+    def __str__(self):
+        total = sum(seconds for _, seconds, _ in self.steps)
+        parts = [f'{name} {seconds:.2f}s' + (f' ({note})' if note else '') for name, seconds, note in self.steps]
+        return f"total {total:.2f}s: {', '.join(parts)}"
+
+
+class _Step:
+    note = ''
+
+
+def disk_migrations():
+    """Sorted (app label, migration name) of every migration file, without importing them."""
+    found = []
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        if module_name is None:
+            continue
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except ModuleNotFoundError:
+            continue
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for module in pkgutil.iter_modules(spec.submodule_search_locations):
+            # The names MigrationLoader skips
+            if not module.ispkg and module.name[0] not in '_~':
+                found.append((app_config.label, module.name))
+    return sorted(found)
+
+
+def _database(using):
+    database = connections[using].settings_dict
+    return f"{database['ENGINE']} {database['HOST']} {database['NAME']}"
+
+
+def migrations_fingerprint(migrations, using=DEFAULT_DB_ALIAS):
+    lines = [_database(using)] + [f'{app}.{name}' for app, name in migrations]
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+def superuser_fingerprint(using=DEFAULT_DB_ALIAS):
+    """None when no DJANGO_SUPERUSER_PASSWORD is set (there is nothing to do)."""
+    password = os.environ.get('DJANGO_SUPERUSER_PASSWORD')
+    if not password:
+        return None
+    username = os.environ.get('DJANGO_SUPERUSER_USERNAME', 'admin')
+    email = os.environ.get('DJANGO_SUPERUSER_EMAIL', 'admin@ashwini.com')
+    value = f'{_database(using)}\0{username}\0{email}\0{password}'
+    return salted_hmac('ashwini_backend.boot.superuser', value).hexdigest()
+
+
+def pending_migrations(migrations, using=DEFAULT_DB_ALIAS):
+    applied = MigrationRecorder(connections[using]).applied_migrations()
+    return [migration for migration in migrations if migration not in applied]
+
+
+def release(timings, only_changed=False, migrate=True, stdout=None):
+    """
+    Run the release steps, timed into `timings`.
+
+    only_changed skips steps whose fingerprint matches the last release;
+    migrate=False reports pending migrations instead of applying them.
+    Returns the migrations still pending (empty when up to date).
+    """
+    state = _load_state() if only_changed else {}
+    migrations = disk_migrations()
+    fingerprints = {'migrations': migrations_fingerprint(migrations), 'superuser': superuser_fingerprint()}
+    pending = []
+
+    with timings.step('migrations') as step:
+        if state.get('migrations') == fingerprints['migrations']:
+            step.note = 'unchanged'
+        else:
+            pending = pending_migrations(migrations)
+            if pending and migrate:
+                call_command('migrate', interactive=False, verbosity=1 if stdout else 0, stdout=stdout)
+                step.note = f'{len(pending)} applied'
+                pending = []
+            elif pending:
+                step.note = f'{len(pending)} pending'
+            else:
+                step.note = 'up to date'
+
+    with timings.step('superuser') as step:
+        if fingerprints['superuser'] is None:
+            step.note = 'DJANGO_SUPERUSER_PASSWORD not set'
+        elif pending:
+            step.note = 'waiting for migrations'
+        elif state.get('superuser') == fingerprints['superuser']:
+            step.note = 'unchanged'
+        else:
+            call_command('create_default_superuser', stdout=stdout or io.StringIO())
+            step.note = 'updated'
+
+    # Neither step is done while migrations are pending
+    done = {} if pending else {step: value for step, value in fingerprints.items() if value is not None}
+    if done != state:
+        _save_state(done)
+    return pending
+
+
+def _load_state(using=DEFAULT_DB_ALIAS):
+    from monitoring.models import ReleaseState
+
+    try:
+        return dict(ReleaseState.objects.using(using).values_list('step', 'fingerprint'))
+    except DatabaseError:
+        # No table before the first migrate; that only costs the fast path
+        return {}
+
+
+def _save_state(state, using=DEFAULT_DB_ALIAS):
+    from monitoring.models import ReleaseState
+
+    try:
+        with transaction.atomic(using=using):
+            ReleaseState.objects.using(using).exclude(step__in=list(state)).delete()
+            for step, fingerprint in state.items():
+                ReleaseState.objects.using(using).update_or_create(step=step, defaults={'fingerprint': fingerprint})
+    except DatabaseError:
+        # The release itself succeeded; only the next boot's fast path is lost
+        logger.exception('Could not record the release fingerprints; the next boot checks every step again')
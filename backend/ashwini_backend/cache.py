@@ -0,0 +1,182 @@
+"""
+Namespaced, versioned caching on top of Django's cache framework.
+
+    from ashwini_backend.cache import CacheNamespace
+
+    patient_cache = CacheNamespace('patient', timeout=300)
+
+    data = patient_cache.get_or_set(('detail', patient.pk), lambda: build(patient))
+    patient_cache.delete(('detail', patient.pk))   # one entry
+    patient_cache.invalidate()                     # every entry in the namespace
+
+Keys look like `<namespace>:v<version>:<part>:<part>`. invalidate() bumps the
+namespace version kept in the cache, which orphans every older key at once
+(they expire on their own) - no key scans, works on every backend.
+
+get_or_set() protects against stampedes: on a miss only the process that
+wins a short cache lock recomputes, the others wait briefly for its result;
+entries close to expiry are refreshed early by a single process (probabilistic
+early expiration) while the rest keep serving the cached value.
+
+Both rely on add() and incr() being atomic across processes, which only
+Redis and Memcached guarantee (is_atomic()). On the file cache - the
+default without CACHE_URL - two workers can both win the lock, and two
+concurrent invalidate() calls can bump the version once, so an entry
+filled between them can outlive the second change until it expires; the
+locmem cache is not shared between workers at all. There, stampede
+protection and invalidation are best-effort, bounded by the entry timeout.
+Servers log a warning at startup (gunicorn.conf.py) when that is the case.
+
+Lookups are counted in monitoring.metrics (ashwini_cache_requests_total).
+"""
+
+import hashlib
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from monitoring import metrics
+
+# Memcached rejects keys over 250 bytes; Django adds its prefix/version on top
+MAX_KEY_LENGTH = 200
+
+# Backends whose add() and incr() are atomic across processes and instances
+ATOMIC_BACKENDS = (
+    'django.core.cache.backends.redis.',
+    'django.core.cache.backends.memcached.',
+    'django.core.cache.backends.dummy.',  # Caches nothing, so nothing goes stale
+)
+
+
+def is_atomic(alias='default'):
+    """Whether the cache's locks and version bumps hold across workers."""
+    return settings.CACHES[alias]['BACKEND'].startswith(ATOMIC_BACKENDS)
+
+
+class CacheNamespace:
+    """A family of cache entries that can be invalidated together."""
+
+    def __init__(self, name, timeout=300, alias='default',
+                 lock_timeout=10, wait_timeout=2.0, early_refresh=1.0, label=None):
+        self.name = name
+        # Metrics label; set it when names are per-object (e.g. 'patient:42')
+        self.label = label or name
+        self.timeout = timeout
+        self.alias = alias
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        # Beta of probabilistic early expiration; 0 disables early refresh
+        self.early_refresh = early_refresh
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    # Keys and versions
+
+    @property
+    def _version_key(self):
+        return f'{self.name}:version'
+
+    def version(self):
+        version = self.cache.get(self._version_key)
+        if version is None:
+            # Seed from the clock so a version lost to eviction never
+            # resurrects keys written under an older one
+            self.cache.add(self._version_key, int(time.time() * 1000), timeout=None)
+            version = self.cache.get(self._version_key, 0)
+        return version
+
+    def invalidate(self):
+        """Drop every entry in the namespace by bumping its version."""
+        try:
+            self.cache.incr(self._version_key)
+        except ValueError:
+            self.version()
+        metrics.CACHE_INVALIDATIONS.inc(namespace=self.label)
+
+    def make_key(self, key, version=None):
+        if isinstance(key, (tuple, list)):
+            key = ':'.join(str(part) for part in key)
+        key = str(key)
+        if len(key) > MAX_KEY_LENGTH or any(c.isspace() for c in key):
+            key = hashlib.sha1(key.encode()).hexdigest()
+        return f'{self.name}:v{version if version is not None else self.version()}:{key}'
+
+    # Plain access
+
+    def get(self, key, default=None):
+        entry = self.cache.get(self.make_key(key))
+        metrics.CACHE_REQUESTS.inc(namespace=self.label, result='miss' if entry is None else 'hit')
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, timeout=None):
+        self._store(self.make_key(key), value, timeout, delta=0)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    # Stampede-protected access
+
+    def get_or_set(self, key, producer, timeout=None, version=None):
+        """
+        Return the cached value for `key`, computing it with `producer()` at
+        most once at a time. Pass `version` when already looked up (e.g. for an ETag).
+        """
+        cache_key = self.make_key(key, version)
+        lock_key = f'{cache_key}:lock'
+
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            value, expires_at, delta = entry
+            if not self._refresh_early(expires_at, delta):
+                metrics.CACHE_REQUESTS.inc(namespace=self.label, result='hit')
+                return value
+            if not self.cache.add(lock_key, 1, self.lock_timeout):
+                # Someone else is already refreshing it
+                metrics.CACHE_REQUESTS.inc(namespace=self.label, result='hit')
+                return value
+            metrics.CACHE_REQUESTS.inc(namespace=self.label, result='early_refresh')
+            return self._fill(cache_key, lock_key, producer, timeout)
+
+        if self.cache.add(lock_key, 1, self.lock_timeout):
+            metrics.CACHE_REQUESTS.inc(namespace=self.label, result='miss')
+            return self._fill(cache_key, lock_key, producer, timeout)
+
+        # Another process is computing this value: wait for it rather than pile on
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                metrics.CACHE_REQUESTS.inc(namespace=self.label, result='wait_hit')
+                return entry[0]
+        metrics.CACHE_REQUESTS.inc(namespace=self.label, result='miss')
+        return self._fill(cache_key, None, producer, timeout)
+
+    def _fill(self, cache_key, lock_key, producer, timeout):
+        started = time.perf_counter()
+        try:
+            value = producer()
+            delta = time.perf_counter() - started
+            metrics.CACHE_FILL.observe(delta, namespace=self.label)
+            self._store(cache_key, value, timeout, delta)
+            return value
+        finally:
+            if lock_key:
+                self.cache.delete(lock_key)
+
+    def _store(self, cache_key, value, timeout, delta):
+        timeout = self.timeout if timeout is None else timeout
+        expires_at = time.time() + timeout if timeout else None
+        # Envelope: (value, expiry, recompute time) - also lets None be cached
+        self.cache.set(cache_key, (value, expires_at, delta), timeout)
+
+    def _refresh_early(self, expires_at, delta):
+        """XFetch: recompute ahead of expiry with a probability that grows as it nears."""
+        if not self.early_refresh or not expires_at or not delta:
+            return False
+        return time.time() - delta * self.early_refresh * math.log(1 - random.random()) >= expires_at
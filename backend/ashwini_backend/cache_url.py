@@ -0,0 +1,59 @@
+"""
+Build a Django CACHES entry from a URL, in the spirit of dj_database_url.
+
+    redis://[:password@]host:6379/0   Django's RedisCache (needs `redis`)
+    rediss://...                      same, over TLS
+    memcached://host:11211[,host2]    PyMemcacheCache (needs `pymemcache`)
+    file:///var/tmp/ashwini-cache     FileBasedCache
+    locmem://[name]                   LocMemCache (per process)
+    dummy://                          DummyCache (caching disabled)
+"""
+
+import importlib.util
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis'),
+    'rediss': ('django.core.cache.backends.redis.RedisCache', 'redis'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', 'pymemcache'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', None),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', None),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', None),
+}
+
+
+def parse(url, timeout=300, key_prefix='ashwini', max_entries=5000):
+    scheme = urlsplit(url).scheme
+    if scheme not in BACKENDS:
+        raise ImproperlyConfigured(
+            f'Unsupported cache URL scheme {scheme!r}; use one of {", ".join(sorted(BACKENDS))}'
+        )
+    backend, package = BACKENDS[scheme]
+    if package and importlib.util.find_spec(package) is None:
+        raise ImproperlyConfigured(
+            f'Cache URL {scheme}:// needs the `{package}` package (pip install {package})'
+        )
+
+    parts = urlsplit(url)
+    if scheme in ('redis', 'rediss'):
+        location = url
+    elif scheme == 'memcached':
+        location = parts.netloc.split(',')
+    elif scheme == 'file':
+        location = parts.path
+    else:
+        location = parts.netloc or 'ashwini'
+
+    config = {
+        'BACKEND': backend,
+        'LOCATION': location,
+        'TIMEOUT': timeout,
+        'KEY_PREFIX': key_prefix,
+    }
+    if scheme in ('file', 'locmem'):
+        # Django's default of 300 entries is far too small for a shared cache
+        config['OPTIONS'] = {'MAX_ENTRIES': max_entries}
+    return config
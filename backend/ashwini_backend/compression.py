@@ -0,0 +1,145 @@
+"""
+Brotli/gzip compression of API responses, negotiated from Accept-Encoding.
+
+CompressionMiddleware compresses a response when:
+
+- the client accepts br (preferred, when the brotli package is installed)
+  or gzip;
+- the body is at least COMPRESSION_MIN_SIZE bytes;
+- its content type is compressible data (JSON, CSV, NDJSON, plain text).
+
+It leaves alone:
+
+- streaming responses, including server-sent events, which must reach the
+  client as they are produced;
+- responses that already carry a Content-Encoding;
+- responses marked Cache-Control: no-transform;
+- HTML. The admin pages carry session cookies and CSRF tokens, so they are
+  excluded to stay clear of BREACH.
+
+Dynamic responses use fast compression levels. Bodies that are compressed
+once and then served many times use high levels via compress(..., cached=True);
+see patients.response_cache, which stores them that way.
+"""
+
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/xml',
+    'text/csv',
+    'text/plain',
+)
+
+# (dynamic, cached) levels: brotli 4 is gzip-fast with a better ratio
+GZIP_LEVELS = (6, 9)
+BROTLI_QUALITIES = (4, 9)
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(request):
+    """The best encoding the client accepts ('br' or 'gzip'), or None."""
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not header:
+        return None
+
+    supported = supported_encodings()
+    weights = {}
+    wildcard = None
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding == '*':
+            wildcard = q
+        elif coding in supported:
+            weights[coding] = q
+    if wildcard is not None:
+        for coding in supported:
+            weights.setdefault(coding, wildcard)
+
+    # Highest q wins; ties go to the order of supported_encodings()
+    best = max(supported, key=lambda coding: weights.get(coding, 0.0))
+    return best if weights.get(best, 0.0) > 0 else None
+
+
+def compress(body, encoding, cached=False):
+    """`body` compressed with 'br' or 'gzip'."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITIES[cached])
+    return gzip.compress(body, compresslevel=GZIP_LEVELS[cached], mtime=0)
+
+
+def is_compressible(content_type, size):
+    media_type = (content_type or '').split(';', 1)[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES and size >= settings.COMPRESSION_MIN_SIZE
+
+
+class CompressionMiddleware:
+    """Compress eligible responses with the encoding negotiate() picks."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        # Every response could differ by Accept-Encoding, compressed or not
+        if not response.streaming:
+            patch_vary_headers(response, ('Accept-Encoding',))
+
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or 'no-transform' in response.get('Cache-Control', '')
+            or not is_compressible(response.get('Content-Type'), len(response.content))
+        ):
+            return response
+
+        encoding = negotiate(request)
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The bytes changed: a strong validator no longer matches them
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,233 @@
+"""
+Read-only fast path for serializing large querysets in GET list views.
+
+A ValuesSerializer mirrors a DRF ModelSerializer (`serializer_class`) but
+reads rows with values_list() instead of building model instances, and maps
+them through a field table compiled once per class:
+
+- plain columns and foreign-key ids are copied as-is,
+- related columns (source='patient.name') are fetched through a join
+  ('patient__name'), with the foreign keys on the way; where one is null
+  the field becomes what DRF makes of the AttributeError - its default,
+  null if allow_null, or left out of the item if not required,
+- ISO 8601 datetimes are formatted by a converter that resolves the
+  timezone once per call instead of once per value; files become their
+  storage URL; anything else goes through the DRF field's own
+  to_representation - so the JSON is byte-identical to the
+  ModelSerializer's,
+- a SerializerMethodField calls get_<name>(raw) on the ValuesSerializer,
+  where `raw` maps every fetched lookup to its value; the columns it needs
+  come from the serializer's `field_sources` (ashwini_backend.fieldsets).
+
+    class PatientListValuesSerializer(ValuesSerializer):
+        serializer_class = PatientListSerializer
+
+    return Response(PatientListValuesSerializer(queryset).data)
+
+Use it where a view returns many rows and the ModelSerializer has no nested
+serializers; keep the ModelSerializer for writes and single objects.
+"""
+
+import operator
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+
+# Fields whose to_representation() leaves database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+# on_missing of fields left out of the item when their relation is null
+SKIP = object()
+
+
+class ValuesSerializer:
+    """Serialize a queryset like `serializer_class(queryset, many=True).data`, without model instances."""
+
+    serializer_class = None
+
+    def __init__(self, queryset, context=None, fields=None):
+        self.queryset = queryset
+        self.context = context or {}
+        # Subset of field names to serialize (see ashwini_backend.fieldsets)
+        self.fields = fields
+
+    @classmethod
+    def compile(cls):
+        """
+        (fields, file_fields) for this class, built on first use.
+
+        `fields` holds (name, lookup, bind, guards, on_missing):
+        bind(serializer) returns the value converter (None: use the value
+        as-is). Method fields have no lookup; they read the raw row, fetched
+        with the lookups named in the serializer's `field_sources`. `guards`
+        are the foreign keys on a related lookup's path, and on_missing what
+        the field is when one of them is null (see _on_missing()).
+        """
+        compiled = cls.__dict__.get('_compiled')
+        if compiled is None:
+            compiled = cls._compiled = cls._compile()
+        return compiled
+
+    @classmethod
+    def _compile(cls):
+        if cls.serializer_class is None:
+            raise ImproperlyConfigured(f'{cls.__name__} must set serializer_class')
+        model = cls.serializer_class.Meta.model
+        fields = []
+        file_fields = []
+
+        for name, field in cls.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                fields.append((name, None, operator.attrgetter(field.method_name), (), None))
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+                raise ImproperlyConfigured(
+                    f'{cls.__name__}: nested field {name!r} is not supported by ValuesSerializer'
+                )
+
+            lookup = '__'.join(field.source_attrs)
+            guards = _guards(model, field.source_attrs)
+            on_missing = _on_missing(name, field) if guards else None
+            if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                convert = None  # values() already returns the id
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                convert = None
+            elif isinstance(field, serializers.DateTimeField) and _is_iso_aware(field):
+                fields.append((name, lookup, _bind_iso_datetime(field), guards, on_missing))
+                continue
+            elif isinstance(field, serializers.FileField):
+                if getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+                    convert = _file_url(model._meta.get_field(lookup).storage)
+                    file_fields.append(name)
+                else:
+                    convert = _file_name
+            elif isinstance(field, serializers.JSONField) and not field.binary:
+                convert = None
+            else:
+                convert = field.to_representation
+            fields.append((name, lookup, lambda serializer, convert=convert: convert, guards, on_missing))
+
+        return tuple(fields), tuple(file_fields)
+
+    @property
+    def data(self):
+        fields, file_fields = self.compile()
+        if self.fields is not None:
+            fields = [entry for entry in fields if entry[0] in self.fields]
+            file_fields = [name for name in file_fields if name in self.fields]
+
+        # Fetch only what the selected fields read
+        sources = getattr(self.serializer_class, 'field_sources', {})
+        lookups = []
+        for name, lookup, _, guards, _ in fields:
+            for needed in ((lookup, *guards) if lookup else sources.get(name, ())):
+                if needed not in lookups:
+                    lookups.append(needed)
+        lookups = lookups or ['pk']  # values_list() with no lookups reads every column
+        table = [
+            (
+                name, lookups.index(lookup) if lookup else None, bind(self),
+                tuple(lookups.index(guard) for guard in guards), on_missing,
+            )
+            for name, lookup, bind, guards, on_missing in fields
+        ]
+        with_raw = any(index is None for _, index, _, _, _ in table)
+
+        result = []
+        for values in self.queryset.values_list(*lookups):
+            raw = dict(zip(lookups, values)) if with_raw else None
+            item = {}
+            for name, index, convert, guards, on_missing in table:
+                if index is None:
+                    item[name] = convert(raw)
+                    continue
+                value = values[index]
+                if value is None and any(values[guard] is None for guard in guards):
+                    if on_missing is SKIP:
+                        continue
+                    value = on_missing()
+                item[name] = value if convert is None or value is None else convert(value)
+            result.append(item)
+
+        request = self.context.get('request')
+        if request is not None and file_fields:
+            for item in result:
+                for name in file_fields:
+                    if item[name] is not None:
+                        item[name] = request.build_absolute_uri(item[name])
+        return result
+
+
+def _guards(model, source_attrs):
+    """The lookups of the foreign keys along a related source ('patient' for 'patient.name')."""
+    guards = []
+    opts = model._meta
+    for depth, attr in enumerate(source_attrs[:-1], 1):
+        relation = opts.get_field(attr)
+        # A missing reverse one-to-one reads as None in DRF too (ObjectDoesNotExist)
+        if relation.concrete:
+            guards.append('__'.join(source_attrs[:depth]))
+        opts = relation.related_model._meta
+    return tuple(guards)
+
+
+def _on_missing(name, field):
+    """
+    What a field is when a relation on its source is null - as DRF's
+    Field.get_attribute() handles the AttributeError: a callable returning
+    the value, or SKIP to leave the field out.
+    """
+    if field.default is not empty:
+        return field.get_default
+    if field.allow_null:
+        return lambda: None
+    if not field.required:
+        return SKIP
+
+    def fail():
+        raise AttributeError(f'Got AttributeError when attempting to get a value for field `{name}`: '
+                             f'a relation on its source {field.source!r} is null')
+    return fail
+
+
+def _is_iso_aware(field):
+    """Whether the field renders ISO 8601 and the database returns aware datetimes."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return settings.USE_TZ and output_format is not None and output_format.lower() == ISO_8601
+
+
+def _bind_iso_datetime(field):
+    # DateTimeField.to_representation() looks the current timezone up for
+    # every value; it cannot change within one .data call, so do it once
+    def bind(serializer):
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+        def convert(value):
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+    return bind
+
+
+def _file_url(storage):
+    def convert(name):
+        # Same as FieldFile.url; DRF renders an empty file as null
+        return storage.url(name) if name else None
+    return convert
+
+
+def _file_name(name):
+    return name or None
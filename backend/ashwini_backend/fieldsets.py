@@ -0,0 +1,111 @@
+"""
+Sparse fieldsets: `?fields=` and `?expand=` on read endpoints.
+
+    GET /api/patients/42/?fields=id,name,status
+    GET /api/patients/42/?fields=id,name&expand=prescription
+    GET /api/reports/?fields=id,analysis_status,uploaded_at
+
+Without `?fields=` every field is returned, as before - the default set
+already embeds every relation, so `?expand=` on its own changes nothing
+beyond checking its names. With it, only the listed fields are, plus the
+embedded relations named in `?expand=` (a serializer's
+`expandable_fields`). Unknown names are a 400 either way.
+
+Pruning reaches the database too:
+
+- SparseFieldsMixin drops the unselected fields from a ModelSerializer,
+  and prune_queryset() defer()s the columns only those fields read;
+- ValuesSerializer(queryset, fields=...) fetches just the selected lookups;
+- serializers with embedded relations take `fields` in their eager-loading
+  hooks and skip the joins/prefetches nobody asked for.
+
+Method fields declare the model columns they read in `field_sources`.
+"""
+
+from rest_framework.exceptions import ValidationError
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+def requested_fields(request, serializer_class):
+    """
+    Names selected by ?fields= / ?expand=, in the serializer's field order;
+    None when the request doesn't narrow the fields (no ?fields=: the
+    default set, which ?expand= adds nothing to).
+    """
+    params = request.query_params
+    if 'fields' not in params and 'expand' not in params:
+        return None
+
+    available = list(serializer_class().fields)
+    expandable = getattr(serializer_class, 'expandable_fields', ())
+    fields = set(_split(params.get('fields')))
+    expand = set(_split(params.get('expand')))
+
+    errors = {}
+    unknown = sorted(fields - set(available))
+    if unknown:
+        errors['fields'] = f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+    unknown = sorted(expand - set(expandable))
+    if unknown:
+        errors['expand'] = f"Unknown relations: {', '.join(unknown)}. Available: {', '.join(expandable)}"
+    if errors:
+        raise ValidationError(errors)
+
+    if 'fields' not in params:
+        return None
+    selected = fields | expand
+    return tuple(name for name in available if name in selected)
+
+
+def field_columns(serializer_class, fields):
+    """Concrete model columns read by `fields` of a ModelSerializer."""
+    model = serializer_class.Meta.model
+    concrete = {field.name for field in model._meta.concrete_fields}
+    sources = getattr(serializer_class, 'field_sources', {})
+    declared = serializer_class().fields
+
+    columns = set()
+    for name in fields:
+        if name in sources:
+            columns.update(sources[name])
+            continue
+        source = declared[name].source_attrs
+        if source and source[0] in concrete:
+            columns.add(source[0])
+    return columns
+
+
+def prune_queryset(queryset, serializer_class, fields):
+    """defer() every column the selected `fields` of `serializer_class` don't read."""
+    if fields is None:
+        return queryset
+    model = serializer_class.Meta.model
+    every = {field.name for field in model._meta.concrete_fields}
+    needed = field_columns(serializer_class, fields)
+    pk = model._meta.pk.name
+    # A relation followed by select_related() can't be deferred
+    joined = queryset.query.select_related
+    joined = set(joined) if isinstance(joined, dict) else set()
+    unused = sorted(every - needed - joined - {pk})
+    return queryset.defer(*unused) if unused else queryset
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin taking `fields=` (e.g. from requested_fields()) to
+    serialize only those fields.
+    """
+
+    # Embedded relations ?expand= may name
+    expandable_fields = ()
+    # Method field -> model columns it reads
+    field_sources = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
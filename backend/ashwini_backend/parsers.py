@@ -0,0 +1,35 @@
+"""
+orjson-backed JSON parser, a drop-in for DRF's JSONParser.
+
+Like JSONParser with STRICT_JSON, NaN/Infinity are rejected. Falls back to
+JSONParser when orjson isn't installed, for non-UTF-8 request charsets and
+when STRICT_JSON is off.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class ORJSONParser(JSONParser):
+    """Parse JSON request bodies with orjson, falling back to the stdlib decoder."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,17 @@
+"""
+A PostgreSQL database backend with an in-process connection pool.
+
+Django 4.2 only keeps a persistent connection per thread (CONN_MAX_AGE):
+every thread that touches the database - each gthread worker thread, each
+short-lived thread sync_to_async() runs an async view's queries in - opens
+its own connection, pays the connect and authentication round trips on the
+request path, and holds a server slot while idle. This backend shares a
+bounded pool per process instead (see pool.py): a thread checks a connection
+out when it first queries and returns it when Django closes it at the end
+of the request (CONN_MAX_AGE is 0 with this backend).
+
+Enabled with DATABASE_POOL=True; sized and tuned per database with
+settings.DATABASES[alias]['POOL'] (MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_LIFETIME,
+MAX_IDLE, CHECK_AFTER). The server sees at most
+workers x MAX_SIZE connections per database.
+"""
@@ -0,0 +1,51 @@
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.base import IsolationLevel
+
+from ashwini_backend.pooled_postgresql import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would block DROP DATABASE
+        pool.close_pools(database=test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL with connections checked out of, and returned to, a process-wide pool."""
+
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'], settings_dict['USER'])
+        return pool.get_pool(key, self._create_pool)
+
+    def _create_pool(self):
+        # Opens connections exactly as the stock backend does, on its own
+        # wrapper: the pool's thread must not touch this one
+        opener = base.DatabaseWrapper(self.settings_dict, self.alias)
+        options = {key.lower(): value for key, value in self.settings_dict.get('POOL', {}).items()}
+        return pool.ConnectionPool(
+            self.alias, lambda: opener.get_new_connection(opener.get_connection_params()), **options
+        )
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            return super().get_new_connection(conn_params)
+        # What the stock backend sets while connecting
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        try:
+            return self.pool.getconn()
+        except pool.PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None or self.alias == NO_DB_ALIAS:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
@@ -0,0 +1,293 @@
+"""
+A thread-safe pool of database connections, one per process and database.
+
+Checking a connection out:
+
+- takes the most recently returned idle connection, after checking it: a
+  connection that is closed, older than MAX_LIFETIME, or idle for more than
+  CHECK_AFTER seconds and failing a `SELECT 1`, is discarded;
+- otherwise opens a new one, while the pool has fewer than MAX_SIZE;
+- otherwise waits up to TIMEOUT seconds for one to be returned, then
+  raises PoolTimeout.
+
+Returned connections are rolled back if a transaction was left open, and
+closed instead if they are broken or past their lifetime. Lifetimes are
+jittered by up to 10% so connections opened together don't all recycle at
+once.
+
+A maintenance thread (start()) opens connections ahead of demand - up to
+MIN_SIZE, plus one spare while all are busy - so requests rarely wait for
+a connection to be set up. It also closes connections idle for more than
+MAX_IDLE beyond MIN_SIZE, and recycles expired ones.
+
+Connections must not cross a fork: pools are closed before the process
+forks and forgotten in the child.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from monitoring import metrics
+
+# Transaction states (psycopg2 extensions / psycopg pq.TransactionStatus)
+IDLE, ACTIVE, INTRANS, INERROR, UNKNOWN = range(5)
+
+WAIT = metrics.Histogram(
+    'ashwini_db_pool_wait_seconds', 'Time to check a connection out of the pool', ['database']
+)
+EVENTS = metrics.Counter(
+    'ashwini_db_pool_connections_total',
+    'Pool connection events (opened, recycled, broken, idle_closed, timeout)',
+    ['database', 'event'],
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, name, connect, min_size=1, max_size=10, timeout=10, max_lifetime=1800,
+                 max_idle=300, check_after=30):
+        self.name = name
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_after = check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned at); newest on the right
+        self._expires = {}  # id(connection) -> monotonic expiry
+        self._size = 0  # Open connections plus ones being opened
+        self._waiting = 0
+        self._closed = False
+        self._thread = None
+
+    # Checkout
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection, returned_at = self._take(deadline)
+            if connection is None:
+                connection = self._open()
+                break
+            if self._usable(connection, returned_at):
+                break
+            self._discard(connection, 'broken')
+        WAIT.observe(time.monotonic() - started, database=self.name)
+        return connection
+
+    def _take(self, deadline):
+        """An idle (connection, returned at), or (None, None) with a slot reserved to open one."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout(f'Connection pool {self.name} is closed')
+                if self._idle:
+                    if len(self._idle) == 1 and self._size < self.max_size:
+                        self._cond.notify_all()  # The last spare: let the maintenance thread add one
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    EVENTS.inc(database=self.name, event='timeout')
+                    raise PoolTimeout(
+                        f'No connection to {self.name} within {self.timeout}s '
+                        f'({self.max_size} in use, {self._waiting} waiting)'
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open(self):
+        """Open a connection in a slot reserved by _take()."""
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify_all()
+            raise
+        lifetime = self.max_lifetime * random.uniform(0.9, 1.0)
+        self._expires[id(connection)] = time.monotonic() + lifetime
+        EVENTS.inc(database=self.name, event='opened')
+        return connection
+
+    def _usable(self, connection, returned_at):
+        if connection.closed or connection.info.transaction_status != IDLE or self._expired(connection):
+            return False
+        if time.monotonic() - returned_at < self.check_after:
+            return True
+        try:
+            # The driver's own cursor: not a query of the request
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def _expired(self, connection):
+        return time.monotonic() >= self._expires.get(id(connection), 0)
+
+    # Return
+
+    def putconn(self, connection):
+        status = None if connection.closed else connection.info.transaction_status
+        if status in (INTRANS, INERROR):
+            try:
+                connection.rollback()
+                status = IDLE
+            except Exception:
+                status = None
+        if status != IDLE:
+            self._discard(connection, 'broken')
+        elif self._expired(connection) or self._closed:
+            self._discard(connection, 'recycled')
+        else:
+            with self._cond:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+
+    def _discard(self, connection, event):
+        self._expires.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        EVENTS.inc(database=self.name, event=event)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify_all()
+
+    # Maintenance
+
+    def start(self, interval=1.0):
+        """Start the maintenance thread (once per pool)."""
+        with self._cond:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._maintain, args=(interval,), name=f'db-pool-{self.name}', daemon=True
+            )
+        self._thread.start()
+
+    def _maintain(self, interval):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                # Below MIN_SIZE, or every connection is checked out: one spare
+                wanted = self._size < self.min_size or (not self._idle and 0 < self._size < self.max_size)
+                if wanted:
+                    self._size += 1
+                else:
+                    stale = self._stale_idle()
+            if wanted:
+                try:
+                    self.putconn(self._open())
+                except Exception:
+                    time.sleep(interval)  # The database is unreachable; retry later
+                continue
+            for connection, event in stale:
+                self._discard(connection, event)
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(interval)
+
+    def _stale_idle(self):
+        """Remove and return the idle connections to close, oldest first. Holds the lock."""
+        now = time.monotonic()
+        busy = self._size > len(self._idle)
+        newest = self._idle[-1][0] if self._idle else None
+        stale = []
+        keep = deque()
+        for connection, returned_at in self._idle:
+            if self._expired(connection):
+                stale.append((connection, 'recycled'))
+            elif busy and connection is newest:
+                keep.append((connection, returned_at))  # The spare, while others are checked out
+            elif now - returned_at > self.max_idle and self._size - len(stale) > self.min_size:
+                stale.append((connection, 'idle_closed'))
+            else:
+                keep.append((connection, returned_at))
+        self._idle = keep
+        return stale
+
+    # State
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {'size': self._size, 'idle': idle, 'in_use': self._size - idle,
+                    'waiting': self._waiting, 'max_size': self.max_size}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+            self._cond.notify_all()
+        for connection, _ in idle:
+            self._discard(connection, 'recycled')
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """The pool for `key`, created with factory() on first use."""
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = factory()
+    return pool
+
+
+def pools():
+    return dict(_pools)
+
+
+def gauges():
+    """Gauges of this worker's pools for the metrics endpoint."""
+    pid = os.getpid()
+    stats = {key[0]: pool.stats() for key, pool in pools().items()}
+    return [
+        ('ashwini_db_pool_connections', 'Pooled connections by state, per worker', ('database', 'state', 'pid'),
+         [((alias, state, pid), s[state]) for alias, s in stats.items() for state in ('in_use', 'idle')]),
+        ('ashwini_db_pool_waiting', 'Threads waiting for a pooled connection, per worker', ('database', 'pid'),
+         [((alias, pid), s['waiting']) for alias, s in stats.items()]),
+        ('ashwini_db_pool_saturation_ratio', 'Checked-out connections / MAX_SIZE, per worker', ('database', 'pid'),
+         [((alias, pid), round(s['in_use'] / s['max_size'], 4)) for alias, s in stats.items()]),
+    ]
+
+
+def close_pools(database=None):
+    """Close every pool, or those of one database name."""
+    for key, pool in list(_pools.items()):
+        if database is None or key[1] == database:
+            _pools.pop(key, None)
+            pool.close()
+
+
+def _forget_pools():
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=close_pools, after_in_child=_forget_pools)
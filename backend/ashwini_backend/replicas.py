@@ -0,0 +1,278 @@
+"""
+Read replicas for safe (GET/HEAD/OPTIONS) requests.
+
+Replicas are configured with DATABASE_REPLICA_URLS and become the aliases
+replica_1, replica_2, ... (settings.py). ReplicaMiddleware marks each
+request and ReplicaRouter sends its reads to a replica when all of these
+hold:
+
+- the request is safe and has not written anything itself,
+- the model is project data; users, tokens, sessions and the other
+  framework tables are always read from the primary, so logins see fresh
+  accounts and revoked tokens,
+- no transaction is open on the primary,
+- neither the user nor the client wrote within the last
+  DATABASE_REPLICA_STICKY_SECONDS (read-your-writes): a request that writes
+  pins its user (or its client address, before login) to the primary for
+  that long,
+- a replica is healthy: each process probes a replica's lag at most every
+  DATABASE_REPLICA_LAG_CHECK_INTERVAL seconds, and one lagging more than
+  DATABASE_REPLICA_MAX_LAG seconds - or unreachable - gets no reads until a
+  later probe finds it caught up.
+
+A request reads from one replica throughout. Writes always go to the
+primary, and migrations only run there. Code that must not see a lagging
+copy - filling a cache under a version that is already current - reads
+from the primary inside primary_reads().
+
+Lag is measured per backend: PostgreSQL reports its replay delay; a SQLite
+replica is a copy of the primary file (`manage.py sync_replicas`) and lags
+by how much older its file is. To try it locally:
+
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3
+    python manage.py sync_replicas
+
+Routing decisions are counted in ashwini_db_replica_reads_total and the
+lag is exported as ashwini_db_replica_lag_seconds.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from monitoring import metrics
+from monitoring.query_budget import uncounted
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Apps whose tables replicas serve, minus PRIMARY_ONLY_MODELS
+REPLICA_APPS = {'patients', 'measurements', 'prescriptions', 'reports', 'devices', 'monitoring'}
+PRIMARY_ONLY_MODELS = {'patients.customuser'}
+
+# Seconds since the last replayed transaction, 0 when the replica has replayed
+# everything it received (an idle primary sends nothing new)
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+READS = metrics.Counter(
+    'ashwini_db_replica_reads_total',
+    'Safe requests that read routable data, by the database they read and why',
+    ['database', 'reason'],
+)
+
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+class Replica:
+    """A replica's health as this process last measured it."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.lag = None  # None: not probed yet, or unreachable
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def healthy(self):
+        if self._stale() and self._lock.acquire(blocking=False):
+            # One thread probes; the others use the last result meanwhile
+            try:
+                self.probe()
+            finally:
+                self._lock.release()
+        return self.lag is not None and self.lag <= settings.DATABASE_REPLICA_MAX_LAG
+
+    def _stale(self):
+        return self.checked_at is None or time.monotonic() - self.checked_at >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL
+
+    def probe(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            return  # No queries on the event loop; a sync caller will probe
+        try:
+            with uncounted():
+                self.lag = measure_lag(self.alias)
+        except Exception:
+            self.lag = None
+        self.checked_at = time.monotonic()
+
+
+def measure_lag(alias):
+    """Seconds `alias` is behind the primary."""
+    connection = connections[alias]
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRES_LAG_SQL)
+            return float(cursor.fetchone()[0])
+    if connection.vendor == 'sqlite':
+        if connection.settings_dict['NAME'] == primary['NAME']:
+            return 0.0  # A test mirror
+        return max(0.0, os.path.getmtime(primary['NAME']) - os.path.getmtime(connection.settings_dict['NAME']))
+    return 0.0
+
+
+_replicas = {}
+
+
+def get_replica(alias):
+    replica = _replicas.get(alias)
+    if replica is None:
+        replica = _replicas.setdefault(alias, Replica(alias))
+    return replica
+
+
+def lag_gauges():
+    """(label values, lag) per replica for the metrics endpoint; -1 when unreachable."""
+    samples = []
+    for alias in replica_aliases():
+        replica = get_replica(alias)
+        replica.healthy()
+        samples.append(((alias,), -1 if replica.lag is None else round(replica.lag, 3)))
+    return samples
+
+
+class RequestState:
+    """How one request reads: decided at its first routable read."""
+
+    def __init__(self, request):
+        self.request = request
+        self.safe = request.method in SAFE_METHODS
+        self.wrote = False
+        self.alias = None
+
+    def read_alias(self):
+        if self.alias is None:
+            self.alias, reason = self._choose()
+            READS.inc(database=self.alias, reason=reason)
+        return self.alias
+
+    def _choose(self):
+        keys = [f'db-pin:client:{client_address(self.request)}']
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            keys.append(f'db-pin:user:{user.pk}')
+        if caches['default'].get_many(keys):
+            return DEFAULT_DB_ALIAS, 'recent_write'
+
+        healthy = [alias for alias in replica_aliases() if get_replica(alias).healthy()]
+        if not healthy:
+            return DEFAULT_DB_ALIAS, 'replicas_unavailable'
+        return random.choice(healthy), 'replica'
+
+    def pin(self):
+        """Read this user's (or client's) data from the primary for a while."""
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            key = f'db-pin:user:{user.pk}'
+        else:
+            key = f'db-pin:client:{client_address(self.request)}'
+        caches['default'].set(key, True, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def client_address(request):
+    from patients.views import get_client_ip
+
+    return get_client_ip(request)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read everything from the primary within the block, e.g. to build a
+    payload cached under the current version: a replica may not have
+    replayed the write that bumped it yet, and the stale payload would be
+    served until the next change. The state is a context variable, so it
+    carries over to sync_to_async threads.
+    """
+    token = _request_state.set(None)
+    try:
+        yield
+    finally:
+        _request_state.reset(token)
+
+
+class ReplicaRouter:
+    """Reads of safe requests to a replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if state is None or not state.safe or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            # Later reads of this request, and of the user's next ones, see it
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Replicas hold the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Track each request for ReplicaRouter and pin the writers' reads to the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(replica_aliases())
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        state = RequestState(request)
+        token = _request_state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _request_state.reset(token)
+            if state.wrote:
+                state.pin()
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        state = RequestState(request)
+        token = _request_state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+            if state.wrote:
+                await sync_to_async(state.pin)()
@@ -5,22 +5,18 @@ Generated for Project Ashwini - IoT-ready health tracking system.
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import tempfile
 import dj_database_url
 from dotenv import load_dotenv
 from datetime import timedelta
 
+from ashwini_backend import cache_url
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Import cloudinary if available
-try:
-    import cloudinary
-    import cloudinary.uploader
-    import cloudinary.api
-except ImportError:
-    cloudinary = None
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +39,16 @@ DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 # Hosts: comma-separated list from env or default to allow all for quick deploys
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split(',')
 
+# Media files go to Cloudinary in production when it is configured (see
+# "Media files" below). Cloudinary's apps - and its SDK - are only installed
+# then, so other processes don't import them. The SDK itself is configured
+# by django-cloudinary-storage from CLOUDINARY_STORAGE when first used.
+USE_CLOUDINARY = bool(
+    not DEBUG
+    and os.getenv('CLOUDINARY_CLOUD_NAME')
+    and importlib.util.find_spec('cloudinary_storage') is not None
+)
+
 # Custom User Model
 AUTH_USER_MODEL = 'patients.CustomUser'
 
@@ -62,8 +68,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
-    'cloudinary_storage',
-    'cloudinary',
+    *(['cloudinary_storage', 'cloudinary'] if USE_CLOUDINARY else []),
     
     # Project apps
     'patients',
@@ -71,16 +76,22 @@ INSTALLED_APPS = [
     'measurements',
     'devices',
     'reports',
+    'monitoring',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.QueryBudgetMiddleware',  # Query counts / N+1 detection
+    'monitoring.middleware.MetricsMiddleware',  # Prometheus metrics (needs query_stats)
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'ashwini_backend.staticfiles.WhiteNoiseMiddleware',  # whitenoise, async-capable
+    'ashwini_backend.compression.CompressionMiddleware',  # br/gzip API responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ashwini_backend.replicas.ReplicaMiddleware',  # Read replica routing (when configured)
+    'monitoring.profiler.ProfilerMiddleware',  # ?__profile=1 for ADMIN users
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -105,13 +116,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ashwini_backend.wsgi.application'
 
+# How app.py / start.sh serve the project: 'wsgi' (gunicorn gthread workers) or
+# 'asgi' (gunicorn with uvicorn workers, so async views - report upload,
+# device long polling, event streams - wait on I/O without holding a worker)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+
 
 # Database
 # Use DATABASE_URL (Heroku/Render style) if provided, otherwise default to SQLite for dev
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
+        # Persistent connections are per thread; async views run their ORM
+        # calls in short-lived threads, which would leak them
+        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=0 if SERVER_MODE == 'asgi' else 600)
     }
 else:
     # Development: SQLite
@@ -122,6 +140,111 @@ else:
         }
     }
 
+# Read replicas: comma-separated database URLs. Safe requests read project
+# data from them, with read-your-writes stickiness and lag fallback (see
+# ashwini_backend.replicas). In tests they mirror the default database.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for number, url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(url, conn_max_age=DATABASES['default'].get('CONN_MAX_AGE', 0)),
+        'TEST': {'MIRROR': 'default'},
+    }
+if DATABASE_REPLICA_URLS:
+    DATABASE_ROUTERS = ['ashwini_backend.replicas.ReplicaRouter']
+# Seconds a replica may lag before its reads go to the primary
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DATABASE_REPLICA_MAX_LAG', '5'))
+# Seconds between lag probes, per process and replica
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('DATABASE_REPLICA_LAG_CHECK_INTERVAL', '5'))
+# Seconds a user (or client) reads from the primary after writing
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', '15'))
+
+# Connection pool for the PostgreSQL databases (ashwini_backend.pooled_postgresql):
+# each process shares a bounded pool per database, opened ahead of demand,
+# instead of a persistent connection per thread. The server sees at most
+# workers x DATABASE_POOL_MAX_SIZE connections per database.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'False') == 'True'
+# Behind PgBouncer in transaction pooling mode: server-side cursors don't
+# survive the end of a transaction there
+DATABASE_PGBOUNCER = os.environ.get('DATABASE_PGBOUNCER', 'False') == 'True'
+for database in DATABASES.values():
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    if DATABASE_PGBOUNCER:
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+    if DATABASE_POOL:
+        database.update(
+            ENGINE='ashwini_backend.pooled_postgresql',
+            CONN_MAX_AGE=0,  # Returned to the pool at the end of each request
+            POOL={
+                'MIN_SIZE': int(os.environ.get('DATABASE_POOL_MIN_SIZE', '1')),
+                # One per gthread worker thread by default
+                'MAX_SIZE': int(os.environ.get('DATABASE_POOL_MAX_SIZE', os.environ.get('WEB_THREADS', '4'))),
+                # Seconds a request waits for a connection before failing
+                'TIMEOUT': float(os.environ.get('DATABASE_POOL_TIMEOUT', '10')),
+                # Seconds before a connection is replaced (minus up to 10% jitter)
+                'MAX_LIFETIME': float(os.environ.get('DATABASE_POOL_MAX_LIFETIME', '1800')),
+                # Seconds an idle connection beyond MIN_SIZE is kept
+                'MAX_IDLE': float(os.environ.get('DATABASE_POOL_MAX_IDLE', '300')),
+                # Seconds idle after which a connection is pinged before reuse
+                'CHECK_AFTER': float(os.environ.get('DATABASE_POOL_CHECK_AFTER', '30')),
+            },
+        )
+
+# Cache
+# Shared by all gunicorn workers: rate limits (django-ratelimit) and the
+# namespaced caches in ashwini_backend.cache. CACHE_URL selects the backend:
+#   redis://host:6379/0, memcached://host:11211, file:///path, locmem://, dummy://
+# Without CACHE_URL, REDIS_URL is used when present, otherwise a file cache in
+# the temp dir (shared by the workers of one container, not across instances).
+# Only Redis and Memcached make the cache locks and version bumps atomic; on
+# the others stampede protection and invalidation are best-effort (see
+# ashwini_backend.cache) and the server warns at startup.
+CACHE_URL = (
+    os.environ.get('CACHE_URL')
+    or os.environ.get('REDIS_URL')
+    or 'file://' + os.path.join(tempfile.gettempdir(), 'ashwini-cache')
+)
+CACHES = {
+    'default': cache_url.parse(
+        CACHE_URL,
+        timeout=int(os.environ.get('CACHE_TIMEOUT', '300')),
+        max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '5000')),
+    ),
+}
+RATELIMIT_USE_CACHE = 'default'
+
+# Seconds a cached patient payload (detail, prescription, portal profile) may
+# live; writes invalidate it immediately through patients.signals anyway
+PATIENT_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('PATIENT_RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Days of patients.ChangeLog kept for the portal delta sync (prune_changelog);
+# older sync tokens get a full snapshot instead
+SYNC_CHANGELOG_RETENTION_DAYS = int(os.environ.get('SYNC_CHANGELOG_RETENTION_DAYS', '30'))
+# Seconds within which a change may still be committing: sync tokens stop
+# before newer change-log entries, which are sent again next time
+SYNC_COMMIT_MARGIN_SECONDS = int(os.environ.get('SYNC_COMMIT_MARGIN_SECONDS', '60'))
+
+# Country calling code given to phone numbers entered without one when
+# patients are matched on their E.164 phone number (patients.matching)
+PATIENT_PHONE_COUNTRY_CODE = os.environ.get('PATIENT_PHONE_COUNTRY_CODE', '91').lstrip('+')
+
+# Device long polling (GET /api/devices/<id>/command/?wait=N, ASGI only):
+# longest wait a device may ask for, and how often a waiting poll checks
+# the cache for a newly queued session
+DEVICE_COMMAND_MAX_WAIT = float(os.environ.get('DEVICE_COMMAND_MAX_WAIT', '25'))
+DEVICE_COMMAND_POLL_INTERVAL = float(os.environ.get('DEVICE_COMMAND_POLL_INTERVAL', '1'))
+
+# Server-sent event feeds (patients.events): seconds between change log
+# reads, of silence before a keep-alive comment, and before a stream is
+# closed for the client to reconnect
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', '2'))
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', '15'))
+SSE_MAX_DURATION = float(os.environ.get('SSE_MAX_DURATION', '300'))
+
+# Smallest response body (bytes) CompressionMiddleware compresses; below
+# this the compression overhead outweighs the bytes saved
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -164,23 +287,15 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Media files (User uploads)
 # In production, use Cloudinary for persistent storage
-if not DEBUG and os.getenv('CLOUDINARY_CLOUD_NAME') and cloudinary:
-    # Cloudinary Configuration
+if USE_CLOUDINARY:
+    # Cloudinary Configuration (django-cloudinary-storage passes it to the SDK)
     CLOUDINARY_STORAGE = {
         'CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME'),
         'API_KEY': os.getenv('CLOUDINARY_API_KEY'),
         'API_SECRET': os.getenv('CLOUDINARY_API_SECRET'),
+        'SECURE': True,
     }
     
-    # Initialize cloudinary
-    if cloudinary:
-        cloudinary.config(
-            cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-            api_key=os.getenv('CLOUDINARY_API_KEY'),
-            api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-            secure=True
-        )
-    
     DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
     MEDIA_URL = '/media/'  # Cloudinary will handle the actual URL
 else:
@@ -198,11 +313,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
+    # orjson-backed drop-ins for JSONRenderer/JSONParser (same output);
+    # they fall back to the stdlib json versions when orjson isn't installed
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'ashwini_backend.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'ashwini_backend.parsers.ORJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
@@ -214,6 +331,31 @@ REST_FRAMEWORK = {
     # Instead, we apply permissions per-view or per-viewset
 }
 
+# Query Budgets (monitoring.middleware.QueryBudgetMiddleware)
+# Views declare query budgets; exceeding one or repeating the same SQL shape
+# QUERY_BUDGET_DUPLICATE_THRESHOLD times in a request (N+1) is logged as a warning.
+# Set QUERY_BUDGET_STRICT=True locally/in tests to raise instead.
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+QUERY_BUDGET_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_BUDGET_DUPLICATE_THRESHOLD', '5'))
+
+# Metrics (monitoring.metrics, scraped at /api/metrics/)
+# Each worker snapshots its metrics to METRICS_DIR every METRICS_FLUSH_INTERVAL
+# seconds; the endpoint merges them, so it must be shared by all workers of a
+# container. Scrapers send `Authorization: Bearer <METRICS_TOKEN>`; with no
+# METRICS_TOKEN the endpoint is closed unless DEBUG is on.
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'ashwini-metrics'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Request Profiler (monitoring.profiler.ProfilerMiddleware)
+# ADMIN users add ?__profile=1 (cProfile) or ?__profile=sample (stack sampling)
+# to profile a request; the newest PROFILER_MAX_PROFILES are kept in PROFILER_DIR
+# and browsed in Django admin. PROFILER_ENABLED=False removes the middleware.
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'True') == 'True'
+PROFILER_DIR = os.environ.get('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'ashwini-profiles'))
+PROFILER_MAX_PROFILES = int(os.environ.get('PROFILER_MAX_PROFILES', '50'))
+PROFILER_SAMPLE_INTERVAL = float(os.environ.get('PROFILER_SAMPLE_INTERVAL', '0.005'))
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
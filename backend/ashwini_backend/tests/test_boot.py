@@ -0,0 +1,30 @@
+import os
+from unittest import mock
+
+from django.test import TestCase
+
+from ashwini_backend import boot
+from monitoring.models import ReleaseState
+
+
+@mock.patch.dict(os.environ, {'DJANGO_SUPERUSER_PASSWORD': ''})
+class ReleaseStateTests(TestCase):
+    def release(self):
+        timings = boot.Timings()
+        pending = boot.release(timings, only_changed=True)
+        return pending, {name: note for name, _, note in timings.steps}
+
+    def test_fingerprints_are_kept_in_the_database(self):
+        self.assertEqual(self.release()[1]['migrations'], 'up to date')
+        self.assertEqual(
+            list(ReleaseState.objects.values_list('step', 'fingerprint')),
+            [('migrations', boot.migrations_fingerprint(boot.disk_migrations()))],
+        )
+        # As on a new container: nothing but the database carries over
+        with self.assertNumQueries(1):
+            self.assertEqual(self.release()[1]['migrations'], 'unchanged')
+
+    def test_changed_migrations_are_checked_again(self):
+        ReleaseState.objects.create(step='migrations', fingerprint='0' * 64)
+        self.assertEqual(self.release()[1]['migrations'], 'up to date')
+        self.assertNotEqual(ReleaseState.objects.get(step='migrations').fingerprint, '0' * 64)
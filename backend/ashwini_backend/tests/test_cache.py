@@ -0,0 +1,12 @@
+from django.test import SimpleTestCase, override_settings
+
+from ashwini_backend import cache_url
+from ashwini_backend.cache import is_atomic
+
+
+class IsAtomicTests(SimpleTestCase):
+    def test_backends(self):
+        for scheme, atomic in (('redis', True), ('memcached', True), ('file', False), ('locmem', False)):
+            backend, _ = cache_url.BACKENDS[scheme]
+            with self.subTest(scheme=scheme), override_settings(CACHES={'default': {'BACKEND': backend}}):
+                self.assertEqual(is_atomic(), atomic)
@@ -0,0 +1,132 @@
+import gzip
+import json
+from unittest import mock, skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ashwini_backend import compression
+from ashwini_backend.compression import CompressionMiddleware, negotiate
+from patients.models import CustomUser, Patient
+
+BODY = json.dumps([{'id': i, 'name': 'Meena Rao', 'status': 'waiting'} for i in range(100)]).encode()
+
+
+class NegotiateTests(SimpleTestCase):
+    def negotiate(self, accept_encoding):
+        return negotiate(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    @mock.patch.object(compression, 'brotli', object())  # Only its presence counts here
+    def test_with_brotli(self):
+        for header, expected in (
+            ('', None),
+            ('gzip', 'gzip'),
+            ('gzip, deflate, br', 'br'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('br;q=0, gzip;q=0.1', 'gzip'),
+            ('gzip;q=0', None),
+            ('identity', None),
+            ('*', 'br'),
+            ('*;q=0', None),
+            ('br;q=0, *', 'gzip'),
+            ('gzip;q=0, *;q=0.5', 'br'),
+            ('GZIP ; q=1', 'gzip'),
+            ('gzip;q=oops', None),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(self.negotiate(header), expected)
+
+    def test_without_brotli(self):
+        with mock.patch.object(compression, 'brotli', None):
+            for header, expected in (
+                ('br', None),
+                ('br, gzip;q=0.5', 'gzip'),
+                ('*', 'gzip'),
+                ('br, gzip;q=0', None),
+            ):
+                with self.subTest(header=header):
+                    self.assertEqual(self.negotiate(header), expected)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_strong_etag_becomes_weak(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = '"v1"'
+        response = self.respond(response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_weak_etag_is_kept(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = 'W/"v1"'
+        response = self.respond(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+
+    def test_uncompressed_etag_is_kept(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = '"v1"'
+        response = self.respond(response, 'gzip;q=0')
+        self.assertEqual(response['ETag'], '"v1"')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_left_alone(self):
+        small = HttpResponse(b'{}', content_type='application/json')
+        html = HttpResponse(BODY, content_type='text/html')
+        no_transform = HttpResponse(BODY, content_type='application/json')
+        no_transform['Cache-Control'] = 'no-transform'
+        encoded = HttpResponse(BODY, content_type='application/json')
+        encoded['Content-Encoding'] = 'identity'
+        streaming = StreamingHttpResponse(iter([BODY]), content_type='application/json')
+        for name, response in (
+            ('small', small), ('html', html), ('no-transform', no_transform),
+            ('encoded', encoded), ('streaming', streaming),
+        ):
+            with self.subTest(name):
+                response = self.respond(response)
+                self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+
+
+@override_settings(COMPRESSION_MIN_SIZE=0)
+class CompressedEndpointTests(APITestCase):
+    def setUp(self):
+        nurse = CustomUser.objects.create_user(username='nurse', password='unused', role='NURSE')
+        self.client.force_authenticate(nurse)
+        for i in range(20):
+            Patient.objects.create(name=f'Patient {i}', age=30, gender='Female', phone=f'98450{i:05d}')
+
+    def get(self, accept_encoding):
+        return self.client.get(reverse('patient-list'), headers={'Accept-Encoding': accept_encoding})
+
+    def test_encodings(self):
+        plain = self.get('identity')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.get('br;q=0, *')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+        self.assertNotIn('Content-Encoding', self.get('gzip;q=0'))
+
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertNotIn('Content-Encoding', self.get('br'))
+            self.assertEqual(self.get('br, gzip;q=0.5')['Content-Encoding'], 'gzip')
+
+    @skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        plain = self.get('identity')
+        response = self.get('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), plain.content)
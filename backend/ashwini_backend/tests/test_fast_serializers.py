@@ -0,0 +1,54 @@
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from ashwini_backend.renderers import ORJSONRenderer
+from measurements.models import Measurement
+from measurements.serializers import MeasurementSerializer, MeasurementValuesSerializer
+from patients.models import Patient
+from patients.serializers import PatientListSerializer, PatientListValuesSerializer
+from reports.models import Report
+from reports.serializers import ReportListSerializer, ReportListValuesSerializer
+
+
+class ValuesSerializerEquivalenceTests(TestCase):
+    """ValuesSerializer output renders to the same bytes as its ModelSerializer's."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # No current visit: the visit fields are left out, reason is null
+        no_visit = Patient.objects.create(name='Imran Khan', age=40, gender='Male', phone='9845012345')
+        waiting = Patient.objects.create(name='Laxmi Devi', age=62, gender='Female', phone='')
+        waiting.start_visit(reason='Fever')
+        assessed = Patient.objects.create(name='Anil Verma', age=35, gender='Male', phone='9845012346')
+        assessed.start_visit(reason='', notes='Follow up')
+        assessed.update_visit(health_status='critical', priority_score=90, last_assessment_time=timezone.now())
+
+        Measurement.objects.create(patient=no_visit, heart_rate=72, spo2=97.5)
+        Measurement.objects.create(patient=waiting, blood_pressure='120/80', temperature=38.2, source='device')
+        Report.objects.create(patient=assessed, report_image='reports/scan.png', extracted_text='Hb 13.2 g/dL')
+        Report.objects.create(patient=no_visit, report_image='')
+
+    def assertSameBody(self, queryset, model_serializer, values_serializer):
+        context = {'request': RequestFactory().get('/')}
+        renderer = ORJSONRenderer()
+        expected = renderer.render(model_serializer(queryset, many=True, context=context).data)
+        actual = renderer.render(values_serializer(queryset, context=context).data)
+        self.assertEqual(actual, expected)
+
+    def test_patients(self):
+        self.assertSameBody(Patient.objects.order_by('pk'), PatientListSerializer, PatientListValuesSerializer)
+
+    def test_patient_without_a_visit(self):
+        data = PatientListValuesSerializer(Patient.objects.filter(current_visit__isnull=True)).data
+        self.assertEqual(data[0]['reason'], None)
+        self.assertNotIn('status', data[0])
+        self.assertNotIn('visit_time', data[0])
+
+    def test_measurements(self):
+        self.assertSameBody(Measurement.objects.order_by('pk'), MeasurementSerializer, MeasurementValuesSerializer)
+
+    def test_reports(self):
+        self.assertSameBody(
+            ReportListSerializer.setup_queryset(Report.objects.select_related('patient').order_by('pk')),
+            ReportListSerializer, ReportListValuesSerializer,
+        )
@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ashwini_backend.fieldsets import requested_fields
+from patients.models import Patient
+from patients.serializers import PatientDetailSerializer
+from prescriptions.models import Prescription
+
+
+class RequestedFieldsTests(SimpleTestCase):
+    def fields(self, query):
+        return requested_fields(Request(APIRequestFactory().get(f'/api/patients/1/?{query}')), PatientDetailSerializer)
+
+    def test_default_set(self):
+        self.assertIsNone(self.fields(''))
+
+    def test_fields_and_expand(self):
+        self.assertEqual(self.fields('fields=name,id&expand=prescription'), ('id', 'name', 'prescription'))
+
+    def test_expand_alone_keeps_the_default_set(self):
+        # Every field, which already embeds the expandable relations
+        self.assertIsNone(self.fields('expand=prescription'))
+        self.assertIn('prescription', PatientDetailSerializer().fields)
+
+    def test_unknown_names_are_rejected(self):
+        for query in ('fields=id,nope', 'expand=nope', 'fields=id&expand=name'):
+            with self.subTest(query=query), self.assertRaises(ValidationError):
+                self.fields(query)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ExpandApiTests(TestCase):
+    def test_expand_alone(self):
+        patient = Patient.objects.create(name='Laxmi Devi', age=62, gender='Female', phone='9845012345')
+        Prescription.objects.create(patient=patient)
+        response = self.client.get(f'/api/patients/{patient.pk}/?expand=prescription')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('prescription', response.json())
+        self.assertEqual(self.client.get(f'/api/patients/{patient.pk}/?expand=nope').status_code, 400)
@@ -0,0 +1,201 @@
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ashwini_backend.pooled_postgresql import pool as pool_module
+from ashwini_backend.pooled_postgresql.pool import ACTIVE, IDLE, INERROR, INTRANS, ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Enough of a psycopg2 connection for the pool."""
+
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=IDLE)
+        self.healthy = True
+        self.rollback_fails = False
+        self.queries = []
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                if not connection.healthy:
+                    raise OSError('server closed the connection unexpectedly')
+                connection.queries.append(sql)
+        return Cursor()
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise OSError('connection already closed')
+        self.info.transaction_status = IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Clock:
+    """Stands in for the pool's `time` module, moved forward by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.opened = []
+        self.clock = Clock()
+        patcher = mock.patch.object(pool_module, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def make_pool(self, **options):
+        pool = ConnectionPool('test', self.connect, **options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuses_returned_connections(self):
+        pool = self.make_pool()
+        connection = pool.getconn()
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_checkout_times_out_when_all_are_in_use(self):
+        pool = self.make_pool(max_size=2, timeout=0)
+        pool.getconn()
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['in_use'], 2)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool('test', mock.Mock(side_effect=OSError('refused')), max_size=1)
+        with self.assertRaises(OSError):
+            pool.getconn()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_connections_are_recycled_after_their_lifetime(self):
+        pool = self.make_pool(max_lifetime=100)
+        connection = pool.getconn()
+        self.clock.now += 101
+        # Returned past its lifetime: closed, not kept
+        pool.putconn(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+        connection = pool.getconn()
+        pool.putconn(connection)
+        self.clock.now += 101
+        # Expired while idle: replaced at checkout
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+
+    def test_idle_connections_are_checked_before_reuse(self):
+        pool = self.make_pool(check_after=30)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(connection.queries, [])  # Returned just now: not checked
+
+        pool.putconn(connection)
+        self.clock.now += 31
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(connection.queries, ['SELECT 1'])
+
+    def test_connections_failing_the_check_are_replaced(self):
+        pool = self.make_pool(check_after=30)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        connection.healthy = False
+        self.clock.now += 31
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_putconn_discards_broken_connections(self):
+        pool = self.make_pool()
+        closed = pool.getconn()
+        closed.closed = 2
+        pool.putconn(closed)
+        busy = pool.getconn()
+        busy.info.transaction_status = ACTIVE
+        pool.putconn(busy)
+        failed = pool.getconn()
+        failed.info.transaction_status = INERROR
+        failed.rollback_fails = True
+        pool.putconn(failed)
+        self.assertEqual(pool.stats(), {'size': 0, 'idle': 0, 'in_use': 0, 'waiting': 0, 'max_size': 10})
+        self.assertTrue(busy.closed and failed.closed)
+
+    def test_putconn_rolls_back_open_transactions(self):
+        pool = self.make_pool()
+        connection = pool.getconn()
+        connection.info.transaction_status = INTRANS
+        pool.putconn(connection)
+        self.assertEqual(connection.info.transaction_status, IDLE)
+        self.assertIs(pool.getconn(), connection)
+
+    def test_closed_pool_refuses_checkouts(self):
+        pool = self.make_pool()
+        connection = pool.getconn()
+        pool.putconn(connection)
+        pool.close()
+        self.assertTrue(connection.closed)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+
+class ForkTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(pool_module.close_pools)
+
+    def test_fork_handlers_close_and_forget_pools(self):
+        pool = pool_module.get_pool(('default', 'test'), lambda: ConnectionPool('test', FakeConnection))
+        connection = pool.getconn()
+        pool.putconn(connection)
+
+        pool_module.close_pools()  # before= handler, in the parent
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool_module.pools(), {})
+
+        pool_module.get_pool(('default', 'test'), lambda: ConnectionPool('test', FakeConnection))
+        pool_module._forget_pools()  # after_in_child= handler
+        self.assertEqual(pool_module.pools(), {})
+
+    def test_child_starts_without_pools(self):
+        if not hasattr(os, 'register_at_fork'):
+            self.skipTest('os.register_at_fork is not available')
+        pool = pool_module.get_pool(('default', 'test'), lambda: ConnectionPool('test', FakeConnection))
+        connection = pool.getconn()
+        pool.putconn(connection)
+
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - the child reports through its exit status
+            os._exit(0 if not pool_module.pools() and connection.closed else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        # The parent's pools were closed before forking
+        self.assertTrue(connection.closed)
@@ -0,0 +1,36 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ashwini_backend import replicas
+from patients.models import Patient
+from patients.response_cache import cached_patient_response
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PrimaryReadsTests(SimpleTestCase):
+    router = replicas.ReplicaRouter()
+
+    def setUp(self):
+        state = replicas.RequestState(RequestFactory().get('/api/patients/1/'))
+        state.alias = 'replica_1'  # As if chosen at the request's first read
+        token = replicas._request_state.set(state)
+        self.addCleanup(replicas._request_state.reset, token)
+
+    def test_safe_request_reads_replica(self):
+        self.assertEqual(self.router.db_for_read(Patient), 'replica_1')
+
+    def test_primary_reads_reads_primary(self):
+        with replicas.primary_reads():
+            self.assertEqual(self.router.db_for_read(Patient), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(Patient), 'replica_1')
+
+    def test_cache_fill_reads_primary(self):
+        read_from = []
+
+        def build():
+            read_from.append(self.router.db_for_read(Patient))
+            return {'id': 1}
+
+        request = RequestFactory().get('/api/patients/1/')
+        cached_patient_response(request, 1, 'detail', build)
+        self.assertEqual(read_from, [DEFAULT_DB_ALIAS])
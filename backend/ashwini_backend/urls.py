@@ -10,6 +10,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 
+from monitoring.views import metrics_view
+
 def health_check(request):
     """Health check endpoint for deployment platforms"""
     return JsonResponse({'status': 'healthy', 'service': 'ashwini-backend'})
@@ -17,6 +19,7 @@ def health_check(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/health/', health_check, name='health_check'),
+    path('api/metrics/', metrics_view, name='metrics'),  # Prometheus scrape endpoint
     path('api/', include('patients.auth_urls')),  # Authentication endpoints
     path('api/', include('patients.urls')),
     path('api/', include('measurements.urls')),
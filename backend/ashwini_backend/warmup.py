@@ -0,0 +1,122 @@
+"""
+Boot-time warm-up for gunicorn (see gunicorn.conf.py).
+
+With preload_app the master loads the project once and forks the workers
+from it. Whatever the master has built before the fork - imported modules,
+the URL resolver, compiled serializer tables - is shared by every worker
+through copy-on-write, instead of each worker building its own copy on
+its first requests. gc.freeze() then moves these objects out of the
+collector's reach, so collections in the workers don't write to (and
+un-share) their pages.
+
+Connections must not cross the fork - two processes on one socket corrupt
+each other's traffic - so the master closes its database and cache
+connections afterwards, and each worker opens its own in warm_connections(),
+or through its pools' threads with the pooled backend (start_pools()).
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Build the per-process state that requests would otherwise build lazily."""
+    from django.contrib.auth.hashers import get_hashers
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    from ashwini_backend.fast_serializers import ValuesSerializer
+    from reports import providers
+
+    # Imports every urls module and through them the views, serializers and
+    # services; populating compiles the route patterns
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver._populate()
+
+    # DRF imports its renderer, parser, auth and permission classes on first use
+    for name in (
+        'DEFAULT_RENDERER_CLASSES',
+        'DEFAULT_PARSER_CLASSES',
+        'DEFAULT_AUTHENTICATION_CLASSES',
+        'DEFAULT_PERMISSION_CLASSES',
+        'DEFAULT_THROTTLE_CLASSES',
+    ):
+        getattr(api_settings, name)
+    get_hashers()
+    # The Azure/OpenAI SDKs of the configured report analysis services
+    providers.preload()
+
+    for serializer in _subclasses(ValuesSerializer):
+        if serializer.serializer_class is not None:
+            serializer.compile()
+
+
+def close_connections():
+    """Close the master's connections so no worker inherits them."""
+    from django.core.cache import caches
+    from django.db import connections
+
+    from ashwini_backend.pooled_postgresql import pool
+
+    connections.close_all()
+    pool.close_pools()
+    caches.close_all()
+
+
+def start_pools():
+    """Start filling a worker's connection pools (DATABASE_POOL) in the background."""
+    from django.db import connections
+
+    for connection in connections.all():
+        if hasattr(connection, 'pool'):
+            connection.pool.start()
+
+
+def warm_connections(pool=None, threads=1, timeout=10):
+    """
+    Open a worker's database connections before its first request.
+
+    Connections are per thread. A sync worker serves requests on its main
+    thread; a gthread worker on the `threads` threads of its executor
+    `pool`, each of which keeps its own connection (CONN_MAX_AGE).
+    """
+    from django.db import connection
+
+    if not connection.settings_dict['CONN_MAX_AGE']:
+        return  # Closed at the start of every request anyway
+    if pool is None:
+        _connect()
+        return
+
+    barrier = threading.Barrier(threads, timeout=timeout)
+
+    def connect():
+        _connect()
+        try:
+            # Hold the thread until all have connected, so the executor
+            # can't hand two of these to the same thread
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+
+    for _ in range(threads):
+        pool.submit(connect)
+
+
+def _connect():
+    from django.db import connection
+
+    try:
+        connection.ensure_connection()
+    except Exception as exc:
+        # The first request will report it; don't keep the worker from booting
+        logger.warning('Database warm-up failed: %s', exc)
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
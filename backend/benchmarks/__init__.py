@@ -0,0 +1,52 @@
+"""
+Performance benchmarks for the Ashwini backend.
+
+Each module is runnable from the backend directory:
+
+    python -m benchmarks.query_plans --patients 1000000
+
+Benchmarks always run against a throwaway test database (``test_<NAME>``),
+never against the configured database itself.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a standalone benchmark script."""
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ashwini_backend.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """
+    Create (or reuse with keepdb) a migrated test database for the duration
+    of the benchmark and destroy it afterwards.
+    """
+    from django.db import connection, connections
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity,
+        autoclobber=True,
+        serialize=False,
+        keepdb=keepdb
+    )
+    # Read replicas read the test database too, as under the test runner
+    for alias in connections:
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias:
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
@@ -0,0 +1,415 @@
+"""
+Per-endpoint API benchmark with stored baselines.
+
+Seeds a test database with seed_load_data, then drives every route in
+patients/urls.py, measurements/urls.py, devices/urls.py, reports/urls.py
+and patients/patient_portal_urls.py through the Django test client. For
+each route it records the latency distribution, the number of SQL queries
+and the peak Python memory allocated while handling the request.
+
+Usage:
+    python -m benchmarks.endpoints --save-baseline main
+    python -m benchmarks.endpoints --compare main            # exit 1 on regressions
+    python -m benchmarks.endpoints --routes portal --iterations 50
+
+Baselines are stored as JSON in benchmarks/baselines/<name>.json. A route
+regresses when its p95 latency or peak memory grows by more than the
+tolerance, or when it issues more queries than the baseline did.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import setup_django, benchmark_database
+
+BASELINES_DIR = Path(__file__).resolve().parent / 'baselines'
+
+# A private cache per run: no rate-limit counters or cached responses carried
+# over from the app or from earlier runs
+ISOLATED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'}}
+
+# The scrape endpoint is closed without a token unless DEBUG is on
+BENCHMARK_METRICS_TOKEN = 'benchmark-metrics'
+
+# 1x1 transparent PNG used for report uploads
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082'
+)
+
+
+class Route:
+    """
+    A single benchmarked request.
+
+    `path` is a format string filled from the fixture context. `setup`, if
+    given, runs before every (untimed) iteration and returns extra context,
+    e.g. a fresh patient for DELETE. `data` may be a dict or a callable
+    taking the context.
+    """
+
+    def __init__(self, name, method, path, auth='staff', data=None, setup=None, multipart=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.auth = auth
+        self.data = data
+        self.setup = setup
+        self.multipart = multipart
+
+    def build(self, fixtures, iteration):
+        context = dict(fixtures, iteration=iteration)
+        if self.setup:
+            context.update(self.setup(context))
+        data = self.data(context) if callable(self.data) else self.data
+        return self.path.format(**context), data
+
+
+def _scratch_patient(context):
+    from patients.models import Patient
+    from prescriptions.models import Prescription
+
+    patient = Patient.objects.create(name='Scratch Patient', age=30, gender='Other', phone='9000000000')
+    Prescription.objects.create(patient=patient)
+    return {'scratch_patient': patient.id}
+
+
+def _scratch_report(context):
+    from reports.models import Report
+
+    report = Report.objects.create(patient_id=context['patient'], report_image='reports/benchmark.png')
+    return {'scratch_report': report.id}
+
+
+def _upload(context, with_patient=False):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    data = {
+        'report_image': SimpleUploadedFile('report.png', PNG_BYTES, content_type='image/png'),
+        'uploaded_by': 'benchmark',
+    }
+    if with_patient:
+        data['patient'] = context['patient']
+    return data
+
+
+def _new_patient(context):
+    return {
+        'name': f"Benchmark Patient {context['iteration']}",
+        'age': 40,
+        'gender': 'Female',
+        'phone': f"8{context['iteration']:09d}",
+        'reason': 'Routine check-up',
+        'data_collection_consent': True,
+        'data_usage_consent': True,
+        'privacy_policy_acknowledged': True,
+    }
+
+
+def _portal_registration(context):
+    n = context['iteration']
+    return {
+        'username': f'bench_portal_{n}_{time.monotonic_ns()}',
+        'email': f'bench{n}@example.com',
+        'password': 'Bench-pass-2024!',
+        'password_confirm': 'Bench-pass-2024!',
+        'first_name': 'Bench',
+        'last_name': f'User{n}',
+        'phone': f"7{n:09d}",
+        'age': 33,
+        'gender': 'Male',
+        'address': 'Benchmark Street',
+    }
+
+
+def _medicines(context):
+    return {'medicines': [
+        {'name': 'Paracetamol', 'dose': 'twice a day', 'type': 'Tablet', 'quantity': 'Full'},
+        {'name': 'ORS', 'dose': 'once a day', 'type': 'Sachet', 'quantity': f"{context['iteration']} packet"},
+    ]}
+
+
+VITALS = {'blood_pressure': '120/80', 'temperature': 36.9, 'spo2': 97.0, 'heart_rate': 74.0}
+
+ROUTES = [
+    # patients/urls.py
+    Route('patients.list', 'GET', '/api/patients/'),
+    Route('patients.list.waiting', 'GET', '/api/patients/?status=waiting'),
+    Route('patients.list.sparse', 'GET', '/api/patients/?fields=id,name,status,priority_score'),
+    Route('patients.create.new', 'POST', '/api/patients/', data=_new_patient),
+    Route('patients.create.returning', 'POST', '/api/patients/',
+          data=lambda c: {'name': c['patient_name'], 'phone': c['patient_phone'], 'reason': 'Follow-up visit'}),
+    Route('patients.retrieve', 'GET', '/api/patients/{patient}/'),
+    Route('patients.retrieve.sparse', 'GET', '/api/patients/{patient}/?fields=id,name,status&expand=prescription'),
+    Route('patients.update', 'PUT', '/api/patients/{patient}/', data={'notes': 'Benchmark notes'}),
+    Route('patients.partial_update', 'PATCH', '/api/patients/{patient}/', data={'status': 'examined'}),
+    Route('patients.destroy', 'DELETE', '/api/patients/{scratch_patient}/', setup=_scratch_patient),
+    Route('patients.prioritized', 'GET', '/api/patients/prioritized/'),
+    Route('patients.prioritized.critical', 'GET', '/api/patients/prioritized/?health_status=critical'),
+    Route('patients.search.patient_id', 'GET', '/api/patients/search/?q={patient_code}'),
+    Route('patients.search.phone', 'GET', '/api/patients/search/?q={patient_phone}'),
+    Route('patients.search.name', 'GET', '/api/patients/search/?q=Sharma'),
+    Route('patients.assess_health', 'POST', '/api/patients/{patient}/assess_health/'),
+    Route('patients.prescription.get', 'GET', '/api/patients/{patient}/prescription/'),
+    Route('patients.prescription.put', 'PUT', '/api/patients/{patient}/prescription/', data=_medicines),
+    Route('patients.workspace', 'GET', '/api/patients/{patient}/workspace/'),
+    Route('patients.prescription_history', 'GET', '/api/patients/{patient}/prescription-history/'),
+    Route('patients.events', 'GET', '/api/patients/events/?after=0'),
+
+    # measurements/urls.py
+    Route('measurements.latest', 'GET', '/api/patients/{patient}/measurements/latest/'),
+    Route('measurements.list', 'GET', '/api/patients/{patient}/measurements/'),
+    Route('measurements.create', 'POST', '/api/patients/{patient}/measurements/', data=VITALS),
+
+    # devices/urls.py
+    Route('devices.command', 'GET', '/api/devices/{device}/command/', auth=None),
+    Route('devices.measurements.create', 'POST', '/api/devices/{device}/measurements/', auth=None,
+          data=lambda c: dict(VITALS, patient_id=c['patient'])),
+    Route('devices.sessions.create', 'POST', '/api/measurement-sessions/',
+          data=lambda c: {'patient': c['patient'], 'device': c['device_pk']}),
+
+    # reports/urls.py
+    Route('reports.list', 'GET', '/api/reports/'),
+    Route('reports.list.sparse', 'GET', '/api/reports/?fields=id,patient,uploaded_at,analysis_status'),
+    Route('reports.create', 'POST', '/api/reports/', multipart=True,
+          data=lambda c: _upload(c, with_patient=True)),
+    Route('reports.retrieve', 'GET', '/api/reports/{report}/'),
+    Route('reports.partial_update', 'PATCH', '/api/reports/{report}/', data={'doctor_notes': 'Reviewed'}),
+    Route('reports.destroy', 'DELETE', '/api/reports/{scratch_report}/', setup=_scratch_report),
+    Route('reports.reanalyze', 'POST', '/api/reports/{report}/reanalyze/'),
+    Route('reports.patient.list', 'GET', '/api/patients/{patient}/reports/'),
+    Route('reports.patient.create', 'POST', '/api/patients/{patient}/reports/', multipart=True, data=_upload),
+    Route('reports.patient.latest', 'GET', '/api/patients/{patient}/reports/latest/'),
+    Route('reports.analysis', 'GET', '/api/reports/{report}/analysis/'),
+
+    # patients/patient_portal_urls.py
+    Route('portal.register', 'POST', '/api/patient-portal/register/', auth=None, data=_portal_registration),
+    Route('portal.profile', 'GET', '/api/patient-portal/profile/', auth='patient'),
+    Route('portal.measurements', 'GET', '/api/patient-portal/measurements/', auth='patient'),
+    Route('portal.prescription', 'GET', '/api/patient-portal/prescription/', auth='patient'),
+    Route('portal.prescription_history', 'GET', '/api/patient-portal/prescription-history/', auth='patient'),
+    Route('portal.visits', 'GET', '/api/patient-portal/visits/', auth='patient'),
+    Route('portal.consent_status', 'GET', '/api/patient-portal/consent-status/', auth='patient'),
+    Route('portal.dashboard', 'GET', '/api/patient-portal/dashboard/', auth='patient'),
+    Route('portal.dashboard.mobile', 'GET', '/api/patient-portal/dashboard/?sections=profile,measurements&limit=5',
+          auth='patient'),
+    Route('portal.sync', 'GET', '/api/patient-portal/sync/', auth='patient'),
+    Route('portal.events', 'GET', '/api/patient-portal/events/?after=0', auth='patient'),
+    Route('portal.give_consent', 'POST', '/api/patient-portal/give-consent/', auth='patient',
+          data={'portal_consent_given': True}),
+
+    # ashwini_backend/urls.py
+    Route('metrics', 'GET', '/api/metrics/', auth='metrics'),
+]
+
+
+def build_fixtures():
+    """Pick the busiest seeded patient and create the users/devices the routes need."""
+    from django.db.models import Count
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from patients.models import CustomUser, Patient
+    from devices.models import Device
+    from reports.models import Report
+
+    patient = Patient.objects.annotate(n=Count('measurements')).order_by('-n', 'id').first()
+    report = Report.objects.filter(patient=patient).first() or Report.objects.create(
+        patient=patient, report_image='reports/benchmark.png', analysis_status='completed',
+        extracted_text='Benchmark report', key_phrases=['Normal ECG']
+    )
+    device = Device.objects.order_by('id').first() or Device.objects.create(device_id='BENCH-001', name='Kiosk 1')
+
+    staff = CustomUser.objects.create_user(username='bench_admin', password='unused', role='ADMIN')
+    portal_user = CustomUser.objects.create_user(username='bench_patient', password='unused', role='PATIENT')
+    patient.user = portal_user
+    patient.save(update_fields=['user'])
+
+    fixtures = {
+        'patient': patient.id,
+        'patient_code': patient.patient_id,
+        'patient_name': patient.name,
+        'patient_phone': patient.phone,
+        'report': report.id,
+        'device': device.device_id,
+        'device_pk': device.id,
+    }
+    tokens = {
+        'staff': str(RefreshToken.for_user(staff).access_token),
+        'patient': str(RefreshToken.for_user(portal_user).access_token),
+        'metrics': BENCHMARK_METRICS_TOKEN,
+    }
+    return fixtures, tokens
+
+
+def send(client, route, path, data, tokens):
+    headers = {}
+    if route.auth:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {tokens[route.auth]}'
+    method = getattr(client, route.method.lower())
+    if route.method == 'GET':
+        return method(path, **headers)
+    if route.multipart:
+        return method(path, data=data or {}, **headers)
+    return method(path, data=json.dumps(data or {}), content_type='application/json', **headers)
+
+
+def run_route(client, route, fixtures, tokens, iterations, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies, queries, statuses = [], [], set()
+    for i in range(warmup + iterations):
+        path, data = route.build(fixtures, i)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = send(client, route, path, data, tokens)
+            elapsed = (time.perf_counter() - started) * 1000
+        if i >= warmup:
+            latencies.append(elapsed)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+
+    # Peak memory in a separate pass so tracemalloc overhead stays out of the latencies
+    path, data = route.build(fixtures, warmup + iterations)
+    tracemalloc.start()
+    send(client, route, path, data, tokens)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 3)
+
+    return {
+        'status_codes': sorted(statuses),
+        'iterations': iterations,
+        'latency_ms': {
+            'min': round(ordered[0], 3),
+            'mean': round(statistics.fmean(ordered), 3),
+            'p50': pct(50),
+            'p90': pct(90),
+            'p95': pct(95),
+            'p99': pct(99),
+            'max': round(ordered[-1], 3),
+        },
+        'queries': {'min': min(queries), 'max': max(queries)},
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, latency_tolerance, memory_tolerance, query_tolerance):
+    """Return a list of human-readable regression descriptions."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous:
+            continue
+        p95, base_p95 = current['latency_ms']['p95'], previous['latency_ms']['p95']
+        if p95 > base_p95 * (1 + latency_tolerance):
+            regressions.append(f'{name}: p95 {base_p95:.2f}ms -> {p95:.2f}ms')
+        q, base_q = current['queries']['max'], previous['queries']['max']
+        if q > base_q + query_tolerance:
+            regressions.append(f'{name}: queries {base_q} -> {q}')
+        mem, base_mem = current['peak_memory_kb'], previous['peak_memory_kb']
+        if mem > base_mem * (1 + memory_tolerance):
+            regressions.append(f'{name}: peak memory {base_mem:.0f}KB -> {mem:.0f}KB')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=2000, help='Patients to seed (default: 2000)')
+    parser.add_argument('--measurements', type=int, default=None,
+                        help='Measurements to seed (default: seed_load_data default)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=20, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per route')
+    parser.add_argument('--routes', help='Only run routes whose name contains this substring')
+    parser.add_argument('--keepdb', action='store_true', help='Reuse an already seeded test database')
+    parser.add_argument('--save-baseline', metavar='NAME', help='Store results as benchmarks/baselines/NAME.json')
+    parser.add_argument('--compare', metavar='NAME', help='Compare against benchmarks/baselines/NAME.json')
+    parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                        help='Allowed relative p95 latency growth (default: 0.25)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help='Allowed relative peak memory growth (default: 0.25)')
+    parser.add_argument('--query-tolerance', type=int, default=0,
+                        help='Allowed extra queries per request (default: 0)')
+    parser.add_argument('--output', help='Also write raw results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment, override_settings
+
+    setup_test_environment()
+    # The views log every upload/analysis step; keep the table readable
+    logging.disable(logging.WARNING)
+
+    routes = [r for r in ROUTES if not args.routes or args.routes in r.name]
+    results = {}
+
+    with benchmark_database(keepdb=args.keepdb), tempfile.TemporaryDirectory() as media_root, \
+            override_settings(MEDIA_ROOT=media_root, CACHES=ISOLATED_CACHES, METRICS_TOKEN=BENCHMARK_METRICS_TOKEN):
+        from patients.models import Patient
+
+        if not Patient.objects.exists():
+            seed_options = {'measurements': args.measurements} if args.measurements is not None else {}
+            call_command('seed_load_data', patients=args.patients, seed=args.seed, **seed_options)
+        fixtures, tokens = build_fixtures()
+        client = Client()
+
+        print(f"\n{'route':<34}{'status':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'peak KB':>10}")
+        for route in routes:
+            result = run_route(client, route, fixtures, tokens, args.iterations, args.warmup)
+            results[route.name] = result
+            lat = result['latency_ms']
+            codes = ','.join(str(c) for c in result['status_codes'])
+            print(f"{route.name:<34}{codes:>8}{lat['p50']:>10.2f}{lat['p95']:>10.2f}{lat['p99']:>10.2f}"
+                  f"{result['queries']['max']:>9}{result['peak_memory_kb']:>10.1f}")
+        vendor = connection.vendor
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'vendor': vendor,
+        'patients': args.patients,
+        'iterations': args.iterations,
+        'routes': results,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f'\nWrote {args.output}')
+
+    if args.save_baseline:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        path = BASELINES_DIR / f'{args.save_baseline}.json'
+        path.write_text(json.dumps(report, indent=2))
+        print(f'\nSaved baseline {path}')
+
+    if args.compare:
+        path = BASELINES_DIR / f'{args.compare}.json'
+        baseline = json.loads(path.read_text())
+        regressions = compare(results, baseline, args.latency_tolerance, args.memory_tolerance, args.query_tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) against {path.name}:')
+            for line in regressions:
+                print(f'  ✗ {line}')
+            sys.exit(1)
+        print(f'\n✓ No regressions against {path.name}')
+
+
+if __name__ == '__main__':
+    main()
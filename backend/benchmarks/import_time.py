@@ -0,0 +1,114 @@
+"""
+Import-time benchmark: what a process pays in imports before it does any
+work, measured with `python -X importtime` in a fresh interpreter per run.
+
+Scenarios:
+
+    command   django.setup() - every management command
+    web       + the URLconf, i.e. every view - a web worker, and commands
+              that run the system checks (check, migrate, release)
+    web+sdks  + the Azure/OpenAI SDKs (reports.providers.preload(force=True))
+              - what `web` cost while reports.services imported them at
+              module level, and what the gunicorn master preloads when the
+              services are configured
+
+For each: total import time, peak RSS, and the packages that take longest
+(self time summed per top-level package).
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from benchmarks import BACKEND_DIR
+
+
+SETUP = (
+    "import os, resource\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ashwini_backend.settings')\n"
+    "import django\n"
+    "django.setup()\n"
+)
+URLS = "from django.urls import get_resolver\nget_resolver().url_patterns\n"
+SDKS = "from reports import providers\nproviders.preload(force=True)\n"
+REPORT = "print('maxrss', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+
+SCENARIOS = {
+    'command': SETUP,
+    'web': SETUP + URLS,
+    'web+sdks': SETUP + URLS + SDKS,
+}
+
+# Reported in every scenario, imported or not
+WATCHED = ('azure', 'openai', 'cloudinary', 'cloudinary_storage')
+
+
+def run(code):
+    """({top-level package: self µs}, peak RSS in KiB) of one interpreter running `code`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env={**os.environ, 'PYTHONWARNINGS': 'ignore'},
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr)
+
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # The header
+        packages[name.strip().split('.')[0]] += int(self_us)
+    maxrss = int(result.stdout.split('maxrss')[-1])
+    return packages, maxrss
+
+
+def measure(code, repeat):
+    runs = [run(code + REPORT) for _ in range(repeat)]
+    names = set().union(*(packages for packages, _ in runs))
+    packages = {name: statistics.median(p.get(name, 0) for p, _ in runs) / 1000 for name in names}
+    return {
+        'import_ms': round(statistics.median(sum(p.values()) for p, _ in runs) / 1000, 1),
+        'maxrss_mb': round(statistics.median(rss for _, rss in runs) / 1024, 1),
+        'packages_ms': {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda i: -i[1])},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Interpreters per scenario (default: 3)')
+    parser.add_argument('--top', type=int, default=10, help='Slowest packages to list per scenario')
+    parser.add_argument('--output', help='Also write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    results = {name: measure(code, args.repeat) for name, code in SCENARIOS.items()}
+
+    print(f"\n{'scenario':<12}{'import ms':>11}{'peak RSS MB':>13}" + ''.join(f'{name:>20}' for name in WATCHED))
+    for name, r in results.items():
+        print(
+            f"{name:<12}{r['import_ms']:>11.0f}{r['maxrss_mb']:>13.1f}"
+            + ''.join(f"{r['packages_ms'].get(package, 0):>20.0f}" for package in WATCHED)
+        )
+
+    for name, r in results.items():
+        print(f'\nSlowest imports, {name} (ms):')
+        for package, ms in list(r['packages_ms'].items())[:args.top]:
+            print(f'  {package:<32}{ms:>8.1f}')
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        print(f'\nWrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+JSON codec benchmark: DRF's JSONRenderer/JSONParser vs. the orjson-backed
+ashwini_backend.renderers.ORJSONRenderer / parsers.ORJSONParser.
+
+Seeds a test database, requests the heaviest GET endpoints once to capture
+their response data, then times rendering that data and parsing the
+rendered body back with both codecs. Rendered bodies must be byte-identical
+and parsed values equal.
+
+Usage:
+    python -m benchmarks.json_codec
+    python -m benchmarks.json_codec --patients 10000 --repeat 10
+"""
+
+import argparse
+import io
+import json
+import statistics
+import time
+
+from benchmarks import setup_django, benchmark_database
+
+
+# Routes from benchmarks.endpoints with the largest response bodies
+HEAVY_ROUTES = [
+    'patients.list',
+    'patients.prioritized',
+    'patients.workspace',
+    'measurements.list',
+    'reports.list',
+    'portal.measurements',
+    'portal.dashboard',
+    'portal.sync',
+]
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(timings), 3)
+
+
+def measure(data, repeat):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from ashwini_backend.parsers import ORJSONParser
+    from ashwini_backend.renderers import ORJSONRenderer
+
+    stdlib_body, stdlib_render = timed(lambda: JSONRenderer().render(data), repeat)
+    orjson_body, orjson_render = timed(lambda: ORJSONRenderer().render(data), repeat)
+    stdlib_data, stdlib_parse = timed(lambda: JSONParser().parse(io.BytesIO(stdlib_body)), repeat)
+    orjson_data, orjson_parse = timed(lambda: ORJSONParser().parse(io.BytesIO(stdlib_body)), repeat)
+    return {
+        'bytes': len(stdlib_body),
+        'identical': stdlib_body == orjson_body and stdlib_data == orjson_data,
+        'render_ms': {'json': stdlib_render, 'orjson': orjson_render},
+        'parse_ms': {'json': stdlib_parse, 'orjson': orjson_parse},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=2000, help='Patients to seed (default: 2000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed renders/parses per payload')
+    parser.add_argument('--keepdb', action='store_true', help='Reuse an already seeded test database')
+    parser.add_argument('--output', help='Also write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    from django.test import Client
+    from django.test.utils import override_settings
+    from benchmarks.endpoints import ISOLATED_CACHES, ROUTES, build_fixtures, send
+
+    results = {}
+    with override_settings(CACHES=ISOLATED_CACHES), benchmark_database(keepdb=args.keepdb):
+        from django.core.management import call_command
+        from patients.models import Patient
+
+        if not Patient.objects.exists():
+            call_command('seed_load_data', patients=args.patients, seed=args.seed, verbosity=0)
+
+        fixtures, tokens = build_fixtures()
+        client = Client()
+        for route in ROUTES:
+            if route.name not in HEAVY_ROUTES:
+                continue
+            path, data = route.build(fixtures, 0)
+            response = send(client, route, path, data, tokens)
+            # Cached patient payloads come back as pre-rendered bytes
+            data = getattr(response, 'data', None)
+            if data is None:
+                data = json.loads(response.content)
+            results[route.name] = measure(data, args.repeat)
+
+    print(f"\n{'route':<24}{'KiB':>8}{'render json':>13}{'orjson':>9}{'parse json':>12}{'orjson':>9}  identical")
+    for name, r in results.items():
+        print(
+            f"{name:<24}{r['bytes'] / 1024:>8.0f}"
+            f"{r['render_ms']['json']:>13.2f}{r['render_ms']['orjson']:>9.2f}"
+            f"{r['parse_ms']['json']:>12.2f}{r['parse_ms']['orjson']:>9.2f}"
+            f"  {'yes' if r['identical'] else 'NO'}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'patients': args.patients, 'results': results}, fh, indent=2)
+        print(f'\nWrote {args.output}')
+
+    if not all(r['identical'] for r in results.values()):
+        raise SystemExit('orjson output differs from the stdlib json output')
+
+
+if __name__ == '__main__':
+    main()
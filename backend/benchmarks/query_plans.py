@@ -0,0 +1,199 @@
+"""
+Query plan benchmark for the hot-path composite and partial indexes.
+
+Seeds a test database with the seed_load_data command, then EXPLAINs and times every hot query twice:
+once with the query-pattern indexes dropped ("before") and once with them
+in place ("after"). The indexes under test are the ones declared in the
+models' Meta.indexes (patients 0007/0009, measurements 0002, reports 0002,
+devices 0002, prescriptions 0003).
+
+Usage:
+    python -m benchmarks.query_plans                    # 1M patients
+    python -m benchmarks.query_plans --patients 50000 --output plans.json
+
+On PostgreSQL the plans come from EXPLAIN ANALYZE; on SQLite from
+EXPLAIN QUERY PLAN.
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks import setup_django, benchmark_database
+
+
+INDEXED_MODELS = [
+    ('patients', 'Patient'),
+    ('patients', 'Visit'),
+    ('measurements', 'Measurement'),
+    ('reports', 'Report'),
+    ('devices', 'MeasurementSession'),
+    ('prescriptions', 'PrescriptionHistory'),
+]
+
+
+def hot_queries(sample):
+    """
+    The filters and orderings the API actually issues, keyed by name.
+    `sample` holds real ids/values picked from the seeded data.
+    """
+    from patients.models import Patient, Visit
+    from measurements.models import Measurement
+    from reports.models import Report
+    from devices.models import MeasurementSession
+    from prescriptions.models import PrescriptionHistory
+
+    return {
+        # PatientViewSet.list ?status=waiting
+        'queue_waiting': Patient.objects.filter(
+            current_visit__status='waiting', current_visit__closed_at__isnull=True
+        ).order_by('-current_visit__priority_score', 'current_visit__visit_time')[:50],
+        # PatientViewSet.prioritized
+        'prioritized': Patient.objects.order_by('-current_visit__priority_score', 'current_visit__visit_time')[:50],
+        'prioritized_critical': Patient.objects.filter(
+            current_visit__health_status='critical'
+        ).order_by('-current_visit__priority_score', 'current_visit__visit_time')[:50],
+        # PatientViewSet.search / patient_register_view
+        'phone_lookup': Patient.objects.filter(phone=sample['phone']),
+        # PatientViewSet.create returning-patient match
+        'phone_name_match': Patient.objects.filter(phone=sample['phone'], name=sample['name'])[:1],
+        # patient_measurements_latest / PatientDetailSerializer
+        'latest_measurement': Measurement.objects.filter(patient_id=sample['patient_id']).order_by('-timestamp')[:1],
+        'measurement_history': Measurement.objects.filter(patient_id=sample['patient_id']).order_by('-timestamp'),
+        # patient_reports_list / patient_reports_latest
+        'patient_reports': Report.objects.filter(patient_id=sample['patient_id']).order_by('-uploaded_at'),
+        # device_command polling
+        'pending_session': MeasurementSession.objects.filter(
+            device_id=sample['device_id'], status='pending'
+        ).order_by('-created_at')[:1],
+        'prescription_history': PrescriptionHistory.objects.filter(
+            patient_id=sample['patient_id']
+        ).order_by('-created_at'),
+        'visit_history': Visit.objects.filter(patient_id=sample['patient_id']).order_by('-visit_time'),
+    }
+
+
+def pick_sample():
+    from patients.models import Patient
+    from devices.models import MeasurementSession
+
+    patient = Patient.objects.order_by('?').only('id', 'phone', 'name').first()
+    session = MeasurementSession.objects.order_by('status').only('device_id').first()
+    return {
+        'patient_id': patient.id,
+        'phone': patient.phone,
+        'name': patient.name,
+        'device_id': session.device_id if session else None,
+    }
+
+
+def query_indexes():
+    """(model, index) pairs for every query-pattern index declared in Meta.indexes."""
+    from django.apps import apps
+
+    pairs = []
+    for app_label, model_name in INDEXED_MODELS:
+        model = apps.get_model(app_label, model_name)
+        pairs.extend((model, index) for index in model._meta.indexes)
+    return pairs
+
+
+def set_indexes(connection, present):
+    with connection.schema_editor() as editor:
+        for model, index in query_indexes():
+            if present:
+                editor.add_index(model, index)
+            else:
+                editor.remove_index(model, index)
+    # Refresh planner statistics so the "after" plans can use the new indexes
+    if connection.vendor in ('postgresql', 'sqlite'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def measure(connection, queries, repeat):
+    explain_options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+    results = {}
+    for name, queryset in queries.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset._chain())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'plan': queryset._chain().explain(**explain_options),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=1_000_000, help='Number of patients to seed')
+    parser.add_argument('--per-patient', type=int, default=1,
+                        help='Rows per patient in each child table (measurements, reports, ...)')
+    parser.add_argument('--workers', type=int, default=None, help='seed_load_data worker processes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed executions per query')
+    parser.add_argument('--keepdb', action='store_true', help='Reuse an already seeded test database')
+    parser.add_argument('--output', help='Write the before/after comparison as JSON to this path')
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        from django.core.management import call_command
+        from patients.models import Patient
+
+        if not Patient.objects.exists():
+            rows = args.patients * args.per_patient
+            seed_options = {'workers': args.workers} if args.workers else {}
+            call_command(
+                'seed_load_data',
+                patients=args.patients,
+                measurements=rows,
+                visits=rows,
+                prescription_history=rows,
+                reports=rows,
+                seed=args.seed,
+                **seed_options
+            )
+
+        sample = pick_sample()
+        queries = hot_queries(sample)
+
+        print('Dropping query-pattern indexes...')
+        set_indexes(connection, present=False)
+        before = measure(connection, queries, args.repeat)
+
+        print('Creating query-pattern indexes...')
+        started = time.perf_counter()
+        set_indexes(connection, present=True)
+        build_seconds = time.perf_counter() - started
+        after = measure(connection, queries, args.repeat)
+
+    print(f'\nIndex build time: {build_seconds:.1f}s ({connection.vendor})\n')
+    print(f"{'query':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in queries:
+        b, a = before[name]['median_ms'], after[name]['median_ms']
+        speedup = f'{b / a:.1f}x' if a else '-'
+        print(f'{name:<24}{b:>12.3f}{a:>12.3f}{speedup:>10}')
+    for name in queries:
+        print(f'\n== {name}\n-- before\n{before[name]["plan"]}\n-- after\n{after[name]["plan"]}')
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'vendor': connection.vendor,
+                'patients': args.patients,
+                'per_patient': args.per_patient,
+                'index_build_seconds': round(build_seconds, 2),
+                'before': before,
+                'after': after,
+            }, fh, indent=2)
+        print(f'\nWrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
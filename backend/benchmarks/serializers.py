@@ -0,0 +1,133 @@
+"""
+Serializer benchmark: DRF ModelSerializers vs. the values_list() fast path.
+
+Seeds a test database, then renders the hot list payloads (patient list,
+measurement history, report list) both ways - `Serializer(qs, many=True)`
+and the matching ashwini_backend.fast_serializers.ValuesSerializer - through
+DRF's JSONRenderer. Query, serialization and rendering are all timed, and
+the two JSON bodies are checked to be byte-identical.
+
+Usage:
+    python -m benchmarks.serializers                 # 10k rows per list
+    python -m benchmarks.serializers --rows 50000 --repeat 3
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks import setup_django, benchmark_database
+
+
+def cases(rows):
+    """name -> (queryset, ModelSerializer class, ValuesSerializer class)"""
+    from patients.models import Patient
+    from patients.serializers import PatientListSerializer, PatientListValuesSerializer
+    from measurements.models import Measurement
+    from measurements.serializers import MeasurementSerializer, MeasurementValuesSerializer
+    from reports.models import Report
+    from reports.serializers import ReportListSerializer, ReportListValuesSerializer
+
+    return {
+        # PatientViewSet.list / prioritized
+        'patients': (
+            Patient.objects.order_by('-current_visit__priority_score', 'current_visit__visit_time')[:rows],
+            PatientListSerializer, PatientListValuesSerializer,
+        ),
+        # patient_measurements_list / portal measurements
+        'measurements': (
+            Measurement.objects.order_by('-timestamp')[:rows],
+            MeasurementSerializer, MeasurementValuesSerializer,
+        ),
+        # ReportViewSet.list / patient_reports_list
+        'reports': (
+            ReportListSerializer.setup_queryset(
+                Report.objects.select_related('patient').order_by('-uploaded_at')
+            )[:rows],
+            ReportListSerializer, ReportListValuesSerializer,
+        ),
+    }
+
+
+def render(serialize, queryset):
+    from rest_framework.renderers import JSONRenderer
+
+    started = time.perf_counter()
+    body = JSONRenderer().render(serialize(queryset._chain()))
+    return body, (time.perf_counter() - started) * 1000
+
+
+def measure(queryset, model_serializer, values_serializer, repeat):
+    def slow(qs):
+        return model_serializer(qs, many=True).data
+
+    def fast(qs):
+        return values_serializer(qs).data
+
+    # Warm up both paths (field compilation, query cache of the DB)
+    slow_body, _ = render(slow, queryset)
+    fast_body, _ = render(fast, queryset)
+
+    slow_ms = [render(slow, queryset)[1] for _ in range(repeat)]
+    fast_ms = [render(fast, queryset)[1] for _ in range(repeat)]
+    return {
+        'rows': len(json.loads(fast_body)),
+        'bytes': len(fast_body),
+        'identical': slow_body == fast_body,
+        'model_serializer_ms': round(statistics.median(slow_ms), 2),
+        'values_serializer_ms': round(statistics.median(fast_ms), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000, help='Rows per list payload (default: 10000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed renders per payload and serializer')
+    parser.add_argument('--keepdb', action='store_true', help='Reuse an already seeded test database')
+    parser.add_argument('--output', help='Also write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    with benchmark_database(keepdb=args.keepdb):
+        from django.core.management import call_command
+        from patients.models import Patient
+
+        if not Patient.objects.exists():
+            call_command(
+                'seed_load_data',
+                patients=args.rows,
+                measurements=args.rows,
+                reports=args.rows,
+                visits=0,
+                prescription_history=0,
+                seed=args.seed,
+                verbosity=0,
+            )
+
+        results = {
+            name: measure(*case, repeat=args.repeat)
+            for name, case in cases(args.rows).items()
+        }
+
+    print(f"\n{'payload':<14}{'rows':>8}{'KiB':>9}{'model ms':>11}{'values ms':>11}{'speedup':>9}  identical")
+    for name, r in results.items():
+        speedup = r['model_serializer_ms'] / r['values_serializer_ms'] if r['values_serializer_ms'] else 0
+        print(
+            f"{name:<14}{r['rows']:>8}{r['bytes'] / 1024:>9.0f}{r['model_serializer_ms']:>11.1f}"
+            f"{r['values_serializer_ms']:>11.1f}{speedup:>8.1f}x  {'yes' if r['identical'] else 'NO'}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'rows': args.rows, 'results': results}, fh, indent=2)
+        print(f'\nWrote {args.output}')
+
+    if not all(r['identical'] for r in results.values()):
+        raise SystemExit('ValuesSerializer output differs from the ModelSerializer output')
+
+
+if __name__ == '__main__':
+    main()
@@ -12,4 +12,4 @@ mkdir -p media/reports
 python manage.py collectstatic --no-input
 
 echo "Build completed successfully!"
-echo "Database migrations will run at startup when database is accessible."
+echo "Migrations run with: python manage.py release (or at server start if still pending)."
@@ -0,0 +1,33 @@
+"""
+Wake-ups for devices long-polling GET /api/devices/<device_id>/command/?wait=N.
+
+Queueing a measurement session bumps the device's cache version (see
+devices.signals); a waiting poll watches that version - a cache read, no SQL
+- and looks for the session in the database only once it changes. The cache
+is shared, so a session created on one worker wakes a poll held by another.
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ashwini_backend.cache import CacheNamespace
+
+
+def device_sessions(device_pk):
+    """Namespace whose version changes whenever a session is queued for the device."""
+    return CacheNamespace(f'device:{device_pk}', label='device')
+
+
+async def wait_for_session(namespace, version, deadline):
+    """
+    Sleep until `namespace` moves past `version` (True) or time.monotonic()
+    reaches `deadline` (False).
+    """
+    while (remaining := deadline - time.monotonic()) > 0:
+        await asyncio.sleep(min(settings.DEVICE_COMMAND_POLL_INTERVAL, remaining))
+        if await sync_to_async(namespace.version)() != version:
+            return True
+    return False
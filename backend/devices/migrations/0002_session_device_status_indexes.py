@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurementsession',
+            index=models.Index(fields=['device', 'status'], name='session_device_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='measurementsession',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['device', '-created_at'], name='session_device_pending_idx'),
+        ),
+    ]
@@ -72,6 +72,15 @@ class MeasurementSession(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['device', 'status'], name='session_device_status_idx'),
+            # Device polling only ever looks for pending sessions
+            models.Index(
+                fields=['device', '-created_at'],
+                condition=models.Q(status='pending'),
+                name='session_device_pending_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Session for {self.patient.name} on {self.device.name} - {self.status}"
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .long_poll import device_sessions
+
+
+@receiver(post_save, sender='devices.MeasurementSession')
+def session_saved(sender, instance, **kwargs):
+    """Wake the device's long-polling command requests for a new pending session."""
+    if instance.status == 'pending':
+        device_id = instance.device_id
+        transaction.on_commit(lambda: device_sessions(device_id).invalidate())
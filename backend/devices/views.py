@@ -1,21 +1,38 @@
+import time
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
+from ashwini_backend.async_utils import aget_object_or_404, is_asgi
+from .long_poll import device_sessions, wait_for_session
 from .models import Device, MeasurementSession
 from measurements.models import Measurement
 from measurements.serializers import MeasurementSerializer, MeasurementCreateSerializer
 from patients.models import Patient
+from monitoring import metrics
+from monitoring.query_budget import query_budget
 
 
-@api_view(['GET'])
-def device_command(request, device_id):
+@query_budget(5)
+@async_api_view(['GET'])
+async def device_command(request, device_id):
     """
     IoT Integration Point: Device Command Polling Endpoint
     
     GET /api/devices/<device_id>/command/
+    GET /api/devices/<device_id>/command/?wait=25
+    
+    With ?wait=<seconds> (capped at DEVICE_COMMAND_MAX_WAIT) the request is
+    held open until a session is queued for the device, instead of answering
+    "idle" at once (long polling, see devices.long_poll). Waiting costs no
+    worker under ASGI; under WSGI the wait is ignored and the device simply
+    polls again.
     
     This endpoint is intended for physical IoT health monitoring devices to poll
     for commands and instructions.
@@ -40,35 +57,69 @@ def device_command(request, device_id):
     to verify the device identity.
     """
     
+    try:
+        wait = max(0.0, min(float(request.query_params.get('wait', 0)), settings.DEVICE_COMMAND_MAX_WAIT))
+    except ValueError:
+        return Response({"error": "wait must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+    if not is_asgi(request):
+        wait = 0  # Holding a sync worker is what long polling must not do
+    deadline = time.monotonic() + wait
+    
     # Verify device exists and update last_seen
-    device = get_object_or_404(Device, device_id=device_id)
+    device = await aget_object_or_404(Device, device_id=device_id)
     device.last_seen = timezone.now()
-    device.save()
+    await device.asave(update_fields=['last_seen'])
     
-    # Check for pending measurement sessions
-    pending_session = MeasurementSession.objects.filter(
-        device=device,
-        status='pending'
-    ).first()
-    
-    if pending_session:
-        # Update session status to in_progress
-        pending_session.status = 'in_progress'
-        pending_session.save()
+    sessions = device_sessions(device.pk)
+    while True:
+        # Read the version first: a session queued after the query still wakes us
+        version = await sync_to_async(sessions.version)()
+        pending_session = await _claim_pending_session(device)
+        
+        if pending_session:
+            metrics.DEVICE_POLLS.inc(command='measure')
+            
+            return Response({
+                "command": "measure",
+                "patient_id": pending_session.patient.id,
+                "session_id": pending_session.id,
+                "patient_name": pending_session.patient.name
+            })
         
-        return Response({
-            "command": "measure",
-            "patient_id": pending_session.patient.id,
-            "session_id": pending_session.id,
-            "patient_name": pending_session.patient.name
-        })
+        if not await wait_for_session(sessions, version, deadline):
+            break
     
     # No pending measurement, return idle
+    metrics.DEVICE_POLLS.inc(command='idle')
     return Response({
         "command": "idle"
     })
 
 
+async def _claim_pending_session(device):
+    """
+    Mark the device's pending session (the newest, patient joined) in
+    progress and return it; None if there is none or an overlapping poll
+    claimed it first.
+    """
+    pending_session = await MeasurementSession.objects.filter(
+        device=device,
+        status='pending'
+    ).select_related('patient').afirst()
+    if pending_session is None:
+        return None
+    
+    # Conditional update: two overlapping polls never both start a session
+    claimed = await MeasurementSession.objects.filter(
+        pk=pending_session.pk,
+        status='pending'
+    ).aupdate(status='in_progress', updated_at=timezone.now())
+    if not claimed:
+        return None
+    pending_session.status = 'in_progress'
+    return pending_session
+
+
 @api_view(['POST'])
 def device_measurements_create(request, device_id):
     """
@@ -105,7 +156,7 @@ def device_measurements_create(request, device_id):
     # Verify device exists and update last_seen
     device = get_object_or_404(Device, device_id=device_id)
     device.last_seen = timezone.now()
-    device.save()
+    device.save(update_fields=['last_seen'])
     
     # Extract patient_id from request
     patient_id = request.data.get('patient_id')
@@ -123,11 +174,13 @@ def device_measurements_create(request, device_id):
         # Create measurement with source="device"
         measurement = serializer.save(
             patient=patient,
+            visit_id=patient.current_visit_id,
             source='device'
         )
         
         # Auto-assess patient health status after new measurement
         patient.assess_health_status()
+        metrics.MEASUREMENT_INGESTS.inc(source='device', outcome='created')
         
         # Future: Update MeasurementSession status
         # session_id = request.data.get('session_id')
@@ -139,6 +192,7 @@ def device_measurements_create(request, device_id):
         response_serializer = MeasurementSerializer(measurement)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
+    metrics.MEASUREMENT_INGESTS.inc(source='device', outcome='invalid')
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -172,14 +226,13 @@ def create_measurement_session(request):
         status='pending'
     )
     
-    # Update patient status to checking
-    patient.status = 'checking'
-    patient.save()
+    # The patient's visit moves on to the health monitoring station
+    patient.update_visit(status='checking')
     
     return Response({
         "id": session.id,
-        "patient": session.patient.id,
-        "device": session.device.id,
+        "patient": patient.id,
+        "device": device.id,
         "status": session.status,
         "message": f"Measurement session created. Device will receive measurement instructions."
     }, status=status.HTTP_201_CREATED)
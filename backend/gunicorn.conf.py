@@ -0,0 +1,168 @@
+"""
+Gunicorn settings, shared by app.py and start.sh (gunicorn reads
+./gunicorn.conf.py on its own).
+
+SERVER_MODE selects the application and worker class:
+- wsgi (default): gthread workers running ashwini_backend.wsgi; each worker
+  serves WEB_THREADS requests at once, so requests waiting on the database,
+  Azure or OpenAI don't hold the whole worker
+- asgi: uvicorn workers running ashwini_backend.asgi, so async views
+  (report upload/analysis, device long polling, event streams) wait on I/O
+  without holding a worker and concurrency follows open connections
+
+The number of workers follows the container: 2 x CPUs + 1 for gthread, one
+per CPU for uvicorn (an event loop keeps a CPU busy on its own), capped by
+the memory limit at WEB_WORKER_MEMORY_MB each. CPUs and memory are read from
+the cgroup limits, so a container sees its share rather than the host's.
+WEB_CONCURRENCY sets the number of workers directly.
+
+The application is loaded once in the master and warmed up (imports, URL
+resolver, serializer tables - see ashwini_backend.warmup), then gc.freeze()
+keeps those objects out of the collector, so the forked workers share their
+memory pages instead of copying them. Workers restart after WEB_MAX_REQUESTS
+requests (plus up to WEB_MAX_REQUESTS_JITTER, so they don't all restart at
+once), which bounds slow memory growth.
+
+Before the workers fork, the master runs the release steps that are not done
+yet (migrations, default superuser - see ashwini_backend.boot; RELEASE_ON_BOOT
+=False leaves migrations to `manage.py release`) and logs where the boot time
+went.
+"""
+
+import gc
+import math
+import os
+import time
+
+# Gunicorn reads this file first: the boot report counts from here
+BOOT_STARTED = time.monotonic()
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+RELEASE_ON_BOOT = os.environ.get('RELEASE_ON_BOOT', 'True').lower() in ('true', '1', 'yes')
+
+
+def _read_cgroup(path):
+    try:
+        with open(path) as fh:
+            return fh.read().split()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    """CPUs this container may use (at least 1)."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    values = _read_cgroup('/sys/fs/cgroup/cpu.max')
+    if values and values[0] != 'max':
+        return max(1, math.ceil(int(values[0]) / int(values[1])))
+    # cgroup v1: quota -1 means unlimited
+    quota = _read_cgroup('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = _read_cgroup('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota[0]) > 0:
+        return max(1, math.ceil(int(quota[0]) / int(period[0])))
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def memory_limit_mb():
+    """Memory this container may use, in MB."""
+    total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    values = _read_cgroup('/sys/fs/cgroup/memory.max') or _read_cgroup('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    if values and values[0] != 'max':
+        # cgroup v1 reports "no limit" as a huge number
+        total = min(total, int(values[0]))
+    return total // (1024 * 1024)
+
+
+def default_workers(cpus, memory_mb, worker_memory_mb):
+    by_cpu = cpus if SERVER_MODE == 'asgi' else 2 * cpus + 1
+    # Keep a worker's worth of memory for the master
+    by_memory = memory_mb // worker_memory_mb - 1
+    return max(1, min(by_cpu, by_memory))
+
+
+cpus = cpu_limit()
+memory_mb = memory_limit_mb()
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'ashwini_backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'ashwini_backend.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('WEB_THREADS', 4))
+
+workers = int(
+    os.environ.get('WEB_CONCURRENCY')
+    or default_workers(cpus, memory_mb, int(os.environ.get('WEB_WORKER_MEMORY_MB', 150)))
+)
+
+# The project directory, whichever directory the launcher runs from
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))  # Report analysis calls Azure and OpenAI
+graceful_timeout = 30
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', max_requests // 10))
+# Worker heartbeats go to a file; keep it in memory, not on a container's overlay disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def when_ready(server):
+    """In the master, after the application is loaded and before the workers fork."""
+    from django.conf import settings
+
+    from ashwini_backend import boot, cache, warmup
+
+    timings = boot.Timings()
+    timings.add('load', time.monotonic() - BOOT_STARTED)
+    try:
+        pending = boot.release(timings, only_changed=True, migrate=RELEASE_ON_BOOT)
+    except Exception:
+        server.log.exception('Release steps failed; starting anyway')
+    else:
+        if pending:
+            server.log.warning('%s migration(s) pending; run `manage.py release`', len(pending))
+    if not cache.is_atomic():
+        server.log.warning(
+            'The cache (%s) is not atomic across workers: stampede protection and cache '
+            'invalidation are best-effort. Set CACHE_URL to Redis or Memcached.',
+            settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        )
+    with timings.step('warm-up'):
+        warmup.warm_up()
+        warmup.close_connections()
+    with timings.step('gc'):
+        gc.collect()
+        gc.freeze()
+
+    server.log.info('Boot %s', timings)
+    server.log.info(
+        'Serving %s: %s %s worker(s)%s (%s CPU, %s MB)',
+        SERVER_MODE,
+        server.cfg.workers,
+        server.cfg.worker_class_str,
+        f' x {server.cfg.threads} threads' if server.cfg.worker_class_str == 'gthread' else '',
+        cpus,
+        memory_mb,
+    )
+
+
+def post_worker_init(worker):
+    """In each worker, before its first request."""
+    from ashwini_backend import warmup
+
+    warmup.start_pools()
+    # gthread workers serve requests on their executor's threads
+    pool = getattr(worker, 'tpool', None)
+    if pool is not None:
+        warmup.warm_connections(pool, worker.cfg.threads)
+    elif worker.cfg.worker_class_str == 'sync':
+        warmup.warm_connections()
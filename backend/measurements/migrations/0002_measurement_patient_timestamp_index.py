@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['patient', '-timestamp'], name='measurement_patient_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def attach_to_visits(apps, schema_editor):
+    """
+    Each existing measurement belongs to the patient's latest visit that had
+    begun when it was taken. One UPDATE; the correlated subquery is an index
+    lookup on visit_patient_time_idx.
+    """
+    Measurement = apps.get_model('measurements', 'Measurement')
+    Visit = apps.get_model('patients', 'Visit')
+    Measurement.objects.using(schema_editor.connection.alias).update(visit=Subquery(
+        Visit.objects.filter(
+            patient_id=OuterRef('patient_id'), visit_time__lte=OuterRef('timestamp')
+        ).order_by('-visit_time').values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0010_populate_visits'),
+        ('measurements', '0002_measurement_patient_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='visit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='measurements', to='patients.visit'),
+        ),
+        migrations.RunPython(attach_to_visits, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,8 @@
 from django.db import models
-from patients.models import Patient
+from patients.models import ChangeLogged, Patient, Visit
 
 
-class Measurement(models.Model):
+class Measurement(ChangeLogged):
     """
     Measurement model for storing patient vital signs.
     
@@ -26,6 +26,14 @@ class Measurement(models.Model):
         on_delete=models.CASCADE,
         related_name='measurements'
     )
+    # The visit the measurement was taken in
+    visit = models.ForeignKey(
+        Visit,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='measurements'
+    )
     timestamp = models.DateTimeField(auto_now_add=True)
     
     # Vital Signs (all optional to support partial measurements)
@@ -59,6 +67,10 @@ class Measurement(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Latest measurement / history per patient
+            models.Index(fields=['patient', '-timestamp'], name='measurement_patient_ts_idx'),
+        ]
     
     def __str__(self):
         return f"Measurement for {self.patient.name} at {self.timestamp}"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from ashwini_backend.fast_serializers import ValuesSerializer
 from .models import Measurement
 
 
@@ -21,6 +22,12 @@ class MeasurementSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'timestamp', 'patient']
 
 
+class MeasurementValuesSerializer(ValuesSerializer):
+    """MeasurementSerializer output for measurement histories, read with values_list()."""
+    
+    serializer_class = MeasurementSerializer
+
+
 class MeasurementCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating measurements.
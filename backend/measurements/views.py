@@ -3,11 +3,15 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 
+from ashwini_backend.fieldsets import requested_fields
 from .models import Measurement
-from .serializers import MeasurementSerializer, MeasurementCreateSerializer
+from .serializers import MeasurementSerializer, MeasurementCreateSerializer, MeasurementValuesSerializer
 from patients.models import Patient
+from monitoring import metrics
+from monitoring.query_budget import query_budget
 
 
+@query_budget(3)
 @api_view(['GET'])
 def patient_measurements_latest(request, patient_id):
     """
@@ -27,6 +31,7 @@ def patient_measurements_latest(request, patient_id):
         return Response(None, status=status.HTTP_200_OK)
 
 
+@query_budget(3, methods=['GET'])
 @api_view(['GET', 'POST'])
 def patient_measurements_list(request, patient_id):
     """
@@ -34,6 +39,7 @@ def patient_measurements_list(request, patient_id):
     
     GET /api/patients/<patient_id>/measurements/
     Returns a list of all Measurement records, ordered by timestamp (newest first).
+    ?fields=timestamp,spo2 returns only those fields.
     
     POST /api/patients/<patient_id>/measurements/
     Body: {
@@ -48,7 +54,8 @@ def patient_measurements_list(request, patient_id):
     
     if request.method == 'GET':
         measurements = patient.measurements.all()
-        serializer = MeasurementSerializer(measurements, many=True)
+        fields = requested_fields(request, MeasurementSerializer)
+        serializer = MeasurementValuesSerializer(measurements, fields=fields)
         return Response(serializer.data)
     
     elif request.method == 'POST':
@@ -58,13 +65,18 @@ def patient_measurements_list(request, patient_id):
             source = request.data.get('source', 'manual')
             measurement = serializer.save(
                 patient=patient,
+                visit_id=patient.current_visit_id,
                 source=source
             )
             
             # Auto-assess patient health status after new measurement
             patient.assess_health_status()
+            metrics.MEASUREMENT_INGESTS.inc(
+                source=source if source in dict(Measurement.SOURCE_CHOICES) else 'other', outcome='created'
+            )
             
             response_serializer = MeasurementSerializer(measurement)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         
+        metrics.MEASUREMENT_INGESTS.inc(source='manual', outcome='invalid')
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
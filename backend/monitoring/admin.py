@@ -0,0 +1,80 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .models import Profile
+from .profiler import ProfileStore
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    """Browse the on-disk profile ring buffer (read-only, ADMIN role only)."""
+
+    def _allowed(self, request):
+        user = request.user
+        return user.is_active and user.is_staff and (
+            user.is_superuser or getattr(user, 'role', None) == 'ADMIN'
+        )
+
+    def has_module_permission(self, request):
+        return self._allowed(request)
+
+    def has_view_permission(self, request, obj=None):
+        return self._allowed(request)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        wrap = self.admin_site.admin_view
+        return [
+            path('', wrap(self.changelist_view), name='%s_%s_changelist' % info),
+            path('<str:profile_id>/', wrap(self.profile_view), name='%s_%s_detail' % info),
+            path('<str:profile_id>/download/', wrap(self.download_view), name='%s_%s_download' % info),
+        ]
+
+    def _context(self, request, **extra):
+        return {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            **extra,
+        }
+
+    def _get_profile(self, request, profile_id):
+        if not self._allowed(request):
+            raise Http404
+        try:
+            meta = ProfileStore().get(profile_id)
+        except ValueError:
+            meta = None
+        if meta is None:
+            raise Http404('Profile not found (it may have rotated out of the ring buffer)')
+        return meta
+
+    def changelist_view(self, request, extra_context=None):
+        if not self._allowed(request):
+            raise Http404
+        context = self._context(request, title='Request profiles', profiles=ProfileStore().all())
+        return TemplateResponse(request, 'admin/monitoring/profile/change_list.html', context)
+
+    def profile_view(self, request, profile_id):
+        meta = self._get_profile(request, profile_id)
+        sql = sorted(meta['sql'], key=lambda row: row[1], reverse=True)
+        context = self._context(request, title=f"{meta['method']} {meta['path']}", profile=meta, sql=sql)
+        return TemplateResponse(request, 'admin/monitoring/profile/detail.html', context)
+
+    def download_view(self, request, profile_id):
+        meta = self._get_profile(request, profile_id)
+        return FileResponse(
+            open(ProfileStore().raw_path(profile_id), 'rb'),
+            as_attachment=True,
+            filename=meta['raw_file'],
+        )
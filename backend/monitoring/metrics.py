@@ -0,0 +1,387 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Every worker process keeps its counters and histograms in memory and
+periodically snapshots them to its own JSON file in METRICS_DIR. The
+/api/metrics/ view merges the snapshots of all workers (live and exited -
+counters are cumulative), so scrapes see the whole container no matter
+which gunicorn worker answers. No external service is needed.
+
+    from monitoring import metrics
+
+    metrics.DEVICE_POLLS.inc(command='idle')
+    with metrics.time_external_call('azure_openai', 'summary'):
+        client.chat.completions.create(...)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+
+_PROCESS_START = int(time.time())
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts (non-cumulative) + overflow, sum, count]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            else:
+                entry[0][-1] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), [list(v[0]), v[1], v[2]]] for key, v in self._values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def snapshot_path(self):
+        return os.path.join(self.directory, f'metrics-{os.getpid()}-{_PROCESS_START}.json')
+
+    def flush(self):
+        """Write this process' snapshot atomically to METRICS_DIR."""
+        if not self.directory:
+            return
+        with self._flush_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            data = {name: metric.snapshot() for name, metric in self.metrics.items()}
+            path = self.snapshot_path()
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w') as fh:
+                json.dump(data, fh)
+            os.replace(tmp, path)
+            self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if time.monotonic() - self._last_flush >= interval:
+            try:
+                self.flush()
+            except OSError:
+                pass  # Metrics must never break a request
+
+    def collect(self):
+        """
+        Merged values of every process: {name: {label_key: value}}.
+
+        Falls back to this process alone when METRICS_DIR is not set.
+        """
+        if self.directory and os.path.isdir(self.directory):
+            self.flush()
+            self.compact()
+            snapshots = [data for _, _, data in self._read_snapshots()]
+        else:
+            snapshots = [{name: metric.snapshot() for name, metric in self.metrics.items()}]
+        return self._merge(snapshots)
+
+    def _read_snapshots(self):
+        """Yield (path, pid or None for the archive, data) for every snapshot file."""
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue  # Half-written or removed between listdir and open
+            pid = filename.split('-')[1]
+            yield path, int(pid) if pid.isdigit() else None, data
+
+    def compact(self):
+        """
+        Fold snapshots of exited workers into metrics-archive.json.
+
+        Keeps the directory from growing as gunicorn recycles workers while
+        preserving their counts. Skipped where fcntl (POSIX) is unavailable.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            return
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            snapshots = list(self._read_snapshots())
+            dead = [(path, data) for path, pid, data in snapshots if pid is not None and not _pid_alive(pid)]
+            if not dead:
+                return
+            archive = [data for _, pid, data in snapshots if pid is None]
+            merged = self._merge(archive + [data for _, data in dead])
+            archive_data = {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in merged.items()
+            }
+            path = os.path.join(self.directory, 'metrics-archive.json')
+            with open(f'{path}.tmp', 'w') as fh:
+                json.dump(archive_data, fh)
+            os.replace(f'{path}.tmp', path)
+            for dead_path, _ in dead:
+                _remove_quietly(dead_path)
+
+    def _merge(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in samples:
+                    key = tuple(key)
+                    if metric.kind == 'histogram':
+                        current = values.get(key)
+                        if current is None:
+                            values[key] = [list(value[0]), value[1], value[2]]
+                        else:
+                            current[0] = [a + b for a, b in zip(current[0], value[0])]
+                            current[1] += value[1]
+                            current[2] += value[2]
+                    else:
+                        values[key] = values.get(key, 0) + value
+        return merged
+
+
+REGISTRY = Registry()
+
+
+class InFlightTracker:
+    """
+    Per-process count of requests being handled, for worker saturation.
+
+    Written to a tiny per-process file with a single pwrite on every change,
+    so a worker stuck in a 2-minute OCR call still shows up as busy.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _file(self, directory):
+        if self._fd is None or self._pid != os.getpid():
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'inflight-{os.getpid()}-{_PROCESS_START}')
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def change(self, delta):
+        with self._lock:
+            self.count += delta
+            directory = REGISTRY.directory
+            if directory:
+                try:
+                    os.pwrite(self._file(directory), f'{self.count:>10}'.encode(), 0)
+                except (OSError, AttributeError):
+                    pass  # os.pwrite is POSIX-only
+
+    @staticmethod
+    def workers():
+        """{pid: in-flight requests} for every live worker process."""
+        directory = REGISTRY.directory
+        if not directory or not os.path.isdir(directory):
+            return {os.getpid(): IN_FLIGHT.count}
+        workers = {}
+        for filename in os.listdir(directory):
+            if not filename.startswith('inflight-'):
+                continue
+            path = os.path.join(directory, filename)
+            pid = int(filename.split('-')[1])
+            if not _pid_alive(pid):
+                _remove_quietly(path)
+                continue
+            try:
+                with open(path) as fh:
+                    workers[pid] = workers.get(pid, 0) + int(fh.read().strip() or 0)
+            except (OSError, ValueError):
+                continue
+        return workers
+
+
+IN_FLIGHT = InFlightTracker()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Request metrics (recorded by monitoring.middleware.MetricsMiddleware)
+HTTP_REQUESTS = Counter(
+    'ashwini_http_requests_total', 'HTTP requests handled', ['route', 'method', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'ashwini_http_request_duration_seconds', 'Request latency', ['route', 'method']
+)
+DB_TIME = Histogram(
+    'ashwini_db_time_per_request_seconds', 'Time spent in SQL per request', ['route']
+)
+DB_QUERIES = Histogram(
+    'ashwini_db_queries_per_request', 'SQL queries per request', ['route'], buckets=QUERY_COUNT_BUCKETS
+)
+
+# External services (reports.services)
+EXTERNAL_CALLS = Histogram(
+    'ashwini_external_call_duration_seconds', 'Latency of OCR / LLM calls', ['service', 'operation', 'outcome']
+)
+
+# IoT traffic
+DEVICE_POLLS = Counter(
+    'ashwini_device_polls_total', 'Device command polls', ['command']
+)
+MEASUREMENT_INGESTS = Counter(
+    'ashwini_measurement_ingests_total', 'Measurements submitted', ['source', 'outcome']
+)
+
+# Cache (ashwini_backend.cache)
+CACHE_REQUESTS = Counter(
+    'ashwini_cache_requests_total', 'Cache lookups by result (hit, miss, wait_hit, early_refresh)',
+    ['namespace', 'result']
+)
+CACHE_FILL = Histogram(
+    'ashwini_cache_fill_duration_seconds', 'Time to recompute a cached value', ['namespace']
+)
+CACHE_INVALIDATIONS = Counter(
+    'ashwini_cache_invalidations_total', 'Namespace invalidations', ['namespace']
+)
+
+
+@contextmanager
+def time_external_call(service, operation):
+    """Time a call to an external API, labelled with success/error outcome."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        EXTERNAL_CALLS.observe(time.perf_counter() - started, service=service, operation=operation, outcome=outcome)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(gauges=()):
+    """
+    Render merged metrics in the Prometheus text format (version 0.0.4).
+
+    `gauges` are point-in-time values computed at scrape time:
+    (name, help, labelnames, [(label_values, value), ...]).
+    """
+    lines = []
+    merged = REGISTRY.collect()
+    for name, metric in sorted(REGISTRY.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(merged.get(name, {}).items()):
+            if metric.kind == 'histogram':
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(metric.buckets, counts):
+                    cumulative += n
+                    le = _labels(metric.labelnames, key, [('le', _number(float(bound)))])
+                    lines.append(f'{name}_bucket{le} {cumulative}')
+                le = _labels(metric.labelnames, key, [('le', '+Inf')])
+                lines.append(f'{name}_bucket{le} {count}')
+                lines.append(f'{name}_sum{_labels(metric.labelnames, key)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(metric.labelnames, key)} {count}')
+            else:
+                lines.append(f'{name}{_labels(metric.labelnames, key)} {_number(value)}')
+
+    for name, documentation, labelnames, samples in gauges:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} gauge')
+        for values, value in samples:
+            lines.append(f'{name}{_labels(labelnames, values)} {_number(value)}')
+
+    return '\n'.join(lines) + '\n'
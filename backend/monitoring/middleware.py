@@ -0,0 +1,126 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+from .query_budget import QueryBudgetExceeded, count_queries, get_view_budget
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL queries of every request and enforce per-view budgets.
+
+    - Attaches the QueryStats to `request.query_stats` for later middleware.
+    - Logs a warning when a view exceeds its declared budget or repeats the
+      same SQL shape QUERY_BUDGET_DUPLICATE_THRESHOLD times (an N+1).
+    - With QUERY_BUDGET_STRICT = True (tests, local development) raises
+      QueryBudgetExceeded instead of logging.
+    - With DEBUG or strict mode, adds X-Query-Count / X-Query-Time-Ms headers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        self.duplicate_threshold = getattr(settings, 'QUERY_BUDGET_DUPLICATE_THRESHOLD', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.query_budget = None
+        with count_queries() as stats:
+            request.query_stats = stats
+            response = self.get_response(request)
+        return self.check(request, response, stats)
+
+    async def __acall__(self, request):
+        request.query_budget = None
+        with count_queries() as stats:
+            request.query_stats = stats
+            response = await self.get_response(request)
+        return self.check(request, response, stats)
+
+    def check(self, request, response, stats):
+        problems = []
+        budget = request.query_budget
+        if budget is not None and stats.count > budget:
+            problems.append(f'{stats.count} queries (budget {budget})')
+        for shape, repeats in stats.duplicates(self.duplicate_threshold):
+            problems.append(f'N+1: {repeats}x {shape[:200]}')
+
+        if problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(problems)
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        if settings.DEBUG or self.strict:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time-Ms'] = f'{stats.duration * 1000:.1f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_view_budget(view_func, request)
+        return None
+
+
+class MetricsMiddleware:
+    """
+    Record per-route latency, status, DB time and query count.
+
+    Must sit after QueryBudgetMiddleware, whose `request.query_stats` it
+    reads. Routes are labelled by their URL pattern (not the concrete path)
+    so label cardinality stays bounded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics.IN_FLIGHT.change(1)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.IN_FLIGHT.change(-1)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        metrics.IN_FLIGHT.change(1)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.IN_FLIGHT.change(-1)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        # Router-generated routes are regexes ('^patients/$')
+        route = match.route.lstrip('^').rstrip('$') if match else 'unmatched'
+        metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        metrics.HTTP_LATENCY.observe(elapsed, route=route, method=request.method)
+
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            metrics.DB_TIME.observe(stats.duration, route=route)
+            metrics.DB_QUERIES.observe(stats.count, route=route)
+
+        metrics.REGISTRY.maybe_flush()
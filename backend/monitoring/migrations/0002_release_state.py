@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleaseState',
+            fields=[
+                ('step', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'release step',
+                'verbose_name_plural': 'release steps',
+            },
+        ),
+    ]
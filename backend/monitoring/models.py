@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class Profile(models.Model):
+    """
+    Admin entry point for stored request profiles.
+
+    Profiles live on disk in monitoring.profiler.ProfileStore, not in the
+    database; this unmanaged model only gives them a place in Django admin.
+    """
+
+    class Meta:
+        managed = False
+        verbose_name = 'request profile'
+        verbose_name_plural = 'request profiles'
+
+
+class ReleaseState(models.Model):
+    """
+    Fingerprint of each release step (ashwini_backend.boot) as of the last
+    release, so a server boot can skip the steps already done. Kept in the
+    database: it outlives containers, whose temp-dir cache starts empty.
+    """
+
+    step = models.CharField(max_length=30, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'release step'
+        verbose_name_plural = 'release steps'
+
+    def __str__(self):
+        return f'{self.step} {self.fingerprint[:12]}'
@@ -0,0 +1,291 @@
+"""
+Opt-in per-request profiling for admin users.
+
+An ADMIN user adds `?__profile=1` (or the header `X-Profile: 1`) to any
+request to have it profiled with cProfile; `?__profile=sample` uses a
+sampling profiler instead and records folded stacks that flamegraph tools
+(speedscope, flamegraph.pl) read directly. Profiles and the request's SQL
+timings are kept in a bounded on-disk ring buffer (PROFILER_DIR, newest
+PROFILER_MAX_PROFILES) and browsed under Monitoring > Profiles in Django admin.
+
+The response carries `X-Profile-Id` so the profile can be found again.
+Requests without the flag pay a substring check; with PROFILER_ENABLED = False
+the middleware removes itself entirely.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_budget import count_queries
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '__profile'
+PROFILE_HEADER = 'X-Profile'
+
+# cProfile can't run in two threads at once; concurrent requests are served unprofiled
+_profile_lock = threading.Lock()
+
+
+class ProfileStore:
+    """
+    Ring buffer of profiles on disk.
+
+    Each profile is `<id>.json` (metadata, pstats summary, SQL timings) plus
+    `<id>.prof` (cProfile, loadable with pstats/snakeviz) or `<id>.folded`
+    (sampled stacks). Ids start with a millisecond timestamp so they sort
+    chronologically.
+    """
+
+    def __init__(self, directory=None, max_profiles=None):
+        self.directory = directory or settings.PROFILER_DIR
+        self.max_profiles = max_profiles or settings.PROFILER_MAX_PROFILES
+
+    def _path(self, profile_id, ext):
+        # Ids come from URLs in the admin; never let them escape the directory
+        if os.path.basename(profile_id) != profile_id:
+            raise ValueError(f'Invalid profile id: {profile_id!r}')
+        return os.path.join(self.directory, f'{profile_id}.{ext}')
+
+    def save(self, meta, raw, raw_ext):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = meta['id']
+        with open(self._path(profile_id, raw_ext), 'wb') as fh:
+            fh.write(raw)
+        meta['raw_file'] = f'{profile_id}.{raw_ext}'
+        # Metadata last: a profile is listed only once it is complete
+        tmp = self._path(profile_id, 'json.tmp')
+        with open(tmp, 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, self._path(profile_id, 'json'))
+        self.prune()
+        return profile_id
+
+    def ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (f[:-5] for f in os.listdir(self.directory) if f.endswith('.json')),
+            reverse=True,
+        )
+
+    def get(self, profile_id):
+        try:
+            with open(self._path(profile_id, 'json')) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def all(self):
+        return [meta for meta in map(self.get, self.ids()) if meta is not None]
+
+    def raw_path(self, profile_id):
+        meta = self.get(profile_id)
+        if meta is None:
+            return None
+        return self._path(profile_id, meta['raw_file'].rsplit('.', 1)[1])
+
+    def delete(self, profile_id):
+        meta = self.get(profile_id)
+        for ext in ('json', meta['raw_file'].rsplit('.', 1)[1] if meta else None):
+            if ext:
+                try:
+                    os.remove(self._path(profile_id, ext))
+                except OSError:
+                    pass
+
+    def prune(self):
+        for profile_id in self.ids()[self.max_profiles:]:
+            self.delete(profile_id)
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack every `interval` seconds from a
+    background thread and count identical stacks (folded-stack format).
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return '\n'.join(f'{stack} {n}' for stack, n in self.stacks.most_common()) + '\n'
+
+    def top_functions(self, limit=40):
+        """Leaf frames by sample count, the sampling analogue of tottime."""
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += n
+        total = sum(leaves.values()) or 1
+        return '\n'.join(
+            f'{n:>7} {100 * n / total:5.1f}%  {frame}' for frame, n in leaves.most_common(limit)
+        )
+
+
+def requested_mode(request):
+    """The profiling mode asked for by the request, or None."""
+    meta = request.META
+    if PROFILE_PARAM not in meta.get('QUERY_STRING', '') and 'HTTP_X_PROFILE' not in meta:
+        return None
+    value = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return None
+    return 'sample' if value.lower() == 'sample' else 'cprofile'
+
+
+def _profiling_user(request):
+    """Resolve the user for a profiling request (session or JWT) if an ADMIN."""
+    from patients.permissions import IsAdminUser
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated):
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (InvalidToken, TokenError):
+            result = None
+        if result:
+            # Hand the resolved user to DRF so the view doesn't look it up
+            # again (that extra query would skew the profile and the budget)
+            user, token = result
+            request._force_auth_user, request._force_auth_token = user, token
+        else:
+            user = None
+    if IsAdminUser().has_permission(SimpleNamespace(user=user), None):
+        return user
+    return None
+
+
+class ProfilerMiddleware:
+    """
+    Profile requests from ADMIN users that ask for it (see module docstring).
+
+    Place after AuthenticationMiddleware so browser sessions are recognised;
+    API clients are authenticated from their JWT.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.store = ProfileStore()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        user = _profiling_user(request)
+        if user is None:
+            return self.get_response(request)
+        if not _profile_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile-Skipped'] = 'another profile is running'
+            return response
+        try:
+            return self._profile(request, mode, user)
+        finally:
+            _profile_lock.release()
+
+    async def __acall__(self, request):
+        # Under ASGI a request runs on the event loop and in sync_to_async
+        # threads, shared with other requests: neither profiler can isolate it
+        response = await self.get_response(request)
+        if requested_mode(request) is not None:
+            response['X-Profile-Skipped'] = 'not available under ASGI'
+        return response
+
+    def _profile(self, request, mode, user):
+        started = time.perf_counter()
+        with count_queries() as stats:
+            if mode == 'sample':
+                sampler = StackSampler(threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL)
+                with sampler:
+                    response = self.get_response(request)
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        duration = time.perf_counter() - started
+
+        if mode == 'sample':
+            summary = sampler.top_functions()
+            raw, raw_ext = sampler.folded().encode(), 'folded'
+        else:
+            # Same format as Profile.dump_stats(), without a temporary file.
+            # Serialise before pstats.Stats(), which empties profiler.stats.
+            profiler.create_stats()
+            raw, raw_ext = marshal.dumps(profiler.stats), 'prof'
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(40)
+            summary = out.getvalue()
+
+        meta = {
+            'id': f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}',
+            'created': datetime.now(timezone.utc).isoformat(),
+            'mode': mode,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': user.get_username(),
+            'duration_ms': round(duration * 1000, 2),
+            'sql_count': stats.count,
+            'sql_time_ms': round(stats.duration * 1000, 2),
+            'sql': [[sql, round(elapsed * 1000, 3)] for sql, elapsed in stats.statements],
+            'summary': summary,
+        }
+        try:
+            response['X-Profile-Id'] = self.store.save(meta, raw, raw_ext)
+        except OSError:
+            logger.exception('Could not store request profile')
+        return response
@@ -0,0 +1,157 @@
+"""
+Per-request SQL query counting, N+1 detection and per-view query budgets.
+
+Views declare how many queries a request may issue:
+
+    @query_budget(3, methods=['GET'])
+    @api_view(['GET', 'POST'])
+    def patient_measurements_list(request, patient_id): ...
+
+    class PatientViewSet(viewsets.ModelViewSet):
+        query_budgets = {'list': 2, 'retrieve': 3, 'prescription:get': 3}
+
+QueryBudgetMiddleware counts every query the request runs (on all database
+aliases), flags SQL shapes that repeat - the signature of an N+1 - and
+checks the count against the view's budget.
+
+Counting follows the request's context rather than its thread, so the
+queries an async view runs through sync_to_async() are counted too.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+# Collapse literal lists so `IN (%s, %s)` and `IN (%s, %s, %s)` share a shape
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a view exceeds its query budget or runs an N+1."""
+
+
+def normalize_sql(sql):
+    """Reduce a SQL statement to its shape (parameters and literals removed)."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryStats:
+    """
+    Every query run inside a count_queries() block.
+
+    Only the raw SQL and timing are stored per query; shapes are computed
+    lazily when duplicates are requested.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.duration = 0.0
+
+    def record(self, sql, elapsed):
+        self.duration += elapsed
+        self.statements.append((sql, elapsed))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def duplicates(self, threshold=2):
+        """SQL shapes executed at least `threshold` times, most frequent first."""
+        shapes = Counter(normalize_sql(sql) for sql, _ in self.statements)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+
+# QueryStats of the count_queries() blocks the current context is in
+_active_stats = ContextVar('active_query_stats', default=())
+
+
+def _record_queries(execute, sql, params, many, context):
+    active = _active_stats.get()
+    if not active:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for stats in active:
+            stats.record(sql, elapsed)
+
+
+def _install(connection, **kwargs):
+    if _record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_queries)
+
+
+# Connections are per thread: hook each one as it connects
+connection_created.connect(_install, dispatch_uid='monitoring.query_budget')
+
+
+@contextmanager
+def count_queries():
+    """Record the queries run inside the block on every database alias."""
+    for conn in connections.all(initialized_only=True):
+        _install(conn)
+    stats = QueryStats()
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+@contextmanager
+def uncounted():
+    """Run queries that aren't the request's own (e.g. health probes) outside every count."""
+    token = _active_stats.set(())
+    try:
+        yield
+    finally:
+        _active_stats.reset(token)
+
+
+def query_budget(max_queries, methods=None):
+    """
+    Declare the maximum number of queries a function-based view may run,
+    optionally only for some HTTP methods (e.g. the GET side of a GET/POST view).
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        view_func.query_budget_methods = [m.upper() for m in methods] if methods else None
+        return view_func
+    return decorator
+
+
+def get_view_budget(view_func, request):
+    """
+    Resolve the budget for a resolved view.
+
+    Function views carry `query_budget`; DRF viewsets declare a
+    `query_budgets` dict keyed by action name, or by `action:method` for
+    actions that serve several methods (e.g. 'prescription:get').
+    """
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is not None:
+        methods = getattr(view_func, 'query_budget_methods', None)
+        if methods and request.method not in methods:
+            return None
+        return budget
+
+    view_class = getattr(view_func, 'cls', None)
+    budgets = getattr(view_class, 'query_budgets', None)
+    actions = getattr(view_func, 'actions', None)
+    if budgets and actions:
+        method = request.method.lower()
+        action = actions.get(method)
+        return budgets.get(f'{action}:{method}', budgets.get(action))
+    return None
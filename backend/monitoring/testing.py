@@ -0,0 +1,56 @@
+"""
+Test helpers for query budgets and N+1 detection.
+
+    from monitoring.testing import QueryBudgetTestMixin
+
+    class PatientListTests(QueryBudgetTestMixin, APITestCase):
+        def test_list_is_constant(self):
+            with self.assertMaxQueries(2), self.assertNoNPlusOne():
+                self.client.get('/api/patients/')
+
+        def test_within_declared_budgets(self):
+            self.assertViewBudget('/api/patients/')
+"""
+
+from contextlib import contextmanager
+
+from django.urls import resolve
+
+from .query_budget import count_queries, get_view_budget
+
+
+class QueryBudgetTestMixin:
+    """Assertions for TestCase subclasses."""
+
+    duplicate_threshold = 2
+
+    @contextmanager
+    def assertMaxQueries(self, max_queries):
+        with count_queries() as stats:
+            yield stats
+        if stats.count > max_queries:
+            listing = '\n'.join(f'  {i}. {sql}' for i, (sql, _) in enumerate(stats.statements, 1))
+            self.fail(f'{stats.count} queries executed, expected at most {max_queries}:\n{listing}')
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        threshold = threshold or self.duplicate_threshold
+        with count_queries() as stats:
+            yield stats
+        duplicates = stats.duplicates(threshold)
+        if duplicates:
+            listing = '\n'.join(f'  {n}x {shape}' for shape, n in duplicates)
+            self.fail(f'Repeated SQL shapes (possible N+1):\n{listing}')
+
+    def assertViewBudget(self, path, method='get', **kwargs):
+        """Request `path` and check it against the budget its view declares."""
+        match = resolve(path.split('?')[0])
+        with count_queries() as stats:
+            response = getattr(self.client, method)(path, **kwargs)
+        request = response.wsgi_request
+        budget = get_view_budget(match.func, request)
+        if budget is None:
+            self.fail(f'{match.view_name} declares no query budget')
+        if stats.count > budget:
+            self.fail(f'{method.upper()} {path}: {stats.count} queries, budget {budget}')
+        return response
@@ -0,0 +1,114 @@
+"""
+Every list endpoint stays within its declared query budget, with the same
+number of queries for N and 10N rows (no N+1).
+"""
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from measurements.models import Measurement
+from monitoring.query_budget import count_queries
+from monitoring.testing import QueryBudgetTestMixin
+from patients.models import CustomUser, Patient, Visit
+from prescriptions.models import Prescription, PrescriptionHistory
+from reports.models import Report
+
+N = 5
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budgets'}},
+    QUERY_BUDGET_STRICT=False,
+)
+class ListQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user(username='budget_admin', password='unused', role='ADMIN')
+        cls.portal_user = CustomUser.objects.create_user(username='budget_patient', password='unused', role='PATIENT')
+        cls.patient = Patient.objects.create(
+            name='Laxmi Devi', age=62, gender='Female', phone='9845012345', user=cls.portal_user,
+            portal_consent_given=True,
+        )
+        cls.patient.start_visit(reason='Checkup')
+        Prescription.objects.create(patient=cls.patient)
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def add_patients(self, count):
+        for i in range(count):
+            patient = Patient.objects.create(name=f'Patient {i}', age=30 + i, gender='Other', phone=f'90000{i:05d}')
+            patient.start_visit(reason='Fever')
+
+    def add_measurements(self, count):
+        Measurement.objects.bulk_create(
+            Measurement(patient=self.patient, visit_id=self.patient.current_visit_id, heart_rate=70 + i)
+            for i in range(count)
+        )
+
+    def add_reports(self, count):
+        Report.objects.bulk_create(
+            Report(patient=self.patient, report_image=f'reports/{i}.png', extracted_text='Hb 13.2 g/dL')
+            for i in range(count)
+        )
+
+    def add_visits(self, count):
+        Visit.objects.bulk_create(Visit(patient=self.patient, reason=f'Visit {i}') for i in range(count))
+
+    def add_prescription_history(self, count):
+        PrescriptionHistory.objects.bulk_create(
+            PrescriptionHistory(patient=self.patient, medicines=[{'name': 'Paracetamol'}]) for _ in range(count)
+        )
+
+    def assertScales(self, path, add_rows, user=None):
+        """Within budget, and the same number of queries, with N and 10N rows."""
+        self.authenticate(user or self.staff)
+        counts = []
+        sizes = []
+        for rows in (N, 9 * N):
+            add_rows(rows)
+            cache.clear()  # Count the cold path: no cached user/patient lookups
+            with count_queries() as stats:
+                response = self.assertViewBudget(path)
+            self.assertEqual(response.status_code, 200, getattr(response, 'data', response.content))
+            counts.append(stats.count)
+            sizes.append(len(response.content))
+        self.assertGreater(sizes[1], sizes[0], f'{path} does not list the rows added')
+        self.assertEqual(counts[0], counts[1], f'{path}: {counts[0]} queries for {N} rows, {counts[1]} for {10 * N}')
+
+    def test_patients(self):
+        self.assertScales('/api/patients/', self.add_patients)
+
+    def test_patients_by_status(self):
+        self.assertScales('/api/patients/?status=waiting', self.add_patients)
+
+    def test_prioritized_patients(self):
+        self.assertScales('/api/patients/prioritized/', self.add_patients)
+
+    def test_patient_search(self):
+        self.assertScales('/api/patients/search/?q=Patient', self.add_patients)
+
+    def test_patient_prescription_history(self):
+        self.assertScales(f'/api/patients/{self.patient.pk}/prescription-history/', self.add_prescription_history)
+
+    def test_patient_measurements(self):
+        self.assertScales(f'/api/patients/{self.patient.pk}/measurements/', self.add_measurements)
+
+    def test_reports(self):
+        self.assertScales('/api/reports/', self.add_reports)
+
+    def test_patient_reports(self):
+        self.assertScales(f'/api/patients/{self.patient.pk}/reports/', self.add_reports)
+
+    def test_portal_measurements(self):
+        self.assertScales('/api/patient-portal/measurements/', self.add_measurements, user=self.portal_user)
+
+    def test_portal_prescription_history(self):
+        self.assertScales(
+            '/api/patient-portal/prescription-history/', self.add_prescription_history, user=self.portal_user
+        )
+
+    def test_portal_visits(self):
+        self.assertScales('/api/patient-portal/visits/', self.add_visits, user=self.portal_user)
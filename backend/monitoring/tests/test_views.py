@@ -0,0 +1,20 @@
+from django.test import TestCase, override_settings
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MetricsAccessTests(TestCase):
+    @override_settings(DEBUG=False, METRICS_TOKEN='')
+    def test_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='')
+    def test_open_without_a_token_in_debug(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='s3cret')
+    def test_token_required_when_set(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'ashwini_patient_queue_depth', response.content)
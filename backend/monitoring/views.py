@@ -0,0 +1,63 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse
+
+from ashwini_backend import replicas
+from ashwini_backend.pooled_postgresql import pool
+from patients.models import Patient, Visit
+
+from . import metrics
+
+
+def _queue_depth():
+    counts = dict(Patient.objects.values_list('current_visit__status').annotate(n=Count('id')).order_by())
+    return [((status,), counts.get(status, 0)) for status, _ in Visit.STATUS_CHOICES]
+
+
+def _worker_gauges():
+    workers = metrics.IN_FLIGHT.workers()
+    # Don't count the scrape itself
+    pid = os.getpid()
+    if workers.get(pid):
+        workers[pid] -= 1
+    busy = sum(1 for n in workers.values() if n > 0)
+    return [
+        ('ashwini_workers', 'Live worker processes', (), [((), len(workers))]),
+        ('ashwini_workers_busy', 'Worker processes handling a request', (), [((), busy)]),
+        ('ashwini_worker_saturation_ratio', 'Busy workers / live workers', (),
+         [((), round(busy / len(workers), 4) if workers else 0)]),
+        ('ashwini_requests_in_flight', 'Requests being handled, per worker', ('pid',),
+         [((pid,), n) for pid, n in sorted(workers.items())]),
+    ]
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+
+    The scraper must send `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    METRICS_TOKEN the endpoint is only open when DEBUG is on; otherwise it
+    refuses every request rather than publish the metrics.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not settings.DEBUG:
+        return HttpResponse('Forbidden: METRICS_TOKEN is not set\n', status=403, content_type='text/plain')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, token):
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+
+    gauges = [
+        ('ashwini_patient_queue_depth', 'Patients by queue status', ('status',), _queue_depth()),
+        *_worker_gauges(),
+    ]
+    if settings.DATABASE_POOL:
+        gauges.extend(pool.gauges())
+    if replicas.replica_aliases():
+        gauges.append(('ashwini_db_replica_lag_seconds', 'Replica lag as this worker last measured it (-1: unreachable)',
+                       ('database',), replicas.lag_gauges()))
+    body = metrics.render_prometheus(gauges)
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Patient, VisitHistory, ConsentLog
+from .models import CustomUser, Patient, Visit, ConsentLog
 
 
 @admin.register(CustomUser)
@@ -25,35 +25,73 @@ class CustomUserAdmin(UserAdmin):
     )
 
 
+class VisitInline(admin.TabularInline):
+    model = Visit
+    fields = ['visit_time', 'reason', 'status', 'health_status', 'priority_score', 'notes', 'next_visit_date', 'closed_at']
+    # Status changes go through the visit's own page so closed_at follows them,
+    # and new visits are started by checking the patient in
+    readonly_fields = ['visit_time', 'status', 'closed_at']
+    ordering = ['-visit_time']
+    extra = 0
+    show_change_link = True
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'age', 'gender', 'status', 'visit_time']
-    list_filter = ['status', 'gender', 'visit_time']
+    list_display = ['id', 'name', 'age', 'gender', 'current_status', 'current_visit_time']
+    list_filter = ['current_visit__status', 'gender', 'current_visit__visit_time']
     search_fields = ['name', 'phone']
-    ordering = ['-visit_time']
+    ordering = ['-current_visit__visit_time']
+    list_select_related = ['current_visit']
+    inlines = [VisitInline]
     
     fieldsets = (
         ('Demographics', {
             'fields': ('name', 'age', 'gender', 'phone', 'address')
         }),
         ('Visit Information', {
-            'fields': ('reason', 'visit_time', 'status')
-        }),
-        ('Doctor\'s Notes', {
-            'fields': ('notes', 'next_visit_date')
+            'fields': ('current_visit',)
         }),
     )
     
-    readonly_fields = ['visit_time']
+    readonly_fields = ['current_visit']
+    
+    @admin.display(description='Status', ordering='current_visit__status')
+    def current_status(self, obj):
+        return obj.current_visit.status if obj.current_visit else None
+    
+    @admin.display(description='Visit time', ordering='current_visit__visit_time')
+    def current_visit_time(self, obj):
+        return obj.current_visit.visit_time if obj.current_visit else None
 
 
-@admin.register(VisitHistory)
-class VisitHistoryAdmin(admin.ModelAdmin):
-    list_display = ['id', 'patient', 'visit_time', 'status', 'health_status', 'archived_at']
+@admin.register(Visit)
+class VisitAdmin(admin.ModelAdmin):
+    list_display = ['id', 'patient', 'visit_time', 'status', 'health_status', 'closed_at']
     list_filter = ['status', 'health_status', 'visit_time']
     search_fields = ['patient__name', 'reason', 'notes']
     ordering = ['-visit_time']
-    readonly_fields = ['archived_at']
+    list_select_related = ['patient']
+    readonly_fields = ['patient', 'closed_at']
+    
+    def has_add_permission(self, request):
+        # A visit added here would never become the patient's current visit
+        return False
+    
+    def get_readonly_fields(self, request, obj=None):
+        readonly = list(super().get_readonly_fields(request, obj))
+        if obj is not None and obj.patient.current_visit_id != obj.pk:
+            # Past visits were closed by a later check-in; reopening one would put it back in the queue
+            readonly.append('status')
+        return readonly
+    
+    def save_model(self, request, obj, form, change):
+        if 'status' in form.changed_data:
+            obj.set_status(obj.status)
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(ConsentLog)
@@ -0,0 +1,115 @@
+"""
+Server-sent event feeds of patient data changes, read from the change log
+the portal delta sync uses (patients.ChangeLog).
+
+    GET /api/patients/events/          staff: changes to every patient
+    GET /api/patient-portal/events/    a patient: changes to their own data
+
+Each change log entry is one event:
+
+    id: 1234
+    event: change
+    data: {"patient_id":42,"model":"measurement","object_id":981,"action":"upsert"}
+
+Clients resume after the last id they saw with the Last-Event-ID header
+(EventSource sends it when it reconnects) or ?after=<id>; without either the
+feed starts at the current end of the log.
+
+Under ASGI the stream stays open: the log is read every SSE_POLL_INTERVAL
+seconds, a comment is sent every SSE_HEARTBEAT_INTERVAL seconds of silence so
+proxies keep the connection, and after SSE_MAX_DURATION seconds the stream
+ends and the client reconnects. The database connection is released between
+reads, so idle streams don't pin connections. Under WSGI, where an open
+stream would hold a worker, the response carries the entries there are now
+and a `retry:` hint that makes EventSource poll.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.http import HttpResponse, StreamingHttpResponse
+
+from ashwini_backend.async_utils import is_asgi
+
+
+# Entries read from the log at a time
+BATCH_SIZE = 200
+
+EVENT_FIELDS = ('patient_id', 'model', 'object_id', 'action')
+
+
+def last_event_id(request):
+    """The id to resume after (Last-Event-ID or ?after=), or None to start at the end."""
+    value = request.headers.get('Last-Event-ID') or request.query_params.get('after')
+    return int(value) if value and value.isdigit() else None
+
+
+def format_event(entry):
+    data = json.dumps({name: entry[name] for name in EVENT_FIELDS}, separators=(',', ':'))
+    return f"id: {entry['id']}\nevent: change\ndata: {data}\n\n"
+
+
+def _read(entries, after):
+    """(last id, entries after `after`) - at most BATCH_SIZE of them."""
+    if after is None:
+        last = entries.aggregate(last=Max('id'))['last'] or 0
+        return last, []
+    rows = list(entries.filter(id__gt=after).order_by('id').values('id', *EVENT_FIELDS)[:BATCH_SIZE])
+    return (rows[-1]['id'] if rows else after), rows
+
+
+@sync_to_async
+def _read_and_release(entries, after):
+    try:
+        return _read(entries, after)
+    finally:
+        connections[entries.db].close()
+
+
+async def _stream(entries, after):
+    retry_ms = int(settings.SSE_POLL_INTERVAL * 1000)
+    yield f'retry: {retry_ms}\n\n'
+
+    started = time.monotonic()
+    quiet_since = started
+    announced = after
+    while True:
+        after, rows = await _read_and_release(entries, after)
+        if rows:
+            yield ''.join(format_event(row) for row in rows)
+            quiet_since = time.monotonic()
+            if len(rows) == BATCH_SIZE:
+                continue  # More are waiting
+        elif after != announced or time.monotonic() - quiet_since >= settings.SSE_HEARTBEAT_INTERVAL:
+            # The id (no event) moves the client's Last-Event-ID to where we are
+            yield f'id: {after}\n: keep-alive\n\n'
+            quiet_since = time.monotonic()
+        announced = after
+
+        if time.monotonic() - started >= settings.SSE_MAX_DURATION:
+            return
+        await asyncio.sleep(settings.SSE_POLL_INTERVAL)
+
+
+async def event_stream_response(request, entries):
+    """
+    The SSE response for the change log entries in `entries`, a ChangeLog
+    queryset (e.g. filtered to one patient).
+    """
+    after = last_event_id(request)
+    if is_asgi(request):
+        response = StreamingHttpResponse(_stream(entries, after), content_type='text/event-stream')
+    else:
+        after, rows = await sync_to_async(_read)(entries, after)
+        body = f'retry: {int(settings.SSE_POLL_INTERVAL * 1000)}\n\n'
+        body += ''.join(format_event(row) for row in rows) if rows else f'id: {after}\n\n'
+        response = HttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
@@ -0,0 +1,245 @@
+"""
+Streaming exports of patients, visits and measurements as CSV or NDJSON,
+for analytics and audits.
+
+    GET /api/exports/<dataset>.<csv|ndjson>?from=&to=&status=&health_status=
+    python manage.py export_data <dataset> --format csv|ndjson [--from ...] [--output FILE]
+
+Datasets (DATASETS) are read with values_list() in primary key order
+through QuerySet.iterator(chunk_size=...) - a server-side cursor on
+PostgreSQL - and written CHUNK_ROWS rows at a time, so memory stays
+constant however many rows are exported. Where server-side cursors are
+disabled (DATABASE_PGBOUNCER) the rows are read in keyset pages instead.
+
+Filters:
+
+- from / to: a date or datetime; the dataset's date column (a patient's
+  current visit time, a visit's visit time, a measurement's timestamp)
+  is at or after `from` and before `to` - a date `to` includes that day
+- status / health_status: of the visit (for patients their current
+  visit, for measurements the visit they were taken in)
+
+CSV text cells that a spreadsheet would read as a formula (starting with
+=, +, -, @, tab or carriage return - a name or note typed as
+"=HYPERLINK(...)") are written with a leading apostrophe, so they open
+as text. NDJSON is written as stored.
+
+Under WSGI the response iterates the rows in the request's thread; under
+ASGI a dedicated thread reads them, so the cursor and its connection stay
+on one thread while the event loop sends the chunks.
+"""
+
+import asyncio
+import csv
+import io
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.db import connections, router
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ashwini_backend.async_utils import is_asgi
+from ashwini_backend.renderers import ORJSONRenderer
+from measurements.models import Measurement
+from .models import Patient, Visit
+
+
+# Rows read per round trip / written per response chunk
+CHUNK_SIZE = 2000
+CHUNK_ROWS = 500
+
+# Cell starts that make a spreadsheet evaluate the cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# columns: (output name, values_list() path); the first is the primary key
+Dataset = namedtuple('Dataset', ('model', 'columns', 'date_field', 'status_field', 'health_status_field'))
+
+DATASETS = {
+    'patients': Dataset(
+        model=Patient,
+        columns=(
+            ('id', 'id'), ('patient_id', 'patient_id'), ('name', 'name'), ('age', 'age'),
+            ('gender', 'gender'), ('phone', 'phone'), ('address', 'address'),
+            ('status', 'current_visit__status'), ('health_status', 'current_visit__health_status'),
+            ('priority_score', 'current_visit__priority_score'), ('visit_time', 'current_visit__visit_time'),
+            ('consent_timestamp', 'consent_timestamp'),
+        ),
+        date_field='current_visit__visit_time',
+        status_field='current_visit__status',
+        health_status_field='current_visit__health_status',
+    ),
+    'visits': Dataset(
+        model=Visit,
+        columns=(
+            ('id', 'id'), ('patient_id', 'patient__patient_id'), ('visit_time', 'visit_time'),
+            ('reason', 'reason'), ('status', 'status'), ('health_status', 'health_status'),
+            ('priority_score', 'priority_score'), ('last_assessment_time', 'last_assessment_time'),
+            ('notes', 'notes'), ('next_visit_date', 'next_visit_date'), ('closed_at', 'closed_at'),
+        ),
+        date_field='visit_time',
+        status_field='status',
+        health_status_field='health_status',
+    ),
+    'measurements': Dataset(
+        model=Measurement,
+        columns=(
+            ('id', 'id'), ('patient_id', 'patient__patient_id'), ('visit_id', 'visit_id'),
+            ('timestamp', 'timestamp'), ('blood_pressure', 'blood_pressure'), ('temperature', 'temperature'),
+            ('spo2', 'spo2'), ('heart_rate', 'heart_rate'), ('source', 'source'),
+        ),
+        date_field='timestamp',
+        status_field='visit__status',
+        health_status_field='visit__health_status',
+    ),
+}
+
+
+def _moment(value, name, end=False):
+    """A from/to filter value as an aware datetime; a date `to` means the end of that day."""
+    try:
+        # Date first: parse_datetime() also takes a bare date, as midnight
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:  # Well formed but not a real date
+        moment = day = None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    elif moment is None:
+        raise ValueError(f"'{name}' must be a date (YYYY-MM-DD) or an ISO 8601 datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_filters(params):
+    """
+    The export filters in `params` (query parameters, or the export_data
+    options), validated. Raises ValueError with a message for the client.
+    """
+    filters = {}
+    if params.get('from'):
+        filters['from'] = _moment(params['from'], 'from')
+    if params.get('to'):
+        filters['to'] = _moment(params['to'], 'to', end=True)
+    for name, choices in (('status', Visit.STATUS_CHOICES), ('health_status', Visit.HEALTH_STATUS_CHOICES)):
+        value = params.get(name)
+        if value:
+            allowed = [choice for choice, _ in choices]
+            if value not in allowed:
+                raise ValueError(f"'{name}' must be one of: {', '.join(allowed)}")
+            filters[name] = value
+    return filters
+
+
+def export_queryset(dataset, filters, using=None):
+    """The dataset's rows matching `filters`: a values_list() queryset in primary key order."""
+    spec = DATASETS[dataset]
+    queryset = spec.model.objects.using(using or router.db_for_read(spec.model))
+    if 'from' in filters:
+        queryset = queryset.filter(**{f'{spec.date_field}__gte': filters['from']})
+    if 'to' in filters:
+        queryset = queryset.filter(**{f'{spec.date_field}__lt': filters['to']})
+    if 'status' in filters:
+        queryset = queryset.filter(**{spec.status_field: filters['status']})
+    if 'health_status' in filters:
+        queryset = queryset.filter(**{spec.health_status_field: filters['health_status']})
+    return queryset.order_by('pk').values_list(*(path for _, path in spec.columns))
+
+
+def _rows(queryset, chunk_size):
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    # A client-side cursor would fetch everything at once: read keyset pages
+    last = None
+    while True:
+        page = list((queryset if last is None else queryset.filter(pk__gt=last))[:chunk_size])
+        yield from page
+        if len(page) < chunk_size:
+            return
+        last = page[-1][0]
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunks(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_cell(value) for value in row])
+        count += 1
+        if count == CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(names, rows):
+    renderer = ORJSONRenderer()
+    lines = []
+    for row in rows:
+        lines.append(renderer.render(dict(zip(names, row))).decode())
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_chunks(dataset, fmt, filters, chunk_size=CHUNK_SIZE, using=None):
+    """The export as str chunks of CHUNK_ROWS rows: CSV with a header row, or NDJSON."""
+    names = [name for name, _ in DATASETS[dataset].columns]
+    rows = _rows(export_queryset(dataset, filters, using), chunk_size)
+    return _csv_chunks(names, rows) if fmt == 'csv' else _ndjson_chunks(names, rows)
+
+
+def _close(chunks):
+    chunks.close()
+    connections.close_all()
+
+
+async def _from_thread(chunks):
+    """Serve a sync iterator under ASGI, reading it on one dedicated thread."""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+    done = object()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        # That thread's connection (and cursor) are closed there too
+        await loop.run_in_executor(executor, _close, chunks)
+        executor.shutdown(wait=False)
+
+
+def export_response(request, dataset, fmt, filters):
+    """The streaming download of an export."""
+    chunks = export_chunks(dataset, fmt, filters)
+    response = StreamingHttpResponse(
+        _from_thread(chunks) if is_asgi(request) else chunks, content_type=FORMATS[fmt]
+    )
+    filename = f'{dataset}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the download
+    return response
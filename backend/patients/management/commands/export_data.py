@@ -0,0 +1,53 @@
+"""
+Django management command to export patients, visits or measurements as CSV or NDJSON.
+
+Usage:
+    python manage.py export_data measurements --format ndjson --from 2026-01-01 --to 2026-03-31
+    python manage.py export_data visits --status completed --output visits.csv
+
+The same streaming export as GET /api/exports/<dataset>.<format> (see
+patients.exports): rows are read through a server-side cursor and written
+as they arrive, so memory stays constant however many rows are exported.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients import exports
+
+
+class Command(BaseCommand):
+    help = 'Streams patients, visits or measurements to a CSV or NDJSON file (or stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(exports.DATASETS))
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv', dest='file_format',
+                            help='Output format (default: csv)')
+        parser.add_argument('--from', dest='from',
+                            help='Only rows dated at or after this date/datetime')
+        parser.add_argument('--to', help='Only rows dated before this datetime, or up to the end of this date')
+        parser.add_argument('--status', help='Only rows whose visit has this status')
+        parser.add_argument('--health-status', help='Only rows whose visit has this health status')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE,
+                            help=f'Rows fetched per round trip (default: {exports.CHUNK_SIZE})')
+        parser.add_argument('--database', default=None,
+                            help='Database alias to read, e.g. replica_1 (default: default)')
+        parser.add_argument('--output', help='Write to this file (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            filters = exports.parse_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = exports.export_chunks(
+            options['dataset'], options['file_format'], filters,
+            chunk_size=options['chunk_size'], using=options['database']
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
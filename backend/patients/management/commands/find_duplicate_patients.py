@@ -0,0 +1,93 @@
+"""
+Django management command to find duplicate patient records.
+
+Usage:
+    python manage.py find_duplicate_patients [--threshold 0.6] [--output duplicates.csv]
+    python manage.py find_duplicate_patients --refresh-keys
+
+Records are compared only within a block - patients sharing a phone number
+(phone_e164) or the sounds of their name (name_phonetic), see
+patients.matching - never all pairs. Each key is streamed in index order
+with a server-side cursor, so one block at a time is held in memory
+however many patients there are. Pairs scoring --threshold or more are
+written as CSV for review; nothing is merged.
+"""
+
+import csv
+from collections import namedtuple
+from itertools import groupby, islice
+from operator import attrgetter
+
+from django.core.management.base import BaseCommand
+
+from patients import matching
+from patients.models import Patient
+
+BLOCKING_KEYS = ('phone_e164', 'name_phonetic')
+
+Record = namedtuple('Record', ('pk', 'patient_id', 'name', 'phone', 'age', 'gender', *matching.MATCH_KEY_FIELDS))
+
+
+class Command(BaseCommand):
+    help = 'Finds likely duplicate patient records by comparing patients within matching blocks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=matching.REVIEW_THRESHOLD,
+                            help=f'Lowest score reported (default: {matching.REVIEW_THRESHOLD})')
+        parser.add_argument('--max-block-size', type=int, default=500,
+                            help='Skip blocks larger than this - a shared clinic phone, a very '
+                                 'common name (default: 500)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows fetched per round trip (default: 5000)')
+        parser.add_argument('--output', help='Write the pairs to this CSV file (default: stdout)')
+        parser.add_argument('--refresh-keys', action='store_true',
+                            help='Recompute the matching keys of every patient first')
+
+    def handle(self, *args, **options):
+        if options['refresh_keys']:
+            changed = matching.refresh_keys(Patient.objects.all())
+            self.stderr.write(f'Refreshed the matching keys of {changed} patients')
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['score', 'reasons', 'patient_a', 'name_a', 'phone_a', 'patient_b', 'name_b', 'phone_b'])
+            seen = set()
+            compared = skipped = 0
+            for key in BLOCKING_KEYS:
+                rows = (
+                    Patient.objects.exclude(**{key: ''}).order_by(key)
+                    .values_list(*Record._fields).iterator(chunk_size=options['chunk_size'])
+                )
+                for _, group in groupby(map(Record._make, rows), key=attrgetter(key)):
+                    # Never hold more of a block than is compared; groupby skips the rest
+                    block = list(islice(group, options['max_block_size'] + 1))
+                    if len(block) > options['max_block_size']:
+                        skipped += 1
+                        continue
+                    compared += len(block) * (len(block) - 1) // 2
+                    for a, b, total, reasons in self.compare(block, options['threshold']):
+                        # A pair sharing both phone and name sounds is found in both passes
+                        if (a.pk, b.pk) in seen:
+                            continue
+                        seen.add((a.pk, b.pk))
+                        writer.writerow([total, '+'.join(reasons), a.patient_id, a.name, a.phone,
+                                         b.patient_id, b.name, b.phone])
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(
+            f'{len(seen)} possible duplicate pairs ({compared} pairs compared'
+            + (f', {skipped} blocks over --max-block-size skipped' if skipped else '') + ')'
+        ))
+
+    @staticmethod
+    def compare(block, threshold):
+        """The pairs of the block scoring at least threshold, as (a, b, score, reasons)."""
+        block.sort(key=attrgetter('pk'))
+        for i, a in enumerate(block):
+            for b in block[i + 1:]:
+                total, reasons = matching.score(a, b)
+                if total >= threshold:
+                    yield a, b, total, reasons
@@ -0,0 +1,30 @@
+"""
+Django management command to delete old patient change-log entries.
+
+Usage:
+    python manage.py prune_changelog [--days N]
+
+Run daily (e.g. from cron). Sync tokens older than the retention window get
+a full snapshot, so nothing is lost by pruning past it.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from patients.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = 'Deletes change-log entries older than SYNC_CHANGELOG_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SYNC_CHANGELOG_RETENTION_DAYS,
+                            help='Keep entries this many days old (default: SYNC_CHANGELOG_RETENTION_DAYS)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} change-log entries older than {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,31 @@
+"""
+Django management command to run the release steps: database migrations and
+the default superuser (see ashwini_backend.boot).
+
+Usage:
+    python manage.py release
+    python manage.py release --only-changed
+
+Run it once per deploy, e.g. as the platform's release / pre-deploy command.
+Servers started by app.py or start.sh skip the steps it has already done.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ashwini_backend import boot
+
+
+class Command(BaseCommand):
+    help = 'Runs database migrations and creates/updates the default superuser'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only-changed',
+            action='store_true',
+            help='Skip steps already done by a previous release (the boot fast path)',
+        )
+
+    def handle(self, *args, **options):
+        timings = boot.Timings()
+        boot.release(timings, only_changed=options['only_changed'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'✓ Release completed in {timings}'))
@@ -0,0 +1,452 @@
+"""
+Django management command to generate a synthetic, production-scale dataset.
+
+Usage:
+    python manage.py seed_load_data --patients 1000000 --measurements 100000000
+    python manage.py seed_load_data --patients 20000 --workers 4 --seed 7
+
+Generates patients (with prescriptions and consent logs), their visits,
+measurement streams with their device sessions, prescription history and
+report rows using chunked bulk_create. Patients are split into fixed-size
+chunks and every chunk gets its own RNG derived from --seed and the chunk
+number, so the generated data is identical however many worker processes
+are used.
+
+Intended for load testing and benchmarks only - never run it against the
+production database.
+"""
+
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan', 'Kabir',
+    'Ananya', 'Diya', 'Aadhya', 'Saanvi', 'Ishita', 'Kavya', 'Meera', 'Priya', 'Riya', 'Neha',
+    'Rahul', 'Amit', 'Suresh', 'Ramesh', 'Vikram', 'Sunita', 'Lakshmi', 'Pooja', 'Anjali', 'Deepa',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Patel', 'Reddy', 'Nair', 'Iyer', 'Rao',
+    'Das', 'Mehta', 'Joshi', 'Chopra', 'Banerjee', 'Mukherjee', 'Pillai', 'Menon', 'Yadav', 'Mishra',
+]
+CITIES = ['Delhi', 'Mumbai', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Jaipur', 'Lucknow', 'Patna']
+REASONS = [
+    'Fever and body ache', 'Routine check-up', 'Persistent cough', 'Headache', 'Chest pain',
+    'Shortness of breath', 'Follow-up visit', 'Diabetes review', 'Blood pressure review', 'Stomach pain',
+]
+MEDICINES = [
+    ('Paracetamol', 'Tablet', 'Full'), ('Amoxicillin', 'Capsule', 'Full'), ('Cetirizine', 'Tablet', 'Half'),
+    ('Metformin', 'Tablet', 'Full'), ('Amlodipine', 'Tablet', 'Full'), ('ORS', 'Sachet', '1 packet'),
+    ('Cough Syrup', 'Syrup', '5ml'), ('IV Saline', 'Serum', '500ml'), ('Pantoprazole', 'Tablet', 'Full'),
+]
+DOSES = ['once a day', 'twice a day', 'thrice a day', 'before meals', 'at night']
+KEY_PHRASES = [
+    'Hemoglobin within normal range', 'Elevated fasting glucose', 'Mild anemia', 'Normal ECG',
+    'Cholesterol slightly high', 'No acute abnormality', 'Chest X-ray clear', 'Thyroid levels normal',
+]
+
+# (status, weight)
+STATUSES = [('waiting', 2), ('checking', 1), ('examined', 2), ('completed', 95)]
+# (health_status, priority_score, weight) - scores match Patient.assess_health_status
+HEALTH = [('critical', 100, 5), ('mild', 50, 20), ('normal', 10, 60), ('unknown', 0, 15)]
+
+
+@contextmanager
+def auto_now_disabled(*fields):
+    """Let bulk_create write historical timestamps into auto_now(_add) fields."""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def share(total, start, end, population):
+    """Rows of `total` that belong to patients [start, end) - stable for any chunking."""
+    return total * end // population - total * start // population
+
+
+def _init_worker():
+    """Process pool initializer - set up Django in spawned workers."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ashwini_backend.settings')
+        django.setup()
+
+
+def seed_chunk(task):
+    """
+    Generate and insert every row belonging to one chunk of patients.
+
+    Runs in a worker process; returns the number of rows created per table.
+    """
+    from patients import matching
+    from patients.models import Patient, Visit, ConsentLog
+    from measurements.models import Measurement
+    from reports.models import Report
+    from prescriptions.models import Prescription, PrescriptionHistory
+    from devices.models import MeasurementSession
+
+    chunk, start, end = task['chunk'], task['start'], task['end']
+    population, batch_size = task['patients'], task['batch_size']
+    rng = random.Random(task['seed'] * 1_000_003 + chunk)
+    anchor = task['anchor']
+    history_days = task['history_days']
+
+    counts = {}
+    buffers = {}
+
+    def add(model, obj):
+        rows = buffers.setdefault(model, [])
+        rows.append(obj)
+        if len(rows) >= batch_size:
+            flush(model)
+
+    def flush(model):
+        rows = buffers.get(model)
+        if rows:
+            model.objects.bulk_create(rows, batch_size=batch_size)
+            counts[model._meta.label] = counts.get(model._meta.label, 0) + len(rows)
+            buffers[model] = []
+
+    def spread(total, size):
+        """Randomly distribute `total` rows over `size` patients."""
+        per = [0] * size
+        for _ in range(total):
+            per[rng.randrange(size)] += 1
+        return per
+
+    size = end - start
+    visits_per = spread(share(task['visits'], start, end, population), size)
+    measurements_per = spread(share(task['measurements'], start, end, population), size)
+    rx_history_per = spread(share(task['prescription_history'], start, end, population), size)
+    reports_per = spread(share(task['reports'], start, end, population), size)
+
+    timestamp_fields = [
+        ConsentLog._meta.get_field('timestamp'),
+        Measurement._meta.get_field('timestamp'),
+        Report._meta.get_field('uploaded_at'),
+        PrescriptionHistory._meta.get_field('created_at'),
+        MeasurementSession._meta.get_field('created_at'),
+        MeasurementSession._meta.get_field('updated_at'),
+    ]
+    device_ids = task['device_ids']
+
+    with auto_now_disabled(*timestamp_fields), transaction.atomic():
+        patients = []
+        current = []
+        for offset in range(size):
+            number = task['first_number'] + start + offset
+            status = rng.choices([s for s, _ in STATUSES], [w for _, w in STATUSES])[0]
+            health_status, score, _ = rng.choices(HEALTH, [w for *_, w in HEALTH])[0]
+            if status == 'completed':
+                visit_time = anchor - timedelta(minutes=rng.randint(60, history_days * 24 * 60))
+            else:
+                visit_time = anchor - timedelta(minutes=rng.randint(0, 8 * 60))
+            consent_time = visit_time - timedelta(days=rng.randint(0, history_days // 2))
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            phone = f'{rng.choice("6789")}{rng.randint(0, 999999999):09d}'
+            patients.append(Patient(
+                patient_id=f'PAT{number:07d}',
+                name=name,
+                age=rng.randint(1, 95),
+                gender=rng.choice(['Male', 'Female', 'Other']),
+                phone=phone,
+                # bulk_create skips Patient.save(), which derives these
+                **matching.match_keys(name, phone)._asdict(),
+                address=f'{rng.randint(1, 999)}, Sector {rng.randint(1, 80)}, {rng.choice(CITIES)}',
+                data_collection_consent=True,
+                data_usage_consent=True,
+                privacy_policy_acknowledged=True,
+                consent_timestamp=consent_time,
+                portal_consent_given=rng.random() < 0.3,
+            ))
+            current.append(Visit(
+                reason=rng.choice(REASONS),
+                visit_time=visit_time,
+                status=status,
+                closed_at=visit_time + timedelta(minutes=rng.randint(20, 90)) if status == 'completed' else None,
+                notes='Advised rest and fluids' if status == 'completed' else None,
+                next_visit_date=(visit_time + timedelta(days=rng.randint(7, 60))).date() if rng.random() < 0.4 else None,
+                health_status=health_status,
+                priority_score=score,
+                last_assessment_time=visit_time + timedelta(minutes=15) if health_status != 'unknown' else None,
+            ))
+        patients = Patient.objects.bulk_create(patients, batch_size=batch_size)
+        counts[Patient._meta.label] = len(patients)
+
+        # Every patient's visits - earlier ones oldest first, each closed when
+        # the next began, then the current one - inserted before the rows
+        # that attach to them
+        visits = []
+        for i, patient in enumerate(patients):
+            visit = current[i]
+            visit.patient = patient
+            visit_times = sorted(
+                visit.visit_time - timedelta(days=rng.randint(1, history_days), minutes=rng.randint(0, 600))
+                for _ in range(visits_per[i])
+            )
+            closed_times = visit_times[1:] + [visit.visit_time]
+            visits.append([
+                Visit(
+                    patient=patient,
+                    visit_time=visit_time,
+                    reason=rng.choice(REASONS),
+                    status='completed',
+                    closed_at=closed_at,
+                    health_status=rng.choices(HEALTH, [w for *_, w in HEALTH])[0][0],
+                    notes='Follow up if symptoms persist',
+                )
+                for visit_time, closed_at in zip(visit_times, closed_times)
+            ] + [visit])
+        Visit.objects.bulk_create([v for patient_visits in visits for v in patient_visits], batch_size=batch_size)
+        counts[Visit._meta.label] = sum(len(patient_visits) for patient_visits in visits)
+        for i, patient in enumerate(patients):
+            patient.current_visit = current[i]
+        Patient.objects.bulk_update(patients, ['current_visit'], batch_size=batch_size)
+
+        for i, patient in enumerate(patients):
+            add(ConsentLog, ConsentLog(
+                patient=patient,
+                action='CONSENT_GRANTED',
+                timestamp=patient.consent_timestamp,
+                ip_address=f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+                user_agent='Mozilla/5.0 (seed_load_data)',
+                data_collection_consent=True,
+                data_usage_consent=True,
+                privacy_policy_acknowledged=True,
+            ))
+            if patient.portal_consent_given:
+                add(ConsentLog, ConsentLog(
+                    patient=patient,
+                    action='PORTAL_CONSENT_GRANTED',
+                    timestamp=patient.consent_timestamp + timedelta(days=rng.randint(0, 30)),
+                    data_collection_consent=True,
+                    data_usage_consent=True,
+                    privacy_policy_acknowledged=True,
+                    notes='Patient gave consent via patient portal',
+                ))
+
+            # Measurement stream: bursts around each visit, vitals drifting
+            # from a per-patient baseline
+            sessions = visits[i]
+            status = current[i].status
+            if device_ids:
+                for n, visit in enumerate(sessions):
+                    is_current = n == len(sessions) - 1
+                    if is_current and status == 'waiting':
+                        continue
+                    if is_current and status == 'checking':
+                        session_status = rng.choice(['pending', 'in_progress'])
+                    else:
+                        session_status = 'completed' if rng.random() < 0.97 else 'failed'
+                    add(MeasurementSession, MeasurementSession(
+                        patient=patient,
+                        device_id=rng.choice(device_ids),
+                        status=session_status,
+                        created_at=visit.visit_time + timedelta(minutes=2),
+                        updated_at=visit.visit_time + timedelta(minutes=10),
+                    ))
+            temp, hr, spo2 = rng.gauss(36.8, 0.4), rng.gauss(76, 8), rng.gauss(97, 1.5)
+            for m in range(measurements_per[i]):
+                visit = sessions[m % len(sessions)]
+                at = visit.visit_time + timedelta(minutes=5 + m // len(sessions), seconds=rng.randint(0, 59))
+                temp += rng.gauss(0, 0.1)
+                hr += rng.gauss(0, 2)
+                spo2 = min(100.0, spo2 + rng.gauss(0, 0.5))
+                add(Measurement, Measurement(
+                    patient=patient,
+                    visit=visit,
+                    timestamp=at,
+                    blood_pressure=f'{rng.randint(100, 150)}/{rng.randint(60, 95)}' if rng.random() < 0.5 else None,
+                    temperature=round(temp, 1),
+                    spo2=round(spo2, 1),
+                    heart_rate=round(hr),
+                    source='device' if rng.random() < 0.7 else 'manual',
+                ))
+
+            add(Prescription, Prescription(patient=patient, medicines=_medicines(rng)))
+            for _ in range(rx_history_per[i]):
+                visit = rng.choice(sessions)
+                add(PrescriptionHistory, PrescriptionHistory(
+                    patient=patient,
+                    visit=visit,
+                    medicines=_medicines(rng),
+                    created_at=visit.visit_time + timedelta(minutes=rng.randint(20, 120)),
+                    visit_date=visit.visit_time,
+                ))
+
+            for _ in range(reports_per[i]):
+                uploaded_at = rng.choice(sessions).visit_time + timedelta(minutes=rng.randint(10, 240))
+                analysed = rng.random() < 0.9
+                add(Report, Report(
+                    patient=patient,
+                    report_image=f'reports/{uploaded_at:%Y/%m/%d}/seed_{patient.pk}_{rng.randint(0, 99999)}.pdf',
+                    uploaded_at=uploaded_at,
+                    uploaded_by=rng.choice(['system', 'reception', 'doctor']),
+                    analysis_status='completed' if analysed else 'failed',
+                    extracted_text=_report_text(rng, patient) if analysed else None,
+                    key_phrases=rng.sample(KEY_PHRASES, rng.randint(2, 5)) if analysed else None,
+                    confidence_score=round(rng.uniform(0.8, 0.99), 2) if analysed else None,
+                    error_message=None if analysed else 'Azure Document Intelligence is not configured',
+                ))
+
+        for model in list(buffers):
+            flush(model)
+
+    return counts
+
+
+def _medicines(rng):
+    return [
+        {'name': name, 'dose': rng.choice(DOSES), 'type': kind, 'quantity': quantity}
+        for name, kind, quantity in rng.sample(MEDICINES, rng.randint(1, 4))
+    ]
+
+
+def _report_text(rng, patient):
+    findings = '\n'.join(f'- {phrase}' for phrase in rng.sample(KEY_PHRASES, 3))
+    return (
+        f'MEDICAL REPORT SUMMARY\n\nPatient: {patient.name}, {patient.age} years, {patient.gender}\n\n'
+        f'Findings:\n{findings}\n\nImpression: {rng.choice(REASONS)}. Clinical correlation advised.'
+    )
+
+
+class Command(BaseCommand):
+    help = 'Generates a deterministic synthetic dataset for load testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=10000, help='Number of patients (default: 10000)')
+        parser.add_argument('--measurements', type=int, default=None,
+                            help='Total measurements (default: 20 per patient)')
+        parser.add_argument('--visits', type=int, default=None,
+                            help='Total earlier visits, besides the current one (default: 2 per patient)')
+        parser.add_argument('--prescription-history', type=int, default=None,
+                            help='Total prescription history rows (default: 2 per patient)')
+        parser.add_argument('--reports', type=int, default=None,
+                            help='Total reports (default: 1 per patient)')
+        parser.add_argument('--devices', type=int, default=20,
+                            help='IoT devices to create for measurement sessions (default: 20)')
+        parser.add_argument('--history-days', type=int, default=730,
+                            help='How far back generated history reaches (default: 730)')
+        parser.add_argument('--anchor', default=None,
+                            help='Date (YYYY-MM-DD) generated data is anchored to (default: today)')
+        parser.add_argument('--seed', type=int, default=42, help='RNG seed (default: 42)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Patients per unit of work (default: 2000)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk_create INSERT (default: 5000)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count; forced to 1 on SQLite)')
+
+    def handle(self, *args, **options):
+        from patients.models import Patient
+        from devices.models import Device
+
+        patients = options['patients']
+        if patients <= 0:
+            raise CommandError('--patients must be positive')
+
+        def total(name, per_patient):
+            value = options[name]
+            return patients * per_patient if value is None else value
+
+        if options['anchor']:
+            try:
+                anchor_date = datetime.strptime(options['anchor'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--anchor must be a date in YYYY-MM-DD format')
+        else:
+            anchor_date = timezone.now().date()
+        anchor = datetime.combine(anchor_date, dt_time(12, 0), tzinfo=dt_timezone.utc)
+
+        workers = max(1, options['workers'])
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write(self.style.WARNING('SQLite does not support concurrent writers - using 1 worker.'))
+            workers = 1
+
+        # Continue numbering after the highest existing PAT id
+        last = Patient.objects.filter(patient_id__startswith='PAT').order_by('-id').first()
+        try:
+            first_number = int(last.patient_id.replace('PAT', '')) + 1 if last else 1
+        except ValueError:
+            first_number = Patient.objects.count() + 1
+
+        device_ids = []
+        if options['devices'] > 0:
+            prefix = f"SEED-{options['seed']}-"
+            Device.objects.bulk_create(
+                [Device(device_id=f'{prefix}{n:04d}', name=f'Kiosk {n}') for n in range(1, options['devices'] + 1)],
+                ignore_conflicts=True
+            )
+            device_ids = list(
+                Device.objects.filter(device_id__startswith=prefix).order_by('device_id').values_list('id', flat=True)
+            )
+
+        chunk_size = options['chunk_size']
+        tasks = [
+            {
+                'chunk': chunk,
+                'start': start,
+                'end': min(start + chunk_size, patients),
+                'patients': patients,
+                'first_number': first_number,
+                'measurements': total('measurements', 20),
+                'visits': total('visits', 2),
+                'prescription_history': total('prescription_history', 2),
+                'reports': total('reports', 1),
+                'history_days': options['history_days'],
+                'anchor': anchor,
+                'device_ids': device_ids,
+                'seed': options['seed'],
+                'batch_size': options['batch_size'],
+            }
+            for chunk, start in enumerate(range(0, patients, chunk_size))
+        ]
+
+        self.stdout.write(
+            f"Seeding {patients:,} patients, {tasks[0]['measurements']:,} measurements, "
+            f"{tasks[0]['visits']:,} earlier visits, {tasks[0]['prescription_history']:,} prescription history rows, "
+            f"{tasks[0]['reports']:,} reports in {len(tasks)} chunks on {workers} worker(s)"
+        )
+
+        started = time.perf_counter()
+        totals = {}
+
+        def record(counts, done):
+            for label, count in counts.items():
+                totals[label] = totals.get(label, 0) + count
+            rows = sum(totals.values())
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  chunk {done}/{len(tasks)} - {rows:,} rows ({rows / elapsed:,.0f} rows/s)')
+
+        if workers == 1:
+            for done, task in enumerate(tasks, 1):
+                record(seed_chunk(task), done)
+        else:
+            # Child processes must not inherit open connections
+            connections.close_all()
+            context = multiprocessing.get_context('fork' if os.name == 'posix' else 'spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+                futures = [pool.submit(seed_chunk, task) for task in tasks]
+                for done, future in enumerate(as_completed(futures), 1):
+                    record(future.result(), done)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('')
+        for label, count in sorted(totals.items()):
+            self.stdout.write(f'  {label:<35}{count:>15,}')
+        self.stdout.write(self.style.SUCCESS(f'✓ Seeded {sum(totals.values()):,} rows in {elapsed:.1f}s'))
@@ -0,0 +1,49 @@
+"""
+Django management command to refresh SQLite read replicas from the primary
+database and report every replica's lag (see ashwini_backend.replicas).
+
+Usage:
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3 python manage.py sync_replicas
+
+SQLite replicas stand in for real ones in development: each run copies the
+primary into them, and they lag from the primary's next write until the
+next run. PostgreSQL replicas are kept current by streaming replication;
+for them the command only reports the lag.
+"""
+
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ashwini_backend import replicas
+
+
+class Command(BaseCommand):
+    help = 'Copies the primary database into SQLite read replicas and reports replica lag'
+
+    def handle(self, *args, **options):
+        aliases = replicas.replica_aliases()
+        if not aliases:
+            raise CommandError('No read replicas configured (DATABASE_REPLICA_URLS)')
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            connection = connections[alias]
+            if connection.vendor == 'sqlite' and primary.vendor == 'sqlite':
+                connection.close()
+                source = sqlite3.connect(primary.settings_dict['NAME'])
+                target = sqlite3.connect(connection.settings_dict['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    source.close()
+                    target.close()
+                self.stdout.write(f'Copied {primary.settings_dict["NAME"]} to {alias} ({connection.settings_dict["NAME"]})')
+
+            try:
+                lag = replicas.measure_lag(alias)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'{alias}: unreachable ({e})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{alias}: {lag:.1f}s behind the primary'))
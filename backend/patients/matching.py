@@ -0,0 +1,310 @@
+"""
+Patient matching: which existing patient a registration is, and which
+patient records are duplicates of each other.
+
+Exact `phone` + `name` lookups miss the same person typed differently
+("098450 12345" / "+91 98450-12345", "Mohd. Imran Khan" / "Khan Imran").
+Matching works on keys stored with each patient, kept current by
+Patient.save():
+
+- phone_e164: the phone number in E.164 form (normalize_phone())
+- name_key: the name in lower case without accents, punctuation or titles
+- name_phonetic: the sorted phonetic codes of its words (phonetic_code()),
+  the same for "Laxmi Devi" and "Devi Lakshmi"
+
+Registration takes a patient as the same person only on the same
+phone_e164 and name_key (exact_match()) - exact phone + name, as before,
+after normalization. Anything looser is a question for a person: family
+members share a phone and often similar names (Rajesh / Rakesh Kumar,
+Priya / Riya Singh), and merging them would put one person's visit into
+another's medical record. Fuzzy and phonetic candidates (find_matches())
+are therefore only reported, as possible duplicates.
+
+phone_e164 and name_phonetic are the blocking keys: candidates are the
+patients sharing either (both indexed), so a lookup reads a few rows
+however many patients there are. They are scored in memory (score()).
+The batch dedup, manage.py find_duplicate_patients, compares records
+within a block only.
+"""
+
+import re
+import unicodedata
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from django.conf import settings
+
+# Score at or above which two records are reported as possible duplicates
+REVIEW_THRESHOLD = 0.6
+
+# Most patients read per block at registration (a very common name)
+MAX_CANDIDATES = 200
+
+# Evidence weights; a score ranks candidates for review and never merges them
+PHONE_WEIGHT = 0.5
+NAME_WEIGHT = 0.4
+AGE_WEIGHT = 0.05
+GENDER_WEIGHT = 0.05
+
+MATCH_KEY_FIELDS = ('phone_e164', 'name_key', 'name_phonetic')
+KEY_MAX_LENGTH = 200
+
+TITLES = frozenset({
+    'mr', 'mrs', 'ms', 'miss', 'mx', 'dr', 'prof', 'sri', 'shri', 'shree', 'smt', 'kumari', 'km',
+    'master', 'baby', 'late',
+})
+
+MatchKeys = namedtuple('MatchKeys', MATCH_KEY_FIELDS)
+
+# The incoming side of a registration-time match
+Registration = namedtuple('Registration', (*MATCH_KEY_FIELDS, 'age', 'gender'))
+
+Match = namedtuple('Match', ('patient', 'score', 'reasons'))
+
+
+def normalize_phone(phone, country_code=None):
+    """
+    The phone number in E.164 form ('+919845012345'), or '' when it can't be one.
+
+    '+' and '00' mark an international number. Otherwise the national trunk
+    prefix (0) is dropped and a number of up to 10 digits gets
+    PATIENT_PHONE_COUNTRY_CODE; a longer one is taken to include its
+    country code already.
+    """
+    if not phone:
+        return ''
+    phone = str(phone).strip()
+    digits = re.sub(r'\D', '', phone)
+    if phone.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    else:
+        digits = digits.lstrip('0')
+        if len(digits) <= 10:
+            digits = (country_code or settings.PATIENT_PHONE_COUNTRY_CODE) + digits
+    if not 8 <= len(digits) <= 15:
+        return ''
+    return '+' + digits
+
+
+def name_words(name):
+    """The words of a name: lower case, without accents, punctuation or titles."""
+    text = unicodedata.normalize('NFKD', str(name or '').lower())
+    text = ''.join(
+        ' ' if unicodedata.category(char)[0] in 'PSZC' else char
+        for char in text if not unicodedata.combining(char)
+    )
+    return [word for word in text.split() if word not in TITLES]
+
+
+# Spellings of one sound, longest first; transliterated names spell
+# aspirated consonants with an 'h' (Bharat / Barat, Dhruv / Druv)
+_SPELLINGS = (
+    ('tch', 'X'), ('chh', 'X'), ('sch', 'SK'), ('ksh', 'KS'),
+    ('ch', 'X'), ('sh', 'X'), ('ph', 'F'), ('ck', 'K'), ('gh', 'K'), ('kh', 'K'),
+    ('bh', 'B'), ('dh', 'T'), ('th', 'T'), ('jh', 'J'), ('wh', 'F'),
+)
+_SOUNDS = {'d': 'T', 'g': 'K', 'q': 'K', 'v': 'F', 'w': 'F', 'x': 'KS', 'z': 'S'}
+_VOWELS = frozenset('aeiou')
+_SILENT_STARTS = ('kn', 'gn', 'pn', 'wr', 'ps')
+
+
+def phonetic_code(word):
+    """
+    A Metaphone-style code for one word of a name: consonant sounds, with
+    vowels dropped after the first letter ('MHMT' for Mohamed / Muhammad,
+    'LKSM' for Laxmi / Lakshmi). Words not in Latin letters are kept as they are.
+    """
+    letters = ''.join(char for char in word if 'a' <= char <= 'z')
+    if not letters:
+        return word
+    if letters.startswith(_SILENT_STARTS):
+        letters = letters[1:]
+    code = []
+    previous = ''
+    i = 0
+    while i < len(letters):
+        for spelling, sound in _SPELLINGS:
+            if letters.startswith(spelling, i):
+                i += len(spelling)
+                break
+        else:
+            char = letters[i]
+            following = letters[i + 1:i + 2]
+            i += 1
+            if char == previous:
+                continue
+            previous = char
+            if char in _VOWELS:
+                sound = 'A' if i == 1 else ''
+            elif char in 'cg' and following in ('e', 'i', 'y'):
+                sound = 'S' if char == 'c' else 'J'
+            elif char == 'c':
+                sound = 'K'
+            elif char in 'hy':
+                # Only sounded before a vowel (Shah, Vijay)
+                sound = char.upper() if following in _VOWELS else ''
+            elif char == 'x' and i == 1:
+                sound = 'S'
+            else:
+                sound = _SOUNDS.get(char, char.upper())
+            code.append(sound)
+            continue
+        previous = ''
+        code.append(sound)
+    return ''.join(code)
+
+
+def match_keys(name, phone):
+    """The stored matching keys (MatchKeys) for a name and phone number."""
+    words = name_words(name)
+    return MatchKeys(
+        phone_e164=normalize_phone(phone),
+        name_key=' '.join(words)[:KEY_MAX_LENGTH],
+        name_phonetic=' '.join(sorted({phonetic_code(word) for word in words}))[:KEY_MAX_LENGTH],
+    )
+
+
+def name_similarity(a, b):
+    """Similarity (0-1) of two name keys, whatever order the words are in."""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    in_order = SequenceMatcher(None, a, b).ratio()
+    sorted_words = SequenceMatcher(None, ' '.join(sorted(a.split())), ' '.join(sorted(b.split()))).ratio()
+    return max(in_order, sorted_words)
+
+
+def score(a, b):
+    """
+    How likely two patient records are the same person (0-1), and the
+    evidence for it: a list of 'phone', 'name', 'sounds_alike', 'age', 'gender'.
+
+    a and b are anything with the matching keys, age and gender: Patient
+    instances, Registration tuples or rows of find_duplicate_patients.
+    """
+    total = 0.0
+    reasons = []
+    if a.phone_e164 and b.phone_e164:
+        if a.phone_e164 == b.phone_e164:
+            total += PHONE_WEIGHT
+            reasons.append('phone')
+        else:
+            total -= 0.1
+
+    name = name_similarity(a.name_key, b.name_key)
+    if name >= 0.85:
+        reasons.append('name')
+    if a.name_phonetic and a.name_phonetic == b.name_phonetic:
+        name = max(name, 0.9)
+        reasons.append('sounds_alike')
+    total += NAME_WEIGHT * name
+
+    # Ages are as given at registration, possibly years apart
+    if a.age is not None and b.age is not None:
+        difference = abs(a.age - b.age)
+        if difference <= 2:
+            total += AGE_WEIGHT
+            reasons.append('age')
+        elif difference > 10:
+            total -= AGE_WEIGHT
+    if a.gender and b.gender:
+        if a.gender == b.gender:
+            total += GENDER_WEIGHT
+            reasons.append('gender')
+        else:
+            total -= GENDER_WEIGHT
+    return round(min(max(total, 0.0), 1.0), 3), reasons
+
+
+def _age(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def find_matches(name, phone, age=None, gender=None, queryset=None, threshold=REVIEW_THRESHOLD, limit=5):
+    """
+    Existing patients a registration may be, as Match tuples scoring at
+    least `threshold`, best first (at most `limit`).
+
+    Candidates come from `queryset` (default: all patients) - the patients
+    with the same phone_e164 and those with the same name_phonetic, at
+    most MAX_CANDIDATES of each; two indexed queries.
+    """
+    from .models import Patient
+
+    incoming = Registration(*match_keys(name, phone), age=_age(age), gender=gender or None)
+    queryset = (Patient.objects.all() if queryset is None else queryset).order_by()
+    candidates = {}
+    for key in ('phone_e164', 'name_phonetic'):
+        value = getattr(incoming, key)
+        if value:
+            for patient in queryset.filter(**{key: value})[:MAX_CANDIDATES]:
+                candidates.setdefault(patient.pk, patient)
+
+    matches = []
+    for patient in candidates.values():
+        total, reasons = score(incoming, patient)
+        if total >= threshold:
+            matches.append(Match(patient, total, reasons))
+    matches.sort(key=lambda match: (-match.score, match.patient.pk))
+    return matches[:limit]
+
+
+def exact_match(name, phone, queryset=None):
+    """
+    The existing patient with the same phone_e164 and name_key as a
+    registration, or None: the only match made without a person confirming
+    it. One indexed query.
+    """
+    from .models import Patient
+
+    keys = match_keys(name, phone)
+    if not keys.phone_e164 or not keys.name_key:
+        return None
+    queryset = Patient.objects.all() if queryset is None else queryset
+    return queryset.filter(phone_e164=keys.phone_e164, name_key=keys.name_key).order_by('pk').first()
+
+
+def match_data(matches):
+    """Matches as API data (the `possible_duplicates` of a registration)."""
+    return [
+        {
+            'id': match.patient.pk,
+            'patient_id': match.patient.patient_id,
+            'name': match.patient.name,
+            'phone': match.patient.phone,
+            'score': match.score,
+            'reasons': match.reasons,
+        }
+        for match in matches
+    ]
+
+
+def refresh_keys(queryset, batch_size=2000):
+    """
+    Recompute the stored keys of the queryset's patients, in batches keyed
+    on the primary key; returns how many changed. For rows written without
+    Patient.save() (bulk_create, update()) or after the key rules change.
+    """
+    changed = 0
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').only('pk', 'name', 'phone', *MATCH_KEY_FIELDS)[:batch_size])
+        if not rows:
+            return changed
+        stale = []
+        for row in rows:
+            keys = match_keys(row.name, row.phone)
+            if keys != tuple(getattr(row, field) for field in MATCH_KEY_FIELDS):
+                for field, value in keys._asdict().items():
+                    setattr(row, field, value)
+                stale.append(row)
+        if stale:
+            queryset.model.objects.using(queryset.db).bulk_update(stale, MATCH_KEY_FIELDS)
+            changed += len(stale)
+        last = rows[-1].pk
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_populate_patient_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['status', '-priority_score', 'visit_time'], name='patient_status_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['-priority_score', 'visit_time'], name='patient_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['health_status', '-priority_score', 'visit_time'], name='patient_health_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(('status', 'waiting')), fields=['-priority_score', 'visit_time'], name='patient_waiting_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['phone', 'name'], name='patient_phone_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visithistory',
+            index=models.Index(fields=['patient', '-visit_time'], name='visithistory_patient_time_idx'),
+        ),
+    ]
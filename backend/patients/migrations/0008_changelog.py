@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0007_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('patient_id', models.BigIntegerField()),
+                ('model', models.CharField(choices=[('measurement', 'Measurement'), ('prescription', 'Prescription'), ('prescription_history', 'Prescription History'), ('visit', 'Visit History'), ('report', 'Report')], max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Change Log Entry',
+                'verbose_name_plural': 'Change Log',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['patient_id', 'id'], name='changelog_patient_id_idx'), models.Index(fields=['created_at'], name='changelog_created_idx')],
+            },
+        ),
+    ]
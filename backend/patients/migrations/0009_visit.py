@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Visit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.TextField(blank=True, help_text='Reason for visit', null=True)),
+                ('visit_time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('checking', 'Checking'), ('examined', 'Examined'), ('completed', 'Completed')], default='waiting', max_length=20)),
+                ('closed_at', models.DateTimeField(blank=True, help_text='When the visit was completed or replaced by a later one', null=True)),
+                ('notes', models.TextField(blank=True, help_text="Doctor's notes", null=True)),
+                ('next_visit_date', models.DateField(blank=True, null=True)),
+                ('health_status', models.CharField(choices=[('critical', 'Critical'), ('mild', 'Mild'), ('normal', 'Normal'), ('unknown', 'Unknown')], default='unknown', help_text='Auto-calculated based on latest measurements', max_length=20)),
+                ('priority_score', models.IntegerField(default=0, help_text='Higher score = higher priority (0-100)')),
+                ('last_assessment_time', models.DateTimeField(blank=True, null=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visits', to='patients.patient')),
+            ],
+            options={
+                'ordering': ['-visit_time'],
+                'indexes': [
+                    models.Index(fields=['patient', '-visit_time'], name='visit_patient_time_idx'),
+                    models.Index(condition=models.Q(('closed_at__isnull', True)), fields=['status', '-priority_score', 'visit_time'], name='visit_open_queue_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='current_visit',
+            field=models.OneToOneField(blank=True, help_text="The patient's latest visit", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='patients.visit'),
+        ),
+        migrations.AlterField(
+            model_name='changelog',
+            name='model',
+            field=models.CharField(choices=[('measurement', 'Measurement'), ('prescription', 'Prescription'), ('prescription_history', 'Prescription History'), ('visit', 'Visit'), ('report', 'Report')], max_length=30),
+        ),
+    ]
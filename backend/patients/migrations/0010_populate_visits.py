@@ -0,0 +1,129 @@
+# Generated manually to move visits out of Patient and VisitHistory
+
+"""
+Move the visits out of Patient and VisitHistory into Visit.
+
+- Every VisitHistory row becomes a closed Visit with the same id, so
+  change-log entries recorded against it (ChangeLog.model 'visit') still
+  point at the same visit for the portal delta sync.
+- Every patient's current visit - the visit columns of Patient - becomes a
+  Visit after them, and Patient.current_visit points at it. A completed one
+  is closed as of its visit time, the latest moment known to be before
+  its completion.
+
+Rows are read and inserted in batches of BATCH_SIZE, keyed on the primary
+key, so memory stays flat however many patients there are. Reversible:
+the current visits are copied back into the patient rows and the others
+into VisitHistory.
+"""
+
+from django.core.management.color import no_style
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 2000
+
+PATIENT_VISIT_FIELDS = (
+    'reason', 'visit_time', 'status', 'notes', 'next_visit_date',
+    'health_status', 'priority_score', 'last_assessment_time',
+)
+HISTORY_FIELDS = ('visit_time', 'reason', 'status', 'health_status', 'notes', 'next_visit_date')
+
+
+def batches(queryset):
+    """The queryset's rows as lists of at most BATCH_SIZE, in primary key order."""
+    last = None
+    while True:
+        page = queryset.order_by('pk')
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        rows = list(page[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1].pk
+
+
+def reset_sequence(schema_editor, model):
+    """After inserting explicit ids, make the next generated id follow them (PostgreSQL)."""
+    statements = schema_editor.connection.ops.sequence_reset_sql(no_style(), [model])
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def split_visits(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Patient = apps.get_model('patients', 'Patient')
+    Visit = apps.get_model('patients', 'Visit')
+    VisitHistory = apps.get_model('patients', 'VisitHistory')
+
+    for rows in batches(VisitHistory.objects.using(db)):
+        Visit.objects.using(db).bulk_create([
+            Visit(
+                id=row.pk,
+                patient_id=row.patient_id,
+                closed_at=row.archived_at,
+                **{field: getattr(row, field) for field in HISTORY_FIELDS},
+            )
+            for row in rows
+        ])
+    reset_sequence(schema_editor, Visit)
+    last_archived = Visit.objects.using(db).order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    for rows in batches(Patient.objects.using(db).only('pk', *PATIENT_VISIT_FIELDS)):
+        Visit.objects.using(db).bulk_create([
+            Visit(
+                patient_id=row.pk,
+                closed_at=row.visit_time if row.status == 'completed' else None,
+                **{field: getattr(row, field) for field in PATIENT_VISIT_FIELDS},
+            )
+            for row in rows
+        ])
+
+    # One UPDATE: each patient's only visit created above
+    Patient.objects.using(db).update(current_visit=Subquery(
+        Visit.objects.filter(patient_id=OuterRef('pk'), pk__gt=last_archived).values('pk')[:1]
+    ))
+
+
+def unsplit_visits(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Patient = apps.get_model('patients', 'Patient')
+    Visit = apps.get_model('patients', 'Visit')
+    VisitHistory = apps.get_model('patients', 'VisitHistory')
+
+    current_ids = Patient.objects.using(db).filter(current_visit__isnull=False).values('current_visit_id')
+    for rows in batches(Visit.objects.using(db).exclude(pk__in=current_ids)):
+        history = [
+            VisitHistory(
+                id=row.pk,
+                patient_id=row.patient_id,
+                **{field: getattr(row, field) or '' if field in ('reason', 'notes') else getattr(row, field)
+                   for field in HISTORY_FIELDS},
+            )
+            for row in rows
+        ]
+        VisitHistory.objects.using(db).bulk_create(history)
+        # archived_at is auto_now_add, so bulk_create stamped the current time over it
+        for entry, row in zip(history, rows):
+            entry.archived_at = row.closed_at or row.visit_time
+        VisitHistory.objects.using(db).bulk_update(history, ['archived_at'])
+    reset_sequence(schema_editor, VisitHistory)
+
+    for rows in batches(Patient.objects.using(db).filter(current_visit__isnull=False).select_related('current_visit')):
+        for row in rows:
+            for field in PATIENT_VISIT_FIELDS:
+                setattr(row, field, getattr(row.current_visit, field))
+        Patient.objects.using(db).bulk_update(rows, PATIENT_VISIT_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_visit'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_visits, unsplit_visits),
+    ]
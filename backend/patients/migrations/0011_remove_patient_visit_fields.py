@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0010_populate_visits'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='patient',
+            options={'ordering': ['-current_visit__priority_score', 'current_visit__visit_time']},
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patient_status_queue_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patient_priority_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patient_health_queue_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patient_waiting_queue_idx',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='health_status',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='last_assessment_time',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='next_visit_date',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='notes',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='priority_score',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='reason',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='visit_time',
+        ),
+        migrations.DeleteModel(
+            name='VisitHistory',
+        ),
+    ]
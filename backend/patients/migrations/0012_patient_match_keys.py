@@ -0,0 +1,151 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:40
+
+"""
+Add the patient matching keys and derive them for existing patients.
+
+The key rules are copied here as they were when the keys were added, so
+this migration gives the same result whatever patients.matching becomes.
+Keys derived by later rules are refreshed with
+manage.py find_duplicate_patients --refresh-keys.
+"""
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+KEY_MAX_LENGTH = 200
+
+TITLES = frozenset({
+    'mr', 'mrs', 'ms', 'miss', 'mx', 'dr', 'prof', 'sri', 'shri', 'shree', 'smt', 'kumari', 'km',
+    'master', 'baby', 'late',
+})
+SPELLINGS = (
+    ('tch', 'X'), ('chh', 'X'), ('sch', 'SK'), ('ksh', 'KS'),
+    ('ch', 'X'), ('sh', 'X'), ('ph', 'F'), ('ck', 'K'), ('gh', 'K'), ('kh', 'K'),
+    ('bh', 'B'), ('dh', 'T'), ('th', 'T'), ('jh', 'J'), ('wh', 'F'),
+)
+SOUNDS = {'d': 'T', 'g': 'K', 'q': 'K', 'v': 'F', 'w': 'F', 'x': 'KS', 'z': 'S'}
+VOWELS = frozenset('aeiou')
+SILENT_STARTS = ('kn', 'gn', 'pn', 'wr', 'ps')
+
+
+def normalize_phone(phone):
+    if not phone:
+        return ''
+    phone = str(phone).strip()
+    digits = re.sub(r'\D', '', phone)
+    if phone.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    else:
+        digits = digits.lstrip('0')
+        if len(digits) <= 10:
+            digits = settings.PATIENT_PHONE_COUNTRY_CODE + digits
+    if not 8 <= len(digits) <= 15:
+        return ''
+    return '+' + digits
+
+
+def name_words(name):
+    text = unicodedata.normalize('NFKD', str(name or '').lower())
+    text = ''.join(
+        ' ' if unicodedata.category(char)[0] in 'PSZC' else char
+        for char in text if not unicodedata.combining(char)
+    )
+    return [word for word in text.split() if word not in TITLES]
+
+
+def phonetic_code(word):
+    letters = ''.join(char for char in word if 'a' <= char <= 'z')
+    if not letters:
+        return word
+    if letters.startswith(SILENT_STARTS):
+        letters = letters[1:]
+    code = []
+    previous = ''
+    i = 0
+    while i < len(letters):
+        for spelling, sound in SPELLINGS:
+            if letters.startswith(spelling, i):
+                i += len(spelling)
+                break
+        else:
+            char = letters[i]
+            following = letters[i + 1:i + 2]
+            i += 1
+            if char == previous:
+                continue
+            previous = char
+            if char in VOWELS:
+                sound = 'A' if i == 1 else ''
+            elif char in 'cg' and following in ('e', 'i', 'y'):
+                sound = 'S' if char == 'c' else 'J'
+            elif char == 'c':
+                sound = 'K'
+            elif char in 'hy':
+                sound = char.upper() if following in VOWELS else ''
+            elif char == 'x' and i == 1:
+                sound = 'S'
+            else:
+                sound = SOUNDS.get(char, char.upper())
+            code.append(sound)
+            continue
+        previous = ''
+        code.append(sound)
+    return ''.join(code)
+
+
+def populate_match_keys(apps, schema_editor):
+    """Derive the keys of existing patients, in batches (before the indexes are built)."""
+    Patient = apps.get_model('patients', 'Patient')
+    patients = Patient.objects.using(schema_editor.connection.alias)
+    last = 0
+    while True:
+        rows = list(patients.filter(pk__gt=last).order_by('pk').only('pk', 'name', 'phone')[:BATCH_SIZE])
+        if not rows:
+            return
+        for row in rows:
+            words = name_words(row.name)
+            row.phone_e164 = normalize_phone(row.phone)
+            row.name_key = ' '.join(words)[:KEY_MAX_LENGTH]
+            row.name_phonetic = ' '.join(sorted({phonetic_code(word) for word in words}))[:KEY_MAX_LENGTH]
+        patients.bulk_update(rows, ['phone_e164', 'name_key', 'name_phonetic'])
+        last = rows[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0011_remove_patient_visit_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='name_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='name_phonetic',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='phone_e164',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.RunPython(populate_match_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['phone_e164'], name='patient_phone_e164_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['name_phonetic'], name='patient_name_phonetic_idx'),
+        ),
+    ]
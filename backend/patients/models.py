@@ -1,5 +1,26 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+from . import matching
+
+
+class ChangeLogged(models.Model):
+    """
+    Base of the models the portal delta sync follows (patients.sync).
+    
+    Their ChangeLog row is written by patients.signals on post_save, which
+    runs inside save(); saving in a transaction commits the row and its log
+    entry together, so a sync never sees one without the other. Deletes
+    already run in a transaction (Collector).
+    """
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
 
 
 class CustomUser(AbstractUser):
@@ -51,24 +72,16 @@ class CustomUser(AbstractUser):
 
 class Patient(models.Model):
     """
-    Patient model representing a clinic/hospital patient.
+    Patient model representing a clinic/hospital patient: identity,
+    demographics and consent.
     
-    The patient goes through several states during their visit:
-    - waiting: Registered and waiting in queue
-    - checking: Currently at Health Monitoring Station
-    - examined: Vitals recorded, ready for doctor
-    - completed: Doctor has finished consultation
+    Each time the patient comes in, a Visit records that visit - reason,
+    queue status, triage and the doctor's notes. `current_visit` points at
+    the latest one; the earlier ones are the patient's visit history.
     
     If linked to a CustomUser account, the patient can access the patient portal.
     """
     
-    STATUS_CHOICES = [
-        ('waiting', 'Waiting'),
-        ('checking', 'Checking'),
-        ('examined', 'Examined'),
-        ('completed', 'Completed'),
-    ]
-    
     GENDER_CHOICES = [
         ('Male', 'Male'),
         ('Female', 'Female'),
@@ -128,45 +141,48 @@ class Patient(models.Model):
         help_text="Whether patient has given consent on first portal login"
     )
     
-    # Visit Information
-    reason = models.TextField(blank=True, null=True, help_text="Reason for visit")
-    visit_time = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
-    
-    # Doctor's Section
-    notes = models.TextField(blank=True, null=True, help_text="Doctor's notes")
-    next_visit_date = models.DateField(blank=True, null=True)
-    
-    # Health Status & Prioritization
-    HEALTH_STATUS_CHOICES = [
-        ('critical', 'Critical'),
-        ('mild', 'Mild'),
-        ('normal', 'Normal'),
-        ('unknown', 'Unknown'),
-    ]
+    # Matching keys (patients.matching), derived from name and phone by save()
+    phone_e164 = models.CharField(max_length=16, blank=True, default='', editable=False)
+    name_key = models.CharField(max_length=200, blank=True, default='', editable=False)
+    name_phonetic = models.CharField(max_length=200, blank=True, default='', editable=False)
     
-    health_status = models.CharField(
-        max_length=20, 
-        choices=HEALTH_STATUS_CHOICES, 
-        default='unknown',
-        help_text="Auto-calculated based on latest measurements"
-    )
-    priority_score = models.IntegerField(
-        default=0,
-        help_text="Higher score = higher priority (0-100)"
+    # The latest visit (see start_visit())
+    current_visit = models.OneToOneField(
+        'Visit',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="The patient's latest visit"
     )
-    last_assessment_time = models.DateTimeField(blank=True, null=True)
     
     class Meta:
-        ordering = ['-priority_score', 'visit_time']
+        ordering = ['-current_visit__priority_score', 'current_visit__visit_time']
+        indexes = [
+            # Registration matching (phone + name) and search by phone
+            models.Index(fields=['phone', 'name'], name='patient_phone_name_idx'),
+            # Matching blocks: registration candidates and find_duplicate_patients
+            models.Index(fields=['phone_e164'], name='patient_phone_e164_idx'),
+            models.Index(fields=['name_phonetic'], name='patient_name_phonetic_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient_id} - {self.name} ({self.age}, {self.gender})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The portal user as loaded: when the link changes, patients.signals
+        # drops the old user's cached lookup as well as the new one's
+        instance._loaded_user_id = instance.__dict__.get('user_id')
+        return instance
+    
     def save(self, *args, **kwargs):
         """
         Auto-generate patient_id if not set.
         Format: PAT001, PAT002, etc.
+        
+        Also derives the matching keys (phone_e164, name_key, name_phonetic).
         """
         if not self.patient_id:
             # Get the last patient ID
@@ -184,11 +200,47 @@ class Patient(models.Model):
             # Generate new patient_id with zero-padding
             self.patient_id = f"PAT{new_number:04d}"
         
+        # Keep the matching keys in step with name and phone
+        for field, value in matching.match_keys(self.name, self.phone)._asdict().items():
+            setattr(self, field, value)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'name', 'phone'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *matching.MATCH_KEY_FIELDS}
+        
         super().save(*args, **kwargs)
     
+    def start_visit(self, **fields):
+        """
+        Check the patient in for a new visit (waiting in the queue) and make
+        it the current one. The previous visit is closed, not copied: it
+        stays as it was and becomes part of the visit history.
+        """
+        previous = self.current_visit
+        visit = Visit.objects.create(patient=self, **fields)
+        if previous is not None and previous.closed_at is None:
+            previous.closed_at = visit.visit_time
+            previous.save(update_fields=['closed_at'])
+        self.current_visit = visit
+        self.save(update_fields=['current_visit'])
+        return visit
+    
+    def update_visit(self, **fields):
+        """Change fields of the current visit (status, notes, triage...), writing only those."""
+        visit = self.current_visit
+        if visit is None:
+            return self.start_visit(**fields)
+        for name, value in fields.items():
+            setattr(visit, name, value)
+        update_fields = list(fields)
+        if 'status' in fields:
+            visit.set_status(fields['status'])
+            update_fields.append('closed_at')
+        visit.save(update_fields=update_fields)
+        return visit
+    
     def assess_health_status(self):
         """
-        Auto-assess health status based on latest measurements.
+        Auto-assess the current visit's health status based on latest measurements.
         
         Priority: SpO2 > Heart Rate > Temperature (temperature has lowest importance)
         
@@ -208,15 +260,10 @@ class Patient(models.Model):
         - Needs Attention: 33-34°C or 39-40°C (moderately extreme)
         - Stable: 34-39°C (wider tolerance)
         """
-        from django.utils import timezone
-        
         latest = self.measurements.first()  # Already ordered by -timestamp
         
         if not latest:
-            self.health_status = 'unknown'
-            self.priority_score = 0
-            self.last_assessment_time = timezone.now()
-            self.save()
+            self.update_visit(health_status='unknown', priority_score=0, last_assessment_time=timezone.now())
             return
         
         temp = latest.temperature
@@ -225,10 +272,7 @@ class Patient(models.Model):
         
         # Check if we have at least one vital sign to assess
         if temp is None and hr is None and spo2 is None:
-            self.health_status = 'unknown'
-            self.priority_score = 0
-            self.last_assessment_time = timezone.now()
-            self.save()
+            self.update_visit(health_status='unknown', priority_score=0, last_assessment_time=timezone.now())
             return
         
         # Track critical and mild conditions separately
@@ -262,44 +306,103 @@ class Patient(models.Model):
         
         # Determine final status (critical > mild > normal)
         if is_critical:
-            self.health_status = 'critical'
-            self.priority_score = 100
+            health_status, priority_score = 'critical', 100
         elif is_mild:
-            self.health_status = 'mild'
-            self.priority_score = 50
+            health_status, priority_score = 'mild', 50
         else:
-            self.health_status = 'normal'
-            self.priority_score = 10
+            health_status, priority_score = 'normal', 10
         
-        self.last_assessment_time = timezone.now()
-        self.save()
+        self.update_visit(
+            health_status=health_status, priority_score=priority_score, last_assessment_time=timezone.now()
+        )
 
 
-class VisitHistory(models.Model):
+class Visit(ChangeLogged):
     """
-    Archive of patient visit history to track all previous visits.
-    When a patient returns, their current visit data is archived here.
+    One visit of a patient, from registration to the end of the consultation.
+    
+    The visit goes through several states:
+    - waiting: Registered and waiting in queue
+    - checking: Currently at Health Monitoring Station
+    - examined: Vitals recorded, ready for doctor
+    - completed: Doctor has finished consultation
+    
+    A visit is open (in the queue) until it is completed or the patient
+    checks in again; `closed_at` records when it left. Queue queries filter
+    on closed_at IS NULL so they read the partial index of open visits
+    instead of every visit ever made. Measurements and prescription
+    history rows attach to the visit they were taken in.
     """
+    
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('checking', 'Checking'),
+        ('examined', 'Examined'),
+        ('completed', 'Completed'),
+    ]
+    OPEN_STATUSES = ('waiting', 'checking', 'examined')
+    
+    HEALTH_STATUS_CHOICES = [
+        ('critical', 'Critical'),
+        ('mild', 'Mild'),
+        ('normal', 'Normal'),
+        ('unknown', 'Unknown'),
+    ]
+    
     patient = models.ForeignKey(
         Patient,
         on_delete=models.CASCADE,
-        related_name='visit_history'
+        related_name='visits'
+    )
+    
+    # Visit Information
+    reason = models.TextField(blank=True, null=True, help_text="Reason for visit")
+    visit_time = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    closed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the visit was completed or replaced by a later one"
     )
-    visit_time = models.DateTimeField()
-    reason = models.TextField(blank=True, null=True)
-    status = models.CharField(max_length=20)
-    health_status = models.CharField(max_length=20)
-    notes = models.TextField(blank=True, null=True)
+    
+    # Doctor's Section
+    notes = models.TextField(blank=True, null=True, help_text="Doctor's notes")
     next_visit_date = models.DateField(blank=True, null=True)
-    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    # Health Status & Prioritization
+    health_status = models.CharField(
+        max_length=20, 
+        choices=HEALTH_STATUS_CHOICES, 
+        default='unknown',
+        help_text="Auto-calculated based on latest measurements"
+    )
+    priority_score = models.IntegerField(
+        default=0,
+        help_text="Higher score = higher priority (0-100)"
+    )
+    last_assessment_time = models.DateTimeField(blank=True, null=True)
     
     class Meta:
         ordering = ['-visit_time']
-        verbose_name = 'Visit History'
-        verbose_name_plural = 'Visit Histories'
+        indexes = [
+            # Visit history per patient
+            models.Index(fields=['patient', '-visit_time'], name='visit_patient_time_idx'),
+            # Queue views (?status=waiting|checking|examined): open visits only
+            models.Index(
+                fields=['status', '-priority_score', 'visit_time'],
+                condition=models.Q(closed_at__isnull=True),
+                name='visit_open_queue_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.patient.name} - {self.visit_time.strftime('%Y-%m-%d %H:%M')}"
+    
+    def set_status(self, status):
+        """Set the status and move closed_at with it (the caller saves both)."""
+        self.status = status
+        # A completed visit leaves the queue; one set back to an open status re-enters it
+        self.closed_at = (self.closed_at or timezone.now()) if status == 'completed' else None
 
 
 class ConsentLog(models.Model):
@@ -345,3 +448,49 @@ class ConsentLog(models.Model):
     
     def __str__(self):
         return f"{self.patient.patient_id} - {self.action} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ChangeLog(models.Model):
+    """
+    Append-only log of changes to patient data, read by the portal delta
+    sync endpoint (GET /api/patient-portal/sync/?since=<token>).
+    
+    Rows are written by patients.signals on save/delete of the synced models;
+    the auto-increment id orders them. patient_id is a plain column rather
+    than a foreign key so deletions cascading from a patient can still be
+    logged. Old rows are removed by `manage.py prune_changelog`.
+    """
+    
+    MODEL_CHOICES = [
+        ('measurement', 'Measurement'),
+        ('prescription', 'Prescription'),
+        ('prescription_history', 'Prescription History'),
+        ('visit', 'Visit'),
+        ('report', 'Report'),
+    ]
+    
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('delete', 'Deleted'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    patient_id = models.BigIntegerField()
+    model = models.CharField(max_length=30, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Change Log Entry'
+        verbose_name_plural = 'Change Log'
+        indexes = [
+            # Sync: WHERE patient_id = ? AND id > ? ORDER BY id
+            models.Index(fields=['patient_id', 'id'], name='changelog_patient_id_idx'),
+            # Pruning by age
+            models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} patient {self.patient_id} {self.action} {self.model} {self.object_id}"
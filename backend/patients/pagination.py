@@ -0,0 +1,60 @@
+"""
+Keyset (cursor) pagination for the aggregated portal/workspace endpoints.
+
+Pages are ordered by (<field> DESC, id DESC) and continue from an opaque
+cursor holding the last row's (<field>, id), so every page is one indexed
+range query however deep the client scrolls - no OFFSET.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({'cursor': f'Invalid cursor: {cursor!r}'})
+
+
+def parse_limit(request, default=DEFAULT_LIMIT):
+    """?limit= clamped to 1..MAX_LIMIT."""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ValidationError({'limit': 'Must be an integer'})
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def keyset_page(queryset, field, limit, cursor=None):
+    """
+    Return (rows, next_cursor) for one page of `queryset`, newest first.
+
+    `field` must be a non-null datetime column; next_cursor is None on the
+    last page. Works with model rows and with .values() dicts.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    if isinstance(last, dict):
+        return rows[:limit], encode_cursor(last[field], last['id'])
+    return rows[:limit], encode_cursor(getattr(last, field), last.pk)
@@ -11,7 +11,10 @@ from .patient_portal_views import (
     patient_prescription_history_view,
     patient_visits_view,
     patient_consent_status_view,
-    patient_give_consent_view
+    patient_give_consent_view,
+    patient_dashboard_view,
+    patient_sync_view,
+    patient_events_view
 )
 
 urlpatterns = [
@@ -24,6 +27,9 @@ urlpatterns = [
     path('prescription/', patient_prescription_view, name='patient-prescription'),
     path('prescription-history/', patient_prescription_history_view, name='patient-prescription-history'),
     path('visits/', patient_visits_view, name='patient-visits'),
+    path('dashboard/', patient_dashboard_view, name='patient-dashboard'),  # All of the above in one call
+    path('sync/', patient_sync_view, name='patient-sync'),  # Delta sync for offline clients
+    path('events/', patient_events_view, name='patient-events-stream'),  # Server-sent events
     
     # Consent management
     path('consent-status/', patient_consent_status_view, name='patient-consent-status'),
@@ -10,19 +10,41 @@ These views allow patients to:
 """
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from django.db import transaction
 
-from .models import CustomUser, Patient
+from . import matching
+from .events import event_stream_response
+from .models import ChangeLog, CustomUser, Patient
 from .serializers import PatientDetailSerializer
+from .response_cache import cached_patient_response, portal_patient_id
 from .auth_serializers import UserSerializer, UserRegistrationSerializer
 from prescriptions.models import Prescription
 from prescriptions.serializers import PrescriptionSerializer
 from measurements.models import Measurement
-from measurements.serializers import MeasurementSerializer
+from measurements.serializers import MeasurementSerializer, MeasurementValuesSerializer
+from monitoring.query_budget import query_budget
+from ashwini_backend.fieldsets import requested_fields
+from ashwini_backend.renderers import EventStreamRenderer, ORJSONRenderer
+
+
+def current_visit_data(visit):
+    """The `current_visit` object of the visits responses."""
+    if visit is None:
+        return None
+    return {
+        'visit_time': visit.visit_time,
+        'reason': visit.reason,
+        'status': visit.status,
+        'health_status': visit.health_status,
+        'notes': visit.notes,
+        'next_visit_date': visit.next_visit_date
+    }
 
 
 @api_view(['POST'])
@@ -86,12 +108,13 @@ def patient_register_view(request):
     # Create user and patient profile in a transaction
     try:
         with transaction.atomic():
-            # Check if phone number is already associated with a user account
-            if patient_data.get('phone'):
+            # Check if phone number (in any format) is already associated with a user account
+            phone_e164 = matching.normalize_phone(patient_data.get('phone'))
+            if phone_e164:
                 existing_with_user = Patient.objects.filter(
-                    phone=patient_data['phone'],
+                    phone_e164=phone_e164,
                     user__isnull=False  # Already has a user account
-                ).first()
+                ).exists()
                 
                 if existing_with_user:
                     return Response(
@@ -102,13 +125,12 @@ def patient_register_view(request):
                         status=status.HTTP_400_BAD_REQUEST
                     )
             
-            # Check if a patient with this phone number already exists (registered by reception)
-            existing_patient = None
-            if patient_data.get('phone'):
-                existing_patient = Patient.objects.filter(
-                    phone=patient_data['phone'],
-                    user__isnull=True  # Not yet linked to a user account
-                ).first()
+            # Check if this patient was already registered by reception: the same
+            # phone and name (normalized), not yet linked to a user account. Only an
+            # exact match - a sibling sharing the phone must not get this record
+            existing_patient = matching.exact_match(
+                patient_data['name'], phone_e164, queryset=Patient.objects.filter(user__isnull=True)
+            )
             
             if existing_patient:
                 # Link the existing patient to this new user account
@@ -149,8 +171,9 @@ def patient_register_view(request):
                     gender=patient_data['gender'],
                     phone=patient_data.get('phone', ''),
                     address=patient_data.get('address', ''),
-                    status='waiting'  # Default status
                 )
+                # First visit, waiting in the queue
+                patient.start_visit()
                 
                 # Create empty prescription for this patient
                 Prescription.objects.create(patient=patient)
@@ -177,6 +200,7 @@ def patient_register_view(request):
         )
 
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_profile_view(request):
@@ -210,19 +234,22 @@ def patient_profile_view(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Get patient profile
-    try:
-        patient = user.patient_profile
-    except Patient.DoesNotExist:
+    # Get patient profile (id cached, payload shared with the staff detail view)
+    patient_id = portal_patient_id(user)
+    if patient_id is None:
         return Response(
             {'error': 'No patient profile found for this user'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    serializer = PatientDetailSerializer(patient)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    def build():
+        queryset = PatientDetailSerializer.setup_eager_loading(Patient.objects.all())
+        return PatientDetailSerializer(queryset.get(pk=patient_id)).data
+    
+    return cached_patient_response(request, patient_id, 'detail', build)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_measurements_view(request):
@@ -230,6 +257,7 @@ def patient_measurements_view(request):
     Get all measurements for the current patient.
     
     GET /api/patient-portal/measurements/
+    GET /api/patient-portal/measurements/?fields=timestamp,spo2
     
     Response: Array of measurement objects sorted by timestamp (latest first)
     [
@@ -265,11 +293,13 @@ def patient_measurements_view(request):
     
     # Get all measurements for this patient
     measurements = Measurement.objects.filter(patient=patient).order_by('-timestamp')
-    serializer = MeasurementSerializer(measurements, many=True)
+    fields = requested_fields(request, MeasurementSerializer)
+    serializer = MeasurementValuesSerializer(measurements, fields=fields)
     
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_prescription_view(request):
@@ -321,6 +351,7 @@ def patient_prescription_view(request):
         )
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_prescription_history_view(request):
@@ -340,7 +371,6 @@ def patient_prescription_history_view(request):
         ...
     ]
     """
-    from prescriptions.models import PrescriptionHistory
     from prescriptions.serializers import PrescriptionHistorySerializer
     
     user = request.user
@@ -361,13 +391,14 @@ def patient_prescription_history_view(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get prescription history
-    history = PrescriptionHistory.objects.filter(patient=patient)
+    # Get prescription history (related manager caches `patient` on each row)
+    history = patient.prescription_history.all()
     serializer = PrescriptionHistorySerializer(history, many=True)
     
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_visits_view(request):
@@ -382,8 +413,7 @@ def patient_visits_view(request):
         "visit_history": [...]
     }
     """
-    from .models import VisitHistory
-    from .serializers import VisitHistorySerializer
+    from .serializers import VisitSerializer
     
     user = request.user
     
@@ -394,37 +424,27 @@ def patient_visits_view(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Get patient profile
-    try:
-        patient = user.patient_profile
-    except Patient.DoesNotExist:
+    # Get patient profile, with the current visit
+    patient = Patient.objects.select_related('current_visit').filter(user=user).first()
+    if patient is None:
         return Response(
             {'error': 'No patient profile found for this user'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get current visit info
-    current_visit = {
-        'visit_time': patient.visit_time,
-        'reason': patient.reason,
-        'status': patient.status,
-        'health_status': patient.health_status,
-        'notes': patient.notes,
-        'next_visit_date': patient.next_visit_date
-    }
-    
-    # Get visit history
-    history = VisitHistory.objects.filter(patient=patient)
-    history_serializer = VisitHistorySerializer(history, many=True)
+    # Get visit history: every earlier visit (related manager caches `patient` on each row)
+    history = patient.visits.exclude(pk=patient.current_visit_id)
+    history_serializer = VisitSerializer(history, many=True)
     
     response_data = {
-        'current_visit': current_visit,
+        'current_visit': current_visit_data(patient.current_visit),
         'visit_history': history_serializer.data
     }
     
     return Response(response_data, status=status.HTTP_200_OK)
 
 
+@query_budget(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_consent_status_view(request):
@@ -473,6 +493,219 @@ def patient_consent_status_view(request):
     return Response(consent_data, status=status.HTTP_200_OK)
 
 
+DASHBOARD_SECTIONS = (
+    'profile', 'measurements', 'prescription', 'prescription_history', 'visits', 'consent_status',
+)
+
+
+@query_budget(6)
+@async_api_view(['GET'])
+@permission_classes([IsAuthenticated])
+async def patient_dashboard_view(request):
+    """
+    Everything the patient apps show on load, in one response.
+    
+    GET /api/patient-portal/dashboard/
+    
+    Query params:
+    - sections: comma-separated subset of profile, measurements, prescription,
+      prescription_history, visits, consent_status (default: all)
+    - limit: rows per history section (default 20, max 100)
+    - measurements_cursor / prescription_history_cursor / visits_cursor:
+      the section's `next_cursor` from a previous response, to load more
+    
+    Response (sections not requested are omitted):
+    {
+        "profile": {...},                   // as GET profile/
+        "measurements": {"results": [...], "next_cursor": "..."},
+        "prescription": {...} | null,
+        "prescription_history": {"results": [...], "next_cursor": null},
+        "visits": {"current_visit": {...}, "visit_history": [...], "next_cursor": null},
+        "consent_status": {...}             // as GET consent-status/
+    }
+    
+    At most one query per history section plus the patient itself; cached
+    and revalidated with ETag like the profile. Async: the cache lookup and
+    any rebuild run in one sync_to_async() hop, off the event loop.
+    """
+    from .pagination import keyset_page, parse_limit
+    from .serializers import VisitSerializer
+    from prescriptions.serializers import PrescriptionHistorySerializer
+    
+    user = request.user
+    
+    # Check if user is a patient
+    if user.role != 'PATIENT':
+        return Response(
+            {'error': 'Only patients can access this endpoint'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    requested = request.query_params.get('sections')
+    sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(DASHBOARD_SECTIONS)
+    unknown = sorted(set(sections) - set(DASHBOARD_SECTIONS))
+    if unknown:
+        return Response(
+            {'error': f"Unknown sections: {', '.join(unknown)}", 'sections': list(DASHBOARD_SECTIONS)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    limit = parse_limit(request)
+    
+    patient_id = await sync_to_async(portal_patient_id)(user)
+    if patient_id is None:
+        return Response(
+            {'error': 'No patient profile found for this user'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    def build():
+        params = request.query_params
+        patient = Patient.objects.select_related('prescription', 'current_visit').get(pk=patient_id)
+        data = {}
+        
+        if 'measurements' in sections:
+            cursor = params.get('measurements_cursor')
+            rows, next_cursor = keyset_page(patient.measurements.all(), 'timestamp', limit, cursor)
+            if not cursor:
+                # First page already holds the latest measurement the profile shows
+                patient.latest_measurements = rows[:1]
+            data['measurements'] = {
+                'results': MeasurementSerializer(rows, many=True).data,
+                'next_cursor': next_cursor,
+            }
+        
+        if 'profile' in sections:
+            data['profile'] = PatientDetailSerializer(patient).data
+        
+        if 'prescription' in sections:
+            try:
+                data['prescription'] = PrescriptionSerializer(patient.prescription).data
+            except Prescription.DoesNotExist:
+                data['prescription'] = None
+        
+        if 'prescription_history' in sections:
+            rows, next_cursor = keyset_page(
+                patient.prescription_history.all(), 'created_at', limit,
+                params.get('prescription_history_cursor')
+            )
+            data['prescription_history'] = {
+                'results': PrescriptionHistorySerializer(rows, many=True).data,
+                'next_cursor': next_cursor,
+            }
+        
+        if 'visits' in sections:
+            rows, next_cursor = keyset_page(
+                patient.visits.exclude(pk=patient.current_visit_id), 'visit_time', limit,
+                params.get('visits_cursor')
+            )
+            data['visits'] = {
+                'current_visit': current_visit_data(patient.current_visit),
+                'visit_history': VisitSerializer(rows, many=True).data,
+                'next_cursor': next_cursor,
+            }
+        
+        if 'consent_status' in sections:
+            data['consent_status'] = {
+                'portal_consent_given': patient.portal_consent_given,
+                'data_collection_consent': patient.data_collection_consent,
+                'data_usage_consent': patient.data_usage_consent,
+                'privacy_policy_acknowledged': patient.privacy_policy_acknowledged,
+                'consent_timestamp': patient.consent_timestamp,
+                'consent_version': patient.consent_version
+            }
+        
+        # Keep the requested order
+        return {name: data[name] for name in sections if name in data}
+    
+    return await sync_to_async(cached_patient_response)(request, patient_id, 'dashboard', build)
+
+
+@query_budget(8)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def patient_sync_view(request):
+    """
+    Changes since the client's last sync, for offline-first apps.
+    
+    GET /api/patient-portal/sync/?since=<token>
+    
+    Query params:
+    - since: the `token` from the previous response; omit on first sync
+    
+    Response:
+    {
+        "token": "1234.1700000000",   // pass as ?since= next time
+        "reset": false,               // true: full snapshot, replace local data
+        "has_more": false,            // true: call again with the new token now
+        "changes": {
+            "measurements": {"upserted": [...], "deleted": [ids]},
+            "prescription": {...},
+            "prescription_history": {...},
+            "visits": {...},
+            "reports": {...}
+        }
+    }
+    
+    Rows are serialized as by the matching list endpoints; reports come
+    without their OCR text (see `analysis_url`).
+    """
+    from .sync import delta, parse_token, snapshot
+    
+    user = request.user
+    
+    # Check if user is a patient
+    if user.role != 'PATIENT':
+        return Response(
+            {'error': 'Only patients can access this endpoint'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    patient_id = portal_patient_id(user)
+    if patient_id is None:
+        return Response(
+            {'error': 'No patient profile found for this user'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    since = parse_token(request.query_params.get('since'))
+    if since is None:
+        return Response(snapshot(patient_id), status=status.HTTP_200_OK)
+    return Response(delta(patient_id, *since), status=status.HTTP_200_OK)
+
+
+@query_budget(3)
+@async_api_view(['GET'])
+@renderer_classes([ORJSONRenderer, EventStreamRenderer])
+@permission_classes([IsAuthenticated])
+async def patient_events_view(request):
+    """
+    Server-sent events for changes to the patient's own data, the live
+    counterpart of sync/: on a `change` event, sync with the last token.
+    
+    GET /api/patient-portal/events/
+    Accept: text/event-stream
+    
+    See patients.events for the event format and how clients resume.
+    """
+    user = request.user
+    
+    # Check if user is a patient
+    if user.role != 'PATIENT':
+        return Response(
+            {'error': 'Only patients can access this endpoint'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    patient_id = await sync_to_async(portal_patient_id)(user)
+    if patient_id is None:
+        return Response(
+            {'error': 'No patient profile found for this user'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return await event_stream_response(request, ChangeLog.objects.filter(patient_id=patient_id))
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def patient_give_consent_view(request):
@@ -0,0 +1,108 @@
+"""
+Read-through cache of serialized patient payloads, revalidated with ETags.
+
+Payloads are cached per patient under a version that patients.signals bumps
+whenever the patient or any of its measurements, prescription, reports,
+visits or prescription history rows are saved or deleted. The ETag is derived
+from that version, so a request whose If-None-Match still matches is
+answered 304 from the cache alone - without running any SQL for the payload.
+
+Cache fills read from the primary (ashwini_backend.replicas.primary_reads):
+the version is current as soon as the write commits, and a payload built
+from a replica that has not replayed it yet would be stored under it.
+
+The rendered JSON is cached too, once per content coding (br, gzip or
+identity, see ashwini_backend.compression), so a hit is served as stored
+bytes without rendering or compressing anything.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from ashwini_backend.cache import CacheNamespace
+from ashwini_backend.compression import compress, is_compressible, negotiate
+from ashwini_backend.replicas import primary_reads
+from ashwini_backend.renderers import ORJSONRenderer
+from .models import Patient
+
+
+def patient_namespace(patient_id):
+    return CacheNamespace(
+        f'patient:{patient_id}',
+        timeout=settings.PATIENT_RESPONSE_CACHE_TIMEOUT,
+        label='patient',
+    )
+
+
+portal_users = CacheNamespace('portal-user', timeout=settings.PATIENT_RESPONSE_CACHE_TIMEOUT)
+
+
+def invalidate_patient(patient_id):
+    patient_namespace(patient_id).invalidate()
+
+
+def portal_patient_id(user):
+    """Id of the patient profile linked to a portal user (None if unlinked), cached."""
+    def build():
+        with primary_reads():
+            return Patient.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+
+    return portal_users.get_or_set(user.pk, build)
+
+
+def cached_patient_response(request, patient_id, view_key, build):
+    """
+    Respond with the payload `build()` returns for a patient, from cache.
+
+    `build` runs only on a cache miss, reading from the primary, and may
+    raise (e.g. Http404), in which case nothing is cached. Query parameters
+    are part of the key.
+    """
+    namespace = patient_namespace(patient_id)
+    version = namespace.version()
+    query = request.GET.urlencode()
+    variant = hashlib.md5(query.encode()).hexdigest()[:8] if query else ''
+    tag = f'"{view_key}-{patient_id}-{version}{variant and "-" + variant}"'
+    headers = {
+        'Cache-Control': 'private, no-cache',
+        # Portal URLs are the same for every patient
+        'Vary': 'Authorization, Accept-Encoding',
+    }
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Weak comparison: compressed bodies carry W/ ETags
+        etags = [value.removeprefix('W/') for value in parse_etags(if_none_match)]
+        if tag in etags or '*' in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': tag, **headers})
+
+    encoding = negotiate(request)
+
+    def fill():
+        with primary_reads():
+            return build()
+
+    def render():
+        data = namespace.get_or_set((view_key, variant), fill, version=version)
+        body = ORJSONRenderer().render(data)
+        if encoding and is_compressible('application/json', len(body)):
+            compressed = compress(body, encoding, cached=True)
+            if len(compressed) < len(body):
+                return encoding, compressed
+        return None, body
+
+    content_encoding, body = namespace.get_or_set(
+        (view_key, variant, 'body', encoding or 'identity'), render, version=version
+    )
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = f'W/{tag}' if content_encoding else tag
+    for header, value in headers.items():
+        response[header] = value
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    return response
@@ -1,5 +1,8 @@
+from django.db.models import OuterRef, Prefetch, Subquery
 from rest_framework import serializers
-from .models import Patient, VisitHistory
+from ashwini_backend.fast_serializers import ValuesSerializer
+from ashwini_backend.fieldsets import SparseFieldsMixin, prune_queryset
+from .models import Patient, Visit
 from prescriptions.models import Prescription
 from measurements.models import Measurement
 
@@ -20,7 +23,27 @@ class LatestMeasurementSerializer(serializers.ModelSerializer):
         fields = ['id', 'timestamp', 'blood_pressure', 'temperature', 'spo2', 'heart_rate', 'source']
 
 
-class PatientListSerializer(serializers.ModelSerializer):
+class CurrentVisitFieldsMixin(serializers.Serializer):
+    """
+    The patient's current visit, flattened into the patient payload under
+    the names these fields had when they were columns of Patient.
+    
+    Reads join current_visit (select_related, or the values_list() join of
+    a ValuesSerializer). On writes the visit fields arrive in
+    validated_data['current_visit'] (see PatientCreateUpdateSerializer).
+    """
+    
+    reason = serializers.CharField(source='current_visit.reason', required=False, allow_blank=True, allow_null=True)
+    visit_time = serializers.DateTimeField(source='current_visit.visit_time', read_only=True)
+    status = serializers.ChoiceField(source='current_visit.status', choices=Visit.STATUS_CHOICES, required=False)
+    notes = serializers.CharField(source='current_visit.notes', required=False, allow_blank=True, allow_null=True)
+    next_visit_date = serializers.DateField(source='current_visit.next_visit_date', required=False, allow_null=True)
+    health_status = serializers.CharField(source='current_visit.health_status', read_only=True)
+    priority_score = serializers.IntegerField(source='current_visit.priority_score', read_only=True)
+    last_assessment_time = serializers.DateTimeField(source='current_visit.last_assessment_time', read_only=True)
+
+
+class PatientListSerializer(CurrentVisitFieldsMixin, serializers.ModelSerializer):
     """Serializer for patient list view - lightweight."""
     
     class Meta:
@@ -31,7 +54,13 @@ class PatientListSerializer(serializers.ModelSerializer):
         ]
 
 
-class PatientDetailSerializer(serializers.ModelSerializer):
+class PatientListValuesSerializer(ValuesSerializer):
+    """PatientListSerializer output for GET lists, read with values_list()."""
+    
+    serializer_class = PatientListSerializer
+
+
+class PatientDetailSerializer(SparseFieldsMixin, CurrentVisitFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for detailed patient view.
     
@@ -40,11 +69,17 @@ class PatientDetailSerializer(serializers.ModelSerializer):
     - Latest measurement
     - Prescription (medicines list)
     - Doctor's notes and next visit
+    
+    Supports ?fields= / ?expand= (ashwini_backend.fieldsets); the latest
+    measurement and prescription are only loaded when selected.
     """
     
     latest_measurement = serializers.SerializerMethodField()
     prescription = PrescriptionSerializer(read_only=True)
     
+    expandable_fields = ('latest_measurement', 'prescription')
+    field_sources = {'latest_measurement': ()}
+    
     class Meta:
         model = Patient
         fields = [
@@ -54,16 +89,52 @@ class PatientDetailSerializer(serializers.ModelSerializer):
             'health_status', 'priority_score', 'last_assessment_time'
         ]
     
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        Load the prescription and latest measurement of every patient in a
+        constant number of queries (instead of two extra queries per patient).
+        
+        With `fields`, only what those fields need is loaded.
+        """
+        queryset = prune_queryset(queryset, cls, fields)
+        if fields is None or set(fields) & set(CurrentVisitFieldsMixin._declared_fields):
+            queryset = queryset.select_related('current_visit')
+        if fields is None or 'prescription' in fields:
+            queryset = queryset.select_related('prescription')
+        if fields is None or 'latest_measurement' in fields:
+            latest_ids = Measurement.objects.filter(
+                patient_id=OuterRef('patient_id')
+            ).order_by('-timestamp').values('id')[:1]
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'measurements',
+                    queryset=Measurement.objects.filter(id=Subquery(latest_ids)),
+                    to_attr='latest_measurements'
+                )
+            )
+        return queryset
+    
     def get_latest_measurement(self, obj):
         """Get the most recent measurement for this patient."""
-        latest = obj.measurements.first()  # Already ordered by -timestamp
+        if hasattr(obj, 'latest_measurements'):
+            latest = obj.latest_measurements[0] if obj.latest_measurements else None
+        else:
+            latest = obj.measurements.first()  # Already ordered by -timestamp
         if latest:
             return LatestMeasurementSerializer(latest).data
         return None
 
 
-class PatientCreateUpdateSerializer(serializers.ModelSerializer):
-    """Serializer for creating and updating patients."""
+class PatientCreateUpdateSerializer(CurrentVisitFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for creating and updating patients.
+    
+    reason, status, notes and next_visit_date belong to the current visit:
+    creating a patient starts their first visit with them, and updates
+    write only the columns that changed - the visit row for visit fields,
+    the patient row for the rest.
+    """
     
     class Meta:
         model = Patient
@@ -108,15 +179,31 @@ class PatientCreateUpdateSerializer(serializers.ModelSerializer):
                     })
         
         return data
+    
+    def create(self, validated_data):
+        visit_data = validated_data.pop('current_visit', {})
+        patient = super().create(validated_data)
+        patient.start_visit(**visit_data)
+        return patient
+    
+    def update(self, instance, validated_data):
+        visit_data = validated_data.pop('current_visit', {})
+        if validated_data:
+            instance = super().update(instance, validated_data)
+        if visit_data:
+            instance.update_visit(**visit_data)
+        return instance
 
 
-class VisitHistorySerializer(serializers.ModelSerializer):
-    """Serializer for visit history records."""
+class VisitSerializer(serializers.ModelSerializer):
+    """Serializer for visits (the visit history)."""
     
     patient_name = serializers.CharField(source='patient.name', read_only=True)
+    # When the visit ended: completed, or replaced by the patient's next visit
+    archived_at = serializers.DateTimeField(source='closed_at', read_only=True)
     
     class Meta:
-        model = VisitHistory
+        model = Visit
         fields = [
             'id', 'patient_name', 'visit_time', 'reason', 'status',
             'health_status', 'notes', 'next_visit_date', 'archived_at'
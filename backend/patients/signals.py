@@ -0,0 +1,59 @@
+"""
+React to writes on patient data:
+
+- invalidate cached patient payloads (patients.response_cache), after the
+  transaction commits so a concurrent request can't re-cache the
+  pre-commit state under the new version;
+- append to the ChangeLog read by the portal delta sync, in the same
+  transaction as the change itself (patients.models.ChangeLogged).
+
+Queryset.update() and bulk_create() send no signals; code using them on
+these models must call invalidate_patient() / write ChangeLog rows itself.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ChangeLog
+from .response_cache import invalidate_patient, portal_users
+
+
+# Synced model -> ChangeLog.model
+CHANGELOG_MODELS = {
+    'measurements.Measurement': 'measurement',
+    'prescriptions.Prescription': 'prescription',
+    'prescriptions.PrescriptionHistory': 'prescription_history',
+    'patients.Visit': 'visit',
+    'reports.Report': 'report',
+}
+
+
+def _invalidate_on_commit(patient_id):
+    if patient_id is not None:
+        transaction.on_commit(lambda: invalidate_patient(patient_id))
+
+
+@receiver([post_save, post_delete], sender='patients.Patient')
+def patient_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.pk)
+    # The user now linked, and the one it was loaded with if the link moved
+    user_ids = {instance.user_id, getattr(instance, '_loaded_user_id', None)} - {None}
+    instance._loaded_user_id = instance.user_id
+    for user_id in user_ids:
+        transaction.on_commit(lambda user_id=user_id: portal_users.delete(user_id))
+
+
+@receiver([post_save, post_delete], sender='measurements.Measurement')
+@receiver([post_save, post_delete], sender='prescriptions.Prescription')
+@receiver([post_save, post_delete], sender='reports.Report')
+@receiver([post_save, post_delete], sender='patients.Visit')
+@receiver([post_save, post_delete], sender='prescriptions.PrescriptionHistory')
+def patient_data_changed(sender, instance, signal, **kwargs):
+    _invalidate_on_commit(instance.patient_id)
+    ChangeLog.objects.create(
+        patient_id=instance.patient_id,
+        model=CHANGELOG_MODELS[sender._meta.label],
+        object_id=instance.pk,
+        action='delete' if signal is post_delete else 'upsert',
+    )
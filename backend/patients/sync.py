@@ -0,0 +1,137 @@
+"""
+Delta sync for offline clients, driven by patients.models.ChangeLog.
+
+A sync token is "<last change-log id>.<unix time it was issued>". Given a
+token, only the change-log entries after that id are read and the rows they
+point at fetched - one query per synced model - so the cost of a sync scales
+with what changed, not with the length of the patient's history.
+
+Change-log ids are allocated when a row is inserted but become visible
+when its transaction commits, so a lower id can appear after a higher one
+was read. A token therefore never passes an entry written within the last
+SYNC_COMMIT_MARGIN_SECONDS: it stops just before the first such entry, and
+the entries after it are read again by the next sync - changes are
+reported as the rows' current state, so reading one twice is harmless.
+Any transaction still uncommitted by then would have to have been open for
+longer than the margin.
+
+A missing or malformed token, or one older than
+SYNC_CHANGELOG_RETENTION_DAYS (the log may have been pruned past it), gets
+a full snapshot with `reset: true` instead; the client replaces its local
+copy.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from measurements.models import Measurement
+from measurements.serializers import MeasurementSerializer
+from prescriptions.models import Prescription, PrescriptionHistory
+from prescriptions.serializers import PrescriptionHistorySerializer, PrescriptionSerializer
+from reports.models import Report
+from reports.serializers import ReportSummarySerializer
+from .models import ChangeLog, Visit
+from .serializers import VisitSerializer
+
+
+# Change-log entries read per request; clients call again while has_more
+PAGE_SIZE = 500
+
+# ChangeLog.model -> (response key, queryset, serializer)
+SYNCED = {
+    'measurement': ('measurements', lambda: Measurement.objects.all(), MeasurementSerializer),
+    'prescription': (
+        'prescription', lambda: Prescription.objects.select_related('patient'), PrescriptionSerializer
+    ),
+    'prescription_history': (
+        'prescription_history',
+        lambda: PrescriptionHistory.objects.select_related('patient'),
+        PrescriptionHistorySerializer,
+    ),
+    'visit': ('visits', lambda: Visit.objects.select_related('patient'), VisitSerializer),
+    'report': ('reports', lambda: Report.objects.defer('extracted_text'), ReportSummarySerializer),
+}
+
+
+def make_token(last_id, issued_at=None):
+    return f'{last_id}.{int(issued_at if issued_at is not None else time.time())}'
+
+
+def parse_token(token):
+    """(last_id, issued_at) of a token still inside the retention window, else None."""
+    try:
+        last_id, issued_at = (int(part) for part in token.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    max_age = settings.SYNC_CHANGELOG_RETENTION_DAYS * 86400
+    if last_id < 0 or not 0 <= time.time() - issued_at <= max_age:
+        return None
+    return last_id, issued_at
+
+
+def _commit_cutoff():
+    """Entries created before this have committed, or never will."""
+    return timezone.now() - timedelta(seconds=settings.SYNC_COMMIT_MARGIN_SECONDS)
+
+
+def _empty_changes():
+    return {key: {'upserted': [], 'deleted': []} for key, _, _ in SYNCED.values()}
+
+
+def snapshot(patient_id):
+    """Every synced row of the patient, with the token to continue from."""
+    # Take the token first: anything written while we read is replayed next time,
+    # as are entries too recent to be sure no lower id is still uncommitted
+    log = ChangeLog.objects.filter(patient_id=patient_id).aggregate(
+        last=Max('id'), first_recent=Min('id', filter=Q(created_at__gte=_commit_cutoff()))
+    )
+    last_id = log['first_recent'] - 1 if log['first_recent'] else log['last'] or 0
+    changes = _empty_changes()
+    for key, queryset, serializer in SYNCED.values():
+        rows = queryset().filter(patient_id=patient_id).order_by('pk')
+        changes[key]['upserted'] = serializer(rows, many=True).data
+    return {'token': make_token(last_id), 'reset': True, 'has_more': False, 'changes': changes}
+
+
+def delta(patient_id, last_id, issued_at):
+    """
+    Changes after `last_id`, each object reported once in its final state.
+    The token moves past the entries older than the commit margin only.
+    """
+    entries = list(
+        ChangeLog.objects
+        .filter(patient_id=patient_id, id__gt=last_id)
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'created_at')[:PAGE_SIZE + 1]
+    )
+    has_more = len(entries) > PAGE_SIZE
+    entries = entries[:PAGE_SIZE]
+
+    touched = {}
+    cutoff = _commit_cutoff()
+    settled = True
+    for entry_id, model, object_id, created_at in entries:
+        touched.setdefault(model, set()).add(object_id)
+        settled = settled and created_at < cutoff
+        if settled:
+            last_id = entry_id
+    # A page ending in recent entries is read again next time; don't ask for
+    # the next one straight away
+    has_more = has_more and settled
+
+    # The log only says *which* rows changed; their current state decides
+    # between upsert and delete (a row deleted later in the log is just gone)
+    changes = _empty_changes()
+    for model, object_ids in touched.items():
+        key, queryset, serializer = SYNCED[model]
+        rows = list(queryset().filter(patient_id=patient_id, pk__in=object_ids).order_by('pk'))
+        changes[key]['upserted'] = serializer(rows, many=True).data
+        changes[key]['deleted'] = sorted(object_ids - {row.pk for row in rows})
+
+    # Entries past a partial page predate "now", so keep the original issue time
+    token = make_token(last_id, issued_at if has_more else None)
+    return {'token': token, 'reset': False, 'has_more': has_more, 'changes': changes}
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from datetime import datetime
+from unittest import mock
+
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from measurements.models import Measurement
+from patients import exports
+from patients.models import CustomUser, Patient, Visit
+
+
+def moment(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_user(username='admin', password='unused', role='ADMIN')
+        self.client.force_authenticate(admin)
+
+        self.meena = Patient.objects.create(name='Meena Rao', age=35, gender='Female', phone='9845022222')
+        self.ravi = Patient.objects.create(name='=HYPERLINK("http://x")', age=40, gender='Male', phone='9845011111')
+        self.late_night = self.meena.start_visit(visit_time=moment(2026, 3, 1, 23, 30), reason='fever')
+        self.midnight = self.ravi.start_visit(visit_time=moment(2026, 3, 2), reason='-cough')
+        self.noon = self.meena.start_visit(visit_time=moment(2026, 3, 2, 12), reason='review')
+        self.meena.update_visit(status='completed')
+        Measurement.objects.create(patient=self.meena, visit=self.noon, spo2=97, temperature=-1.5)
+
+    def export(self, dataset, extension, **params):
+        return self.client.get(reverse('export', args=[dataset, extension]), params)
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def visit_ids(self, **params):
+        lines = self.content(self.export('visits', 'ndjson', **params)).splitlines()
+        return [json.loads(line)['id'] for line in lines]
+
+    def test_csv_header_and_rows(self):
+        response = self.export('visits', 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="visits-', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+
+        self.assertEqual(rows[0], [name for name, _ in exports.DATASETS['visits'].columns])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.late_night.pk, self.midnight.pk, self.noon.pk])
+        noon = dict(zip(rows[0], rows[-1]))
+        self.assertEqual((noon['patient_id'], noon['reason'], noon['status']), (self.meena.patient_id, 'review', 'completed'))
+
+    def test_csv_escapes_formulas(self):
+        patients = list(csv.reader(io.StringIO(self.content(self.export('patients', 'csv')))))
+        self.assertEqual(patients[2][2], '\'=HYPERLINK("http://x")')
+        visits = list(csv.reader(io.StringIO(self.content(self.export('visits', 'csv')))))
+        self.assertEqual(visits[2][3], "'-cough")
+        # Numbers are not text a spreadsheet parses, so they stay as they are
+        measurements = list(csv.reader(io.StringIO(self.content(self.export('measurements', 'csv')))))
+        self.assertEqual(dict(zip(*measurements))['temperature'], '-1.5')
+
+    def test_ndjson_lines(self):
+        response = self.export('measurements', 'ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.content(response).splitlines()
+
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(list(row), [name for name, _ in exports.DATASETS['measurements'].columns])
+        self.assertEqual((row['patient_id'], row['visit_id'], row['spo2']), (self.meena.patient_id, self.noon.pk, 97))
+        # NDJSON is written as stored
+        patients = [json.loads(line) for line in self.content(self.export('patients', 'ndjson')).splitlines()]
+        self.assertEqual(patients[1]['name'], '=HYPERLINK("http://x")')
+
+    def test_date_and_datetime_bounds(self):
+        # A date `to` includes that day; a datetime `to` is exclusive
+        self.assertEqual(self.visit_ids(to='2026-03-01'), [self.late_night.pk])
+        self.assertEqual(self.visit_ids(to='2026-03-02'), [self.late_night.pk, self.midnight.pk, self.noon.pk])
+        self.assertEqual(self.visit_ids(to='2026-03-02T00:00:00'), [self.late_night.pk])
+        self.assertEqual(self.visit_ids(**{'from': '2026-03-02'}), [self.midnight.pk, self.noon.pk])
+        self.assertEqual(self.visit_ids(**{'from': '2026-03-02T00:00:01', 'to': '2026-03-02'}), [self.noon.pk])
+
+    def test_status_filters(self):
+        self.assertEqual(self.visit_ids(status='completed'), [self.noon.pk])
+        patients = self.content(self.export('patients', 'ndjson', status='waiting')).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in patients], [self.ravi.pk])
+
+    def test_bad_filters_are_400(self):
+        for params in ({'status': 'archived'}, {'health_status': 'fine'}, {'from': '2026-02-30'}, {'to': 'soon'}):
+            with self.subTest(params=params):
+                response = self.export('visits', 'csv', **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_unknown_dataset_or_extension_is_404(self):
+        self.assertEqual(self.export('users', 'csv').status_code, 404)
+        self.assertEqual(self.export('visits', 'xlsx').status_code, 404)
+
+    def test_staff_other_than_admins_are_refused(self):
+        nurse = CustomUser.objects.create_user(username='nurse', password='unused', role='NURSE')
+        self.client.force_authenticate(nurse)
+        self.assertEqual(self.export('visits', 'csv').status_code, 403)
+
+    def test_keyset_pages_without_server_side_cursors(self):
+        settings_dict = connections['default'].settings_dict
+        with mock.patch.dict(settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}), \
+                mock.patch.object(QuerySet, 'iterator', side_effect=AssertionError('server-side cursor used')):
+            with self.assertNumQueries(2):
+                chunks = list(exports.export_chunks('visits', 'ndjson', {}, chunk_size=2))
+
+        ids = [json.loads(line)['id'] for line in ''.join(chunks).splitlines()]
+        self.assertEqual(ids, [self.late_night.pk, self.midnight.pk, self.noon.pk])
+        self.assertEqual(ids, list(Visit.objects.order_by('pk').values_list('pk', flat=True)))
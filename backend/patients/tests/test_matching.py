@@ -0,0 +1,96 @@
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from patients import matching
+from patients.models import Patient
+
+# Family members sharing one phone, with names similar enough to score
+# as likely duplicates - none of them is the other
+SIBLINGS = [
+    ('Rajesh Kumar', 'Rakesh Kumar'),
+    ('Sunita Sharma', 'Sunil Sharma'),
+    ('Anil Verma', 'Amit Verma'),
+    ('Priya Singh', 'Riya Singh'),
+]
+PHONE = '9845012345'
+
+CONSENT = {
+    'data_collection_consent': True,
+    'data_usage_consent': True,
+    'privacy_policy_acknowledged': True,
+}
+
+
+class ExactMatchTests(TestCase):
+    def test_matches_normalized_phone_and_name(self):
+        patient = Patient.objects.create(name='Imran Khan', age=40, gender='Male', phone='+91 98450-12345')
+        self.assertEqual(matching.exact_match('Dr. imran  KHAN', '098450 12345'), patient)
+
+    def test_similar_names_on_one_phone_do_not_match(self):
+        for existing, incoming in SIBLINGS:
+            with self.subTest(existing=existing, incoming=incoming):
+                Patient.objects.create(name=existing, age=30, gender='Other', phone=PHONE)
+                self.assertIsNone(matching.exact_match(incoming, PHONE))
+                # ...but they are possible duplicates for a person to review
+                matches = matching.find_matches(incoming, PHONE)
+                self.assertEqual(matches[0].patient.name, existing)
+
+    def test_needs_a_phone_and_a_name(self):
+        Patient.objects.create(name='Imran Khan', age=40, gender='Male', phone='')
+        self.assertIsNone(matching.exact_match('Imran Khan', ''))
+        self.assertIsNone(matching.exact_match('', PHONE))
+
+
+class RegistrationMatchingTests(APITestCase):
+    def register(self, name, phone=PHONE):
+        return self.client.post('/api/patients/', {
+            'name': name, 'age': 30, 'gender': 'Male', 'phone': phone, 'reason': 'Fever', **CONSENT
+        }, format='json')
+
+    def test_sibling_is_registered_as_a_new_patient(self):
+        for existing, incoming in SIBLINGS:
+            with self.subTest(existing=existing, incoming=incoming):
+                sibling = Patient.objects.create(name=existing, age=30, gender='Male', phone=PHONE)
+                response = self.register(incoming)
+                self.assertEqual(response.status_code, 201, response.data)
+                self.assertFalse(response.data['is_returning'])
+                self.assertNotEqual(response.data['patient']['id'], sibling.pk)
+                self.assertIn(sibling.pk, [candidate['id'] for candidate in response.data['possible_duplicates']])
+
+    def test_returning_patient_is_matched_on_normalized_phone_and_name(self):
+        patient = Patient.objects.create(name='Rajesh Kumar', age=30, gender='Male', phone='+91 98450 12345')
+        response = self.register('rajesh  kumar', phone='098450-12345')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data['is_returning'])
+        self.assertEqual(response.data['patient_id'], patient.patient_id)
+        self.assertEqual(Patient.objects.count(), 1)
+
+
+class PortalRegistrationMatchingTests(APITestCase):
+    def register(self, first_name, last_name, username, phone=PHONE):
+        return self.client.post('/api/patient-portal/register/', {
+            'username': username, 'email': f'{username}@example.com',
+            'password': 'Str0ng-passw0rd!', 'password_confirm': 'Str0ng-passw0rd!',
+            'first_name': first_name, 'last_name': last_name,
+            'phone': phone, 'age': 30, 'gender': 'Male', 'address': '',
+        }, format='json')
+
+    def test_sibling_record_is_not_linked(self):
+        for number, (existing, incoming) in enumerate(SIBLINGS):
+            with self.subTest(existing=existing, incoming=incoming):
+                # A phone each: a second portal account on one phone is refused anyway
+                phone = f'{PHONE[:-1]}{number}'
+                sibling = Patient.objects.create(name=existing, age=30, gender='Male', phone=phone)
+                response = self.register(*incoming.split(), username=f'sibling{number}', phone=phone)
+                self.assertEqual(response.status_code, 201, response.data)
+                sibling.refresh_from_db()
+                self.assertIsNone(sibling.user_id)
+                self.assertTrue(Patient.objects.filter(name=incoming, user__username=f'sibling{number}').exists())
+
+    def test_reception_record_is_linked(self):
+        patient = Patient.objects.create(name='Rajesh Kumar', age=30, gender='Male', phone='+91 98450 12345')
+        response = self.register('Rajesh', 'Kumar', username='rajesh')
+        self.assertIn(response.status_code, (200, 201), response.data)
+        patient.refresh_from_db()
+        self.assertIsNotNone(patient.user_id)
+        self.assertEqual(Patient.objects.count(), 1)
@@ -0,0 +1,76 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from patients.models import CustomUser, Patient
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    COMPRESSION_MIN_SIZE=0,
+)
+class CachedPatientResponseTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        doctor = CustomUser.objects.create_user(username='doctor', password='unused', role='DOCTOR')
+        self.client.force_authenticate(doctor)
+        self.patient = Patient.objects.create(name='Meena Rao', age=35, gender='Female', phone='9845022222')
+        self.patient.start_visit(reason='fever')
+        self.url = reverse('patient-detail', args=[self.patient.pk])
+
+    def get(self, **headers):
+        # if_none_match='...' sends If-None-Match: ...
+        return self.client.get(self.url, headers={name.replace('_', '-').title(): value for name, value in headers.items()})
+
+    def test_identity_response_has_a_strong_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(json.loads(response.content)['name'], 'Meena Rao')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_matching_etag_is_304_without_queries(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_compressed_response_has_a_weak_etag(self):
+        response = self.get(accept_encoding='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(json.loads(gzip.decompress(response.content))['name'], 'Meena Rao')
+
+        # Weak comparison: the same representation, whichever coding the client holds
+        weak = response['ETag']
+        strong = self.get()['ETag']
+        self.assertEqual(weak, 'W/' + strong)
+        for etag in (weak, strong, f'"other", {weak}', '*'):
+            with self.subTest(etag=etag):
+                self.assertEqual(self.get(if_none_match=etag, accept_encoding='gzip').status_code, 304)
+                self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+    def test_change_invalidates_the_etag(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.update_visit(status='checking')
+
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['status'], 'checking')
+
+    def test_query_parameters_vary_the_etag(self):
+        full = self.get()['ETag']
+        response = self.client.get(self.url, {'fields': 'id,name'}, headers={'If-None-Match': full})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], full)
+        self.assertEqual(set(json.loads(response.content)), {'id', 'name'})
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from patients.models import CustomUser, Patient
+from patients.response_cache import portal_patient_id
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PortalUserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.old_user = CustomUser.objects.create_user(username='old', password='unused', role='PATIENT')
+        self.new_user = CustomUser.objects.create_user(username='new', password='unused', role='PATIENT')
+        self.patient = Patient.objects.create(
+            name='Laxmi Devi', age=62, gender='Female', phone='9845012345', user=self.old_user
+        )
+
+    def test_relinking_uncaches_the_old_user(self):
+        self.assertEqual(portal_patient_id(self.old_user), self.patient.pk)
+        self.assertIsNone(portal_patient_id(self.new_user))
+
+        patient = Patient.objects.get(pk=self.patient.pk)
+        patient.user = self.new_user
+        with self.captureOnCommitCallbacks(execute=True):
+            patient.save()
+
+        self.assertIsNone(portal_patient_id(self.old_user))
+        self.assertEqual(portal_patient_id(self.new_user), self.patient.pk)
+
+    def test_unlinking_uncaches_the_old_user(self):
+        self.assertEqual(portal_patient_id(self.old_user), self.patient.pk)
+
+        patient = Patient.objects.get(pk=self.patient.pk)
+        patient.user = None
+        with self.captureOnCommitCallbacks(execute=True):
+            patient.save()
+
+        self.assertIsNone(portal_patient_id(self.old_user))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from measurements.models import Measurement
+from patients import sync
+from patients.models import ChangeLog, Patient
+
+
+@override_settings(SYNC_COMMIT_MARGIN_SECONDS=60)
+class SyncTokenTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Imran Khan', age=40, gender='Male', phone='9845012345')
+
+    def measure(self, **fields):
+        return Measurement.objects.create(patient=self.patient, heart_rate=72, **fields)
+
+    def log(self, measurement, id):
+        ChangeLog.objects.create(
+            id=id, patient_id=self.patient.pk, model='measurement', object_id=measurement.pk, action='upsert'
+        )
+
+    def age_log(self, seconds=120):
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(seconds=seconds))
+
+    def sync(self, token):
+        return sync.delta(self.patient.pk, *sync.parse_token(token))
+
+    def synced_ids(self, response):
+        return [row['id'] for row in response['changes']['measurements']['upserted']]
+
+    def test_token_passes_settled_entries(self):
+        first = self.measure()
+        self.age_log()
+        response = self.sync(sync.make_token(0))
+        self.assertEqual(self.synced_ids(response), [first.pk])
+        last_id = ChangeLog.objects.latest('id').pk
+        self.assertEqual(sync.parse_token(response['token'])[0], last_id)
+
+    def test_token_stops_before_recent_entries(self):
+        self.measure()
+        self.age_log()
+        settled_id = ChangeLog.objects.latest('id').pk
+        recent = self.measure()
+        response = self.sync(sync.make_token(0))
+        # Sent now, and again next time
+        self.assertIn(recent.pk, self.synced_ids(response))
+        self.assertEqual(sync.parse_token(response['token'])[0], settled_id)
+        self.assertIn(recent.pk, self.synced_ids(self.sync(response['token'])))
+
+    def test_late_commit_of_a_lower_id_is_not_skipped(self):
+        # Two concurrent writes: the first is allocated change-log id n + 1
+        # but commits after the second (n + 2) has been synced
+        self.measure()
+        self.age_log()
+        n = ChangeLog.objects.latest('id').pk
+        with mock.patch('patients.signals.ChangeLog.objects.create'):
+            early = self.measure()
+            late = self.measure()
+        self.log(late, id=n + 2)
+        response = self.sync(sync.make_token(n))
+        self.assertEqual(self.synced_ids(response), [late.pk])
+
+        self.log(early, id=n + 1)
+        self.assertIn(early.pk, self.synced_ids(self.sync(response['token'])))
+
+    def test_snapshot_token_stops_before_recent_entries(self):
+        self.measure()
+        self.age_log()
+        settled_id = ChangeLog.objects.latest('id').pk
+        self.measure()
+        response = sync.snapshot(self.patient.pk)
+        self.assertEqual(sync.parse_token(response['token'])[0], settled_id)
+
+    def test_recent_page_does_not_ask_for_more(self):
+        with mock.patch.object(sync, 'PAGE_SIZE', 2):
+            for _ in range(3):
+                self.measure()
+            self.assertFalse(self.sync(sync.make_token(0))['has_more'])
+            self.age_log()
+            self.assertTrue(self.sync(sync.make_token(0))['has_more'])
+
+
+class ChangeLogTransactionTests(TestCase):
+    def test_change_and_log_entry_commit_together(self):
+        patient = Patient.objects.create(name='Imran Khan', age=40, gender='Male', phone='9845012345')
+        with mock.patch('patients.signals.ChangeLog.objects.create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                Measurement.objects.create(patient=patient, heart_rate=72)
+        self.assertFalse(Measurement.objects.exists())
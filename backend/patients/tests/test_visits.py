@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from patients.models import CustomUser, Patient, Visit
+from patients.serializers import PatientCreateUpdateSerializer
+
+
+class VisitAdminTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_superuser(username='admin', password='unused', role='ADMIN')
+        self.client.force_login(admin)
+        self.patient = Patient.objects.create(name='Ravi Kumar', age=40, gender='Male', phone='9845011111')
+        self.past = self.patient.start_visit(reason='fever')
+        self.current = self.patient.start_visit(reason='follow-up')
+
+    def post_visit(self, visit, status):
+        url = reverse('admin:patients_visit_change', args=[visit.pk])
+        return self.client.post(url, {
+            'visit_time_0': visit.visit_time.strftime('%Y-%m-%d'),
+            'visit_time_1': visit.visit_time.strftime('%H:%M:%S'),
+            'reason': visit.reason,
+            'status': status,
+            'health_status': visit.health_status,
+            'priority_score': visit.priority_score,
+        })
+
+    def test_completing_and_reopening_moves_closed_at(self):
+        self.assertEqual(self.post_visit(self.current, 'completed').status_code, 302)
+        self.current.refresh_from_db()
+        self.assertEqual(self.current.status, 'completed')
+        self.assertIsNotNone(self.current.closed_at)
+
+        self.assertEqual(self.post_visit(self.current, 'waiting').status_code, 302)
+        self.current.refresh_from_db()
+        self.assertEqual(self.current.status, 'waiting')
+        self.assertIsNone(self.current.closed_at)
+
+    def test_past_visit_status_is_read_only(self):
+        closed_at = self.past.closed_at
+        self.post_visit(self.past, 'completed')
+        self.past.refresh_from_db()
+        self.assertEqual(self.past.status, 'waiting')
+        self.assertEqual(self.past.closed_at, closed_at)
+        self.assertEqual(Visit.objects.filter(patient=self.patient, closed_at__isnull=True).count(), 1)
+
+    def test_visits_cannot_be_added_outside_check_in(self):
+        response = self.client.get(reverse('admin:patients_visit_add'))
+        self.assertEqual(response.status_code, 403)
+
+
+class VisitLifecycleTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Meena Rao', age=35, gender='Female', phone='9845022222')
+
+    def test_start_visit_closes_the_previous_one(self):
+        first = self.patient.start_visit(reason='cough')
+        second = self.patient.start_visit(reason='review')
+
+        first.refresh_from_db()
+        self.assertEqual(first.closed_at, second.visit_time)
+        self.assertIsNone(second.closed_at)
+        self.assertEqual(Patient.objects.get(pk=self.patient.pk).current_visit_id, second.pk)
+
+    def test_update_visit_sets_and_clears_closed_at(self):
+        visit = self.patient.start_visit()
+
+        self.patient.update_visit(status='completed')
+        visit.refresh_from_db()
+        self.assertIsNotNone(visit.closed_at)
+
+        self.patient.update_visit(status='checking')
+        visit.refresh_from_db()
+        self.assertEqual(visit.status, 'checking')
+        self.assertIsNone(visit.closed_at)
+
+    def test_update_visit_without_a_visit_starts_one(self):
+        visit = self.patient.update_visit(reason='headache')
+        self.assertEqual(self.patient.current_visit, visit)
+        self.assertEqual(visit.reason, 'headache')
+
+
+class PatientVisitFieldsTests(TestCase):
+    consents = {
+        'data_collection_consent': True,
+        'data_usage_consent': True,
+        'privacy_policy_acknowledged': True,
+    }
+
+    def test_create_starts_the_first_visit(self):
+        serializer = PatientCreateUpdateSerializer(data={
+            'name': 'Arjun Shetty', 'age': 51, 'gender': 'Male', 'phone': '9845033333',
+            'reason': 'chest pain', 'status': 'checking', **self.consents,
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        patient = serializer.save()
+
+        visit = Patient.objects.select_related('current_visit').get(pk=patient.pk).current_visit
+        self.assertEqual((visit.reason, visit.status), ('chest pain', 'checking'))
+        self.assertEqual(serializer.data['reason'], 'chest pain')
+        self.assertEqual(serializer.data['status'], 'checking')
+
+    def test_update_writes_visit_fields_to_the_current_visit(self):
+        patient = Patient.objects.create(name='Arjun Shetty', age=51, gender='Male', phone='9845033333')
+        visit = patient.start_visit(reason='chest pain')
+
+        serializer = PatientCreateUpdateSerializer(
+            patient, data={'status': 'completed', 'notes': 'ECG normal', 'age': 52}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        visit.refresh_from_db()
+        self.assertEqual((visit.status, visit.notes, visit.reason), ('completed', 'ECG normal', 'chest pain'))
+        self.assertIsNotNone(visit.closed_at)
+        self.assertEqual(Patient.objects.get(pk=patient.pk).age, 52)
+        self.assertEqual(Visit.objects.filter(patient=patient).count(), 1)
+
+
+class VisitMigrationTests(TransactionTestCase):
+    """Round trip of the move of visits out of Patient and VisitHistory."""
+
+    before = [
+        ('patients', '0008_changelog'),
+        ('measurements', '0002_measurement_patient_timestamp_index'),
+        ('prescriptions', '0003_prescriptionhistory_patient_index'),
+    ]
+    after = [
+        ('patients', '0011_remove_patient_visit_fields'),
+        ('measurements', '0003_measurement_visit'),
+        ('prescriptions', '0004_prescriptionhistory_visit'),
+    ]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(lambda: self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes()))
+        apps = self.migrate(self.before)
+        Patient = apps.get_model('patients', 'Patient')
+        VisitHistory = apps.get_model('patients', 'VisitHistory')
+        Measurement = apps.get_model('measurements', 'Measurement')
+        PrescriptionHistory = apps.get_model('prescriptions', 'PrescriptionHistory')
+
+        self.t0 = datetime(2026, 3, 2, 9, 0, tzinfo=dt_timezone.utc)
+        self.t1 = self.t0 + timedelta(days=30)
+        self.returning = Patient.objects.create(
+            patient_id='PAT0001', name='Savitha', age=44, gender='Female', phone='9845044444',
+            reason='follow-up', status='completed', notes='better',
+            health_status='normal', priority_score=10,
+        )
+        self.new = Patient.objects.create(
+            patient_id='PAT0002', name='Girish', age=29, gender='Male', phone='9845055555',
+            reason='fever', status='waiting',
+        )
+        # visit_time and the other timestamps are auto_now_add here
+        Patient.objects.update(visit_time=self.t1)
+        history = VisitHistory.objects.create(
+            patient=self.returning, visit_time=self.t0, reason='fever', status='completed', health_status='mild',
+        )
+        VisitHistory.objects.filter(pk=history.pk).update(archived_at=self.t1)
+        self.history_id = history.pk
+
+        early = Measurement.objects.create(patient=self.returning, spo2=97)
+        late = Measurement.objects.create(patient=self.returning, spo2=99)
+        Measurement.objects.filter(pk=early.pk).update(timestamp=self.t0 + timedelta(minutes=10))
+        Measurement.objects.filter(pk=late.pk).update(timestamp=self.t1 + timedelta(minutes=10))
+        self.early_id, self.late_id = early.pk, late.pk
+        PrescriptionHistory.objects.create(patient=self.returning, medicines=['paracetamol'], visit_date=self.t0)
+
+    def test_round_trip(self):
+        apps = self.migrate(self.after)
+        Patient = apps.get_model('patients', 'Patient')
+        Visit = apps.get_model('patients', 'Visit')
+        Measurement = apps.get_model('measurements', 'Measurement')
+        PrescriptionHistory = apps.get_model('prescriptions', 'PrescriptionHistory')
+
+        past = Visit.objects.get(pk=self.history_id)
+        self.assertEqual((past.patient_id, past.visit_time, past.closed_at), (self.returning.pk, self.t0, self.t1))
+        returning = Patient.objects.select_related('current_visit').get(pk=self.returning.pk)
+        current = returning.current_visit
+        self.assertNotEqual(current.pk, past.pk)
+        self.assertEqual((current.reason, current.status, current.notes), ('follow-up', 'completed', 'better'))
+        self.assertEqual(current.closed_at, self.t1)
+        new = Patient.objects.select_related('current_visit').get(pk=self.new.pk)
+        self.assertEqual((new.current_visit.status, new.current_visit.closed_at), ('waiting', None))
+        self.assertEqual(Measurement.objects.get(pk=self.early_id).visit_id, past.pk)
+        self.assertEqual(Measurement.objects.get(pk=self.late_id).visit_id, current.pk)
+        self.assertEqual(PrescriptionHistory.objects.get().visit_id, past.pk)
+
+        apps = self.migrate(self.before)
+        Patient = apps.get_model('patients', 'Patient')
+        VisitHistory = apps.get_model('patients', 'VisitHistory')
+
+        returning = Patient.objects.get(pk=self.returning.pk)
+        self.assertEqual(
+            (returning.reason, returning.visit_time, returning.status, returning.notes, returning.priority_score),
+            ('follow-up', self.t1, 'completed', 'better', 10),
+        )
+        self.assertEqual(Patient.objects.get(pk=self.new.pk).status, 'waiting')
+        history = VisitHistory.objects.get()
+        self.assertEqual((history.pk, history.visit_time, history.archived_at), (self.history_id, self.t0, self.t1))
@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PatientViewSet
+from .views import PatientViewSet, export_view, patient_events
 
 router = DefaultRouter()
 router.register(r'patients', PatientViewSet, basename='patient')
 
 urlpatterns = [
+    # Before the router, whose detail route would take 'events' for a pk
+    path('patients/events/', patient_events, name='patient-events'),  # Server-sent events
+    path('exports/<str:dataset>.<str:extension>', export_view, name='export'),  # CSV/NDJSON downloads
     path('', include(router.urls)),
 ]
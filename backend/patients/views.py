@@ -1,12 +1,23 @@
-from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework import serializers, viewsets, status
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from adrf.decorators import api_view as async_api_view
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from .models import Patient, ConsentLog
+from ashwini_backend.fieldsets import requested_fields
+from ashwini_backend.renderers import CSVRenderer, EventStreamRenderer, NDJSONRenderer, ORJSONRenderer
+from monitoring.query_budget import query_budget
+from . import exports, matching
+from .events import event_stream_response
+from .models import Patient, Visit, ConsentLog, ChangeLog
+from .permissions import IsAdminUser
+from .response_cache import cached_patient_response
 from .serializers import (
     PatientListSerializer,
+    PatientListValuesSerializer,
     PatientDetailSerializer,
     PatientCreateUpdateSerializer
 )
@@ -55,10 +66,23 @@ class PatientViewSet(viewsets.ModelViewSet):
     - GET /api/patients/<id>/prescription/ - Get patient's prescription
     - PUT /api/patients/<id>/prescription/ - Update patient's prescription
     - POST /api/patients/<id>/assess_health/ - Manually trigger health assessment
+    - GET /api/patients/<id>/workspace/ - Doctor's patient screen in one response
     """
     
     queryset = Patient.objects.all()
     
+    # Max SQL queries per action (including the JWT user lookup),
+    # enforced by monitoring.middleware.QueryBudgetMiddleware
+    query_budgets = {
+        'list': 2,
+        'prioritized': 2,
+        'retrieve': 3,
+        'search': 4,
+        'prescription:get': 3,
+        'prescription_history': 3,
+        'workspace': 5,
+    }
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
         if self.action == 'list' or self.action == 'prioritized':
@@ -76,25 +100,40 @@ class PatientViewSet(viewsets.ModelViewSet):
         queryset = Patient.objects.all()
         status_filter = self.request.query_params.get('status', None)
         if status_filter:
-            queryset = queryset.filter(status=status_filter)
+            queryset = queryset.filter(current_visit__status=status_filter)
+            if status_filter in Visit.OPEN_STATUSES:
+                # Always true of these; lets the database read the open-visit queue index
+                queryset = queryset.filter(current_visit__closed_at__isnull=True)
+        if self.action == 'retrieve':
+            queryset = PatientDetailSerializer.setup_eager_loading(
+                queryset, requested_fields(self.request, PatientDetailSerializer)
+            )
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        """Patient list, serialized from values_list() rows. Supports ?fields=."""
+        fields = requested_fields(request, PatientListSerializer)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = PatientListValuesSerializer(queryset, context=self.get_serializer_context(), fields=fields)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def prioritized(self, request):
         """
         Get patients sorted by health priority (critical first).
         
         GET /api/patients/prioritized/
-        Returns patients ordered by: priority_score DESC, visit_time ASC
+        Returns patients ordered by their current visit's priority_score DESC, visit_time ASC
         """
-        patients = Patient.objects.all().order_by('-priority_score', 'visit_time')
+        patients = Patient.objects.all().order_by('-current_visit__priority_score', 'current_visit__visit_time')
         
         # Optional filter by health status
         health_filter = request.query_params.get('health_status', None)
         if health_filter:
-            patients = patients.filter(health_status=health_filter)
+            patients = patients.filter(current_visit__health_status=health_filter)
         
-        serializer = self.get_serializer(patients, many=True)
+        fields = requested_fields(request, PatientListSerializer)
+        serializer = PatientListValuesSerializer(patients, context=self.get_serializer_context(), fields=fields)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -106,7 +145,7 @@ class PatientViewSet(viewsets.ModelViewSet):
         
         Searches in the following order:
         1. Exact match by patient_id
-        2. Exact match by phone number
+        2. Match by phone number, in any format ("098450 12345" finds "+91 98450-12345")
         3. Partial match by name (case-insensitive)
         
         Returns list of matching patients.
@@ -120,21 +159,25 @@ class PatientViewSet(viewsets.ModelViewSet):
             )
         
         # Try exact match by patient_id first
-        patient = Patient.objects.filter(patient_id=search_term).first()
+        patient = PatientDetailSerializer.setup_eager_loading(
+            Patient.objects.filter(patient_id=search_term)
+        ).first()
         if patient:
             serializer = PatientDetailSerializer(patient)
             return Response({'results': [serializer.data], 'count': 1})
         
-        # Try exact match by phone
-        patients = Patient.objects.filter(phone=search_term)
-        if patients.exists():
-            serializer = PatientListSerializer(patients, many=True)
-            return Response({'results': serializer.data, 'count': patients.count()})
+        # Try match by phone (evaluated once - no separate exists()/count())
+        by_phone = Q(phone=search_term)
+        phone_e164 = matching.normalize_phone(search_term)
+        if phone_e164:
+            by_phone |= Q(phone_e164=phone_e164)
+        results = PatientListValuesSerializer(Patient.objects.filter(by_phone)).data
+        if results:
+            return Response({'results': results, 'count': len(results)})
         
         # Try partial match by name (case-insensitive)
-        patients = Patient.objects.filter(name__icontains=search_term)
-        serializer = PatientListSerializer(patients, many=True)
-        return Response({'results': serializer.data, 'count': patients.count()})
+        results = PatientListValuesSerializer(Patient.objects.filter(name__icontains=search_term)).data
+        return Response({'results': results, 'count': len(results)})
     
     def create(self, request, *args, **kwargs):
         """
@@ -142,10 +185,15 @@ class PatientViewSet(viewsets.ModelViewSet):
         
         Search priority for existing patients:
         1. patient_id (if provided)
-        2. phone + name combination
-        
-        - If patient exists: Update visit information and reset status (returning patient)
-        - If patient is new: Create new patient record
+        2. phone + name, normalized (patients.matching.exact_match), so
+           "098450 12345" finds "+91 98450-12345" and "Dr. Imran Khan" finds "imran khan"
+        
+        - If patient exists: Start a new visit, waiting in the queue (returning patient);
+          the previous visit stays in the visit history as it was
+        - If patient is new: Create new patient record and its first visit;
+          similar patients (a shared phone, a similar-sounding name) are
+          returned as `possible_duplicates` for reception to review - never
+          merged automatically, as family members share phones and names
         - Preserves user account, measurements, and prescription history
         """
         try:
@@ -155,14 +203,21 @@ class PatientViewSet(viewsets.ModelViewSet):
             
             # Check if patient already exists
             existing_patient = None
+            matches = []
             
             # Priority 1: Search by patient_id if provided
             if patient_id:
-                existing_patient = Patient.objects.filter(patient_id=patient_id).first()
+                existing_patient = Patient.objects.select_related('current_visit').filter(patient_id=patient_id).first()
             
             # Priority 2: Search by name + phone number if patient_id not found
             if not existing_patient and phone and name:
-                existing_patient = Patient.objects.filter(phone=phone, name=name).first()
+                existing_patient = matching.exact_match(
+                    name, phone, queryset=Patient.objects.select_related('current_visit')
+                )
+                if not existing_patient:
+                    matches = matching.find_matches(
+                        name, phone, age=request.data.get('age'), gender=request.data.get('gender')
+                    )
         
         except Exception as e:
             print(f"Error checking for existing patient: {str(e)}")
@@ -174,24 +229,7 @@ class PatientViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         if existing_patient:
-            # Archive current visit to history before updating
-            from .models import VisitHistory
-            if existing_patient.visit_time:  # Only archive if there was a previous visit
-                try:
-                    VisitHistory.objects.create(
-                        patient=existing_patient,
-                        visit_time=existing_patient.visit_time,
-                        reason=existing_patient.reason or '',
-                        status=existing_patient.status or 'waiting',
-                        health_status=existing_patient.health_status or 'unknown',
-                        notes=existing_patient.notes or '',
-                        next_visit_date=existing_patient.next_visit_date
-                    )
-                except Exception as e:
-                    # Log error but don't fail registration
-                    print(f"Warning: Could not archive visit history: {str(e)}")
-            
-            # Patient is returning - update visit information
+            # Patient is returning - update demographics
             # Note: name and phone are used to identify patient, so they don't change
             try:
                 # Handle age - only update if valid
@@ -213,11 +251,6 @@ class PatientViewSet(viewsets.ModelViewSet):
                 address = request.data.get('address')
                 if address:
                     existing_patient.address = address
-                
-                existing_patient.reason = request.data.get('reason', '')
-                existing_patient.status = 'waiting'  # Reset status for new visit
-                existing_patient.notes = ''  # Clear previous visit notes
-                existing_patient.visit_time = timezone.now()  # New visit time
             except Exception as e:
                 print(f"Error updating patient fields: {str(e)}")
                 import traceback
@@ -258,6 +291,8 @@ class PatientViewSet(viewsets.ModelViewSet):
             
             try:
                 existing_patient.save()
+                # New visit; the previous one is closed and kept as history
+                existing_patient.start_visit(reason=request.data.get('reason', ''))
             except Exception as e:
                 print(f"Error saving existing patient: {str(e)}")
                 import traceback
@@ -347,9 +382,26 @@ class PatientViewSet(viewsets.ModelViewSet):
             'patient': detail_serializer.data,
             'patient_id': patient.patient_id,  # Prominently display patient_id
             'is_returning': False,
-            'username': patient.user.username if patient.user else None
+            'username': patient.user.username if patient.user else None,
+            'possible_duplicates': matching.match_data(matches)
         }, status=status.HTTP_201_CREATED)
     
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get patient details, served from the response cache with an ETag
+        (If-None-Match revalidation returns 304 without querying).
+        
+        ?fields= / ?expand= narrow the payload, e.g.
+        ?fields=id,name,status&expand=latest_measurement
+        """
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if not str(pk).isdigit():
+            return super().retrieve(request, *args, **kwargs)  # 404
+        fields = requested_fields(request, PatientDetailSerializer)
+        return cached_patient_response(
+            request, pk, 'detail', lambda: self.get_serializer(self.get_object(), fields=fields).data
+        )
+    
     def update(self, request, *args, **kwargs):
         """
         Update patient. Supports partial updates.
@@ -391,13 +443,13 @@ class PatientViewSet(viewsets.ModelViewSet):
         PUT /api/patients/<id>/prescription/
         Body: { "medicines": [ { name, dose, type, quantity }, ... ] }
         """
-        patient = self.get_object()
+        if request.method == 'GET' and str(pk).isdigit():
+            return cached_patient_response(
+                request, pk, 'prescription',
+                lambda: PrescriptionSerializer(self._get_prescription()[1]).data
+            )
         
-        # Get or create prescription
-        prescription, created = Prescription.objects.get_or_create(
-            patient=patient,
-            defaults={'medicines': []}
-        )
+        patient, prescription = self._get_prescription()
         
         if request.method == 'GET':
             serializer = PrescriptionSerializer(prescription)
@@ -407,10 +459,12 @@ class PatientViewSet(viewsets.ModelViewSet):
             # Archive current prescription to history before updating
             if prescription.medicines:  # Only archive if there are existing medicines
                 from prescriptions.models import PrescriptionHistory
+                visit = patient.current_visit
                 PrescriptionHistory.objects.create(
                     patient=patient,
+                    visit=visit,
                     medicines=prescription.medicines,
-                    visit_date=patient.visit_time
+                    visit_date=visit.visit_time if visit else None
                 )
             
             serializer = PrescriptionSerializer(prescription, data=request.data, partial=True)
@@ -418,6 +472,16 @@ class PatientViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data)
     
+    def _get_prescription(self):
+        """The patient and its prescription (created empty if missing)."""
+        patient = self.get_object()
+        prescription, created = Prescription.objects.get_or_create(
+            patient=patient,
+            defaults={'medicines': []}
+        )
+        prescription.patient = patient  # Reuse loaded patient for patient_name
+        return patient, prescription
+    
     @action(detail=True, methods=['get'], url_path='prescription-history')
     def prescription_history(self, request, pk=None):
         """
@@ -426,10 +490,180 @@ class PatientViewSet(viewsets.ModelViewSet):
         GET /api/patients/<id>/prescription-history/
         Returns: [ { "id": 1, "medicines": [...], "created_at": "...", "visit_date": "..." }, ... ]
         """
-        from prescriptions.models import PrescriptionHistory
         from prescriptions.serializers import PrescriptionHistorySerializer
         
         patient = self.get_object()
-        history = PrescriptionHistory.objects.filter(patient=patient)
+        # Related manager caches `patient` on each row (no per-row patient_name query)
+        history = patient.prescription_history.all()
         serializer = PrescriptionHistorySerializer(history, many=True)
         return Response(serializer.data)
+    
+    WORKSPACE_SECTIONS = (
+        'patient', 'vitals', 'latest_measurement', 'reports', 'latest_report',
+        'prescription', 'prescription_history',
+    )
+    VITALS_FIELDS = ('id', 'timestamp', 'blood_pressure', 'temperature', 'spo2', 'heart_rate', 'source')
+    
+    @action(detail=True, methods=['get'])
+    def workspace(self, request, pk=None):
+        """
+        Everything the doctor's patient screen needs, in one response.
+        
+        GET /api/patients/<id>/workspace/
+        
+        Query params:
+        - sections: comma-separated subset of patient, vitals, latest_measurement,
+          reports, latest_report, prescription, prescription_history (default: all)
+        - limit: rows per series/list (default 20, max 100)
+        - vitals_cursor / reports_cursor / prescription_history_cursor: a
+          section's `next_cursor`, to load older rows
+        
+        Response (sections not requested are omitted):
+        {
+            "patient": {...},                  // as GET /api/patients/<id>/
+            "vitals": {                        // columnar, newest first
+                "id": [...], "timestamp": [...], "blood_pressure": [...],
+                "temperature": [...], "spo2": [...], "heart_rate": [...],
+                "source": [...], "next_cursor": "..."
+            },
+            "latest_measurement": {...} | null,
+            "reports": {"results": [...], "next_cursor": null},  // no extracted_text,
+            "latest_report": {...} | null,                        // see analysis_url
+            "prescription": {...} | null,
+            "prescription_history": {"results": [...], "next_cursor": null}
+        }
+        """
+        from measurements.models import Measurement
+        from measurements.serializers import MeasurementSerializer
+        from prescriptions.serializers import PrescriptionHistorySerializer
+        from reports.serializers import ReportSummarySerializer
+        from .pagination import keyset_page, parse_limit
+        
+        requested = request.query_params.get('sections')
+        sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(self.WORKSPACE_SECTIONS)
+        unknown = sorted(set(sections) - set(self.WORKSPACE_SECTIONS))
+        if unknown:
+            return Response(
+                {'error': f"Unknown sections: {', '.join(unknown)}", 'sections': list(self.WORKSPACE_SECTIONS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = parse_limit(request)
+        if not str(pk).isdigit():
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        def build():
+            params = request.query_params
+            patient = get_object_or_404(Patient.objects.select_related('prescription', 'current_visit'), pk=pk)
+            data = {}
+            latest_measurement = latest_report = None
+            latest_measurement_loaded = False
+            
+            if 'vitals' in sections or 'latest_measurement' in sections:
+                cursor = params.get('vitals_cursor') if 'vitals' in sections else None
+                rows, next_cursor = keyset_page(
+                    Measurement.objects.filter(patient=patient).values(*self.VITALS_FIELDS),
+                    'timestamp', limit if 'vitals' in sections else 1, cursor
+                )
+                if 'vitals' in sections:
+                    timestamp = serializers.DateTimeField()
+                    series = {name: [row[name] for row in rows] for name in self.VITALS_FIELDS}
+                    series['timestamp'] = [timestamp.to_representation(t) for t in series['timestamp']]
+                    data['vitals'] = {**series, 'next_cursor': next_cursor}
+                if not cursor:
+                    latest_measurement = Measurement(patient=patient, **rows[0]) if rows else None
+                    latest_measurement_loaded = True
+            
+            if 'patient' in sections:
+                if latest_measurement_loaded:
+                    # Spare the serializer its own latest-measurement query
+                    patient.latest_measurements = [latest_measurement] if latest_measurement else []
+                data['patient'] = PatientDetailSerializer(patient).data
+            
+            if 'latest_measurement' in sections:
+                data['latest_measurement'] = (
+                    MeasurementSerializer(latest_measurement).data if latest_measurement else None
+                )
+            
+            if 'reports' in sections or 'latest_report' in sections:
+                cursor = params.get('reports_cursor') if 'reports' in sections else None
+                rows, next_cursor = keyset_page(
+                    patient.reports.defer('extracted_text'), 'uploaded_at',
+                    limit if 'reports' in sections else 1, cursor
+                )
+                if 'reports' in sections:
+                    data['reports'] = {
+                        'results': ReportSummarySerializer(rows, many=True).data,
+                        'next_cursor': next_cursor,
+                    }
+                if rows and not cursor:
+                    latest_report = rows[0]
+            
+            if 'latest_report' in sections:
+                data['latest_report'] = ReportSummarySerializer(latest_report).data if latest_report else None
+            
+            if 'prescription' in sections:
+                try:
+                    data['prescription'] = PrescriptionSerializer(patient.prescription).data
+                except Prescription.DoesNotExist:
+                    data['prescription'] = None
+            
+            if 'prescription_history' in sections:
+                rows, next_cursor = keyset_page(
+                    patient.prescription_history.all(), 'created_at', limit,
+                    params.get('prescription_history_cursor')
+                )
+                data['prescription_history'] = {
+                    'results': PrescriptionHistorySerializer(rows, many=True).data,
+                    'next_cursor': next_cursor,
+                }
+            
+            # Keep the requested order
+            return {name: data[name] for name in sections if name in data}
+        
+        return cached_patient_response(request, pk, 'workspace', build)
+
+
+@query_budget(2)
+@async_api_view(['GET'])
+@renderer_classes([ORJSONRenderer, EventStreamRenderer])
+@permission_classes([IsAuthenticated])
+async def patient_events(request):
+    """
+    Server-sent events for changes to any patient's data, so staff screens
+    (queue, open patient records) refresh without polling.
+    
+    GET /api/patients/events/
+    Accept: text/event-stream
+    
+    See patients.events for the event format and how clients resume.
+    """
+    if request.user.role == 'PATIENT':
+        return Response(
+            {'error': 'Only staff can access this endpoint'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return await event_stream_response(request, ChangeLog.objects.all())
+
+
+@api_view(['GET'])
+@renderer_classes([ORJSONRenderer, CSVRenderer, NDJSONRenderer])
+@permission_classes([IsAdminUser])
+def export_view(request, dataset, extension):
+    """
+    Stream a dataset (patients, visits or measurements) as a CSV or NDJSON
+    download, for analytics and audits. Administrators only.
+    
+    GET /api/exports/<dataset>.<csv|ndjson>?from=&to=&status=&health_status=
+    
+    See patients.exports for the columns and filters.
+    """
+    if dataset not in exports.DATASETS or extension not in exports.FORMATS:
+        return Response(
+            {'error': f"Exports are {', '.join(exports.DATASETS)} as {' or '.join(exports.FORMATS)}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    try:
+        filters = exports.parse_filters(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return exports.export_response(request, dataset, extension, filters)
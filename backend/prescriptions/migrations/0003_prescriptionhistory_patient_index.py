@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prescriptions', '0002_prescriptionhistory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prescriptionhistory',
+            index=models.Index(fields=['patient', '-created_at'], name='rxhistory_patient_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def attach_to_visits(apps, schema_editor):
+    """
+    Each archived prescription belongs to the visit it was written in:
+    visit_date is that visit's visit_time, so the patient's latest visit
+    begun by then (by created_at when visit_date is missing). One UPDATE.
+    """
+    PrescriptionHistory = apps.get_model('prescriptions', 'PrescriptionHistory')
+    Visit = apps.get_model('patients', 'Visit')
+    PrescriptionHistory.objects.using(schema_editor.connection.alias).update(visit=Subquery(
+        Visit.objects.filter(
+            patient_id=OuterRef('patient_id'),
+            visit_time__lte=Coalesce(OuterRef('visit_date'), OuterRef('created_at')),
+        ).order_by('-visit_time').values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0010_populate_visits'),
+        ('prescriptions', '0003_prescriptionhistory_patient_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescriptionhistory',
+            name='visit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='prescription_history', to='patients.visit'),
+        ),
+        migrations.RunPython(attach_to_visits, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,8 @@
 from django.db import models
-from patients.models import Patient
+from patients.models import ChangeLogged, Patient, Visit
 
 
-class PrescriptionHistory(models.Model):
+class PrescriptionHistory(ChangeLogged):
     """
     Historical record of prescriptions for comparison with past visits.
     
@@ -16,12 +16,23 @@ class PrescriptionHistory(models.Model):
         on_delete=models.CASCADE,
         related_name='prescription_history'
     )
+    # The visit the prescription was written in
+    visit = models.ForeignKey(
+        Visit,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='prescription_history'
+    )
     medicines = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     visit_date = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient', '-created_at'], name='rxhistory_patient_created_idx'),
+        ]
         verbose_name = 'Prescription History'
         verbose_name_plural = 'Prescription Histories'
     
@@ -29,7 +40,7 @@ class PrescriptionHistory(models.Model):
         return f"Prescription for {self.patient.name} on {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
-class Prescription(models.Model):
+class Prescription(ChangeLogged):
     """
     Prescription model - one-to-one relationship with Patient.
     
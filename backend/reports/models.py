@@ -1,5 +1,5 @@
 from django.db import models
-from patients.models import Patient
+from patients.models import ChangeLogged, Patient
 import json
 from django.conf import settings
 
@@ -12,7 +12,7 @@ else:
     report_storage = None  # Use default storage
 
 
-class Report(models.Model):
+class Report(ChangeLogged):
     """
     Report model for storing medical report images and their analysis.
     
@@ -93,17 +93,26 @@ class Report(models.Model):
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Report list / latest report per patient
+            models.Index(fields=['patient', '-uploaded_at'], name='report_patient_uploaded_idx'),
+        ]
     
     def __str__(self):
         return f"Report for {self.patient.name} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
     
     def get_key_phrases_list(self):
         """Helper method to get key phrases as a Python list"""
-        if isinstance(self.key_phrases, list):
-            return self.key_phrases
-        elif isinstance(self.key_phrases, str):
+        return self.parse_key_phrases(self.key_phrases)
+    
+    @staticmethod
+    def parse_key_phrases(key_phrases):
+        """Key phrases as a list, from a raw key_phrases value (e.g. from .values())"""
+        if isinstance(key_phrases, list):
+            return key_phrases
+        elif isinstance(key_phrases, str):
             try:
-                return json.loads(self.key_phrases)
+                return json.loads(key_phrases)
             except:
                 return []
         return []
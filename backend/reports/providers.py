@@ -0,0 +1,60 @@
+"""
+Clients for the report analysis services - Azure Document Intelligence and
+Azure OpenAI - with their SDKs imported when a client is first built.
+
+The two SDKs take about a second to import (openai alone most of it) and
+tens of MB of memory. Importing them here instead of at the top of
+reports.services keeps that out of every process that never analyzes a
+report: management commands, the release step, shells, benchmarks. The
+gunicorn master calls preload() before forking, so web workers start with
+the SDKs of the configured services already imported and shared.
+"""
+
+import functools
+import importlib
+import importlib.util
+import os
+
+OPENAI_API_VERSION = '2024-02-15-preview'
+
+
+@functools.lru_cache(maxsize=None)
+def openai_available():
+    """Whether the openai package is installed (without importing it)."""
+    return importlib.util.find_spec('openai') is not None
+
+
+def document_intelligence_client(endpoint, api_key):
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
+    from azure.core.credentials import AzureKeyCredential
+
+    return DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(api_key))
+
+
+def async_document_intelligence_client(endpoint, api_key):
+    from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+    from azure.core.credentials import AzureKeyCredential
+
+    return DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(api_key))
+
+
+def openai_client(endpoint, api_key):
+    from openai import AzureOpenAI
+
+    return AzureOpenAI(api_key=api_key, api_version=OPENAI_API_VERSION, azure_endpoint=endpoint)
+
+
+def async_openai_client(endpoint, api_key):
+    from openai import AsyncAzureOpenAI
+
+    return AsyncAzureOpenAI(api_key=api_key, api_version=OPENAI_API_VERSION, azure_endpoint=endpoint)
+
+
+def preload(force=False):
+    """Import the SDKs of the configured services (all of them with force=True)."""
+    # Imported for their side effect (sys.modules) only, hence import_module
+    if force or os.environ.get('AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT'):
+        importlib.import_module('azure.ai.documentintelligence')
+        importlib.import_module('azure.ai.documentintelligence.aio')
+    if (force or os.environ.get('AZURE_OPENAI_ENDPOINT')) and openai_available():
+        importlib.import_module('openai')
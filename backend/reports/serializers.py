@@ -1,13 +1,20 @@
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
+from django.urls import reverse
 from rest_framework import serializers
+from ashwini_backend.fast_serializers import ValuesSerializer
+from ashwini_backend.fieldsets import SparseFieldsMixin
 from .models import Report
 
 
-class ReportSerializer(serializers.ModelSerializer):
-    """Serializer for Report model"""
+class ReportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for Report model (supports ?fields=, see ashwini_backend.fieldsets)"""
     
     patient_name = serializers.CharField(source='patient.name', read_only=True)
     key_phrases_list = serializers.SerializerMethodField()
     
+    field_sources = {'key_phrases_list': ('key_phrases',)}
+    
     class Meta:
         model = Report
         fields = [
@@ -25,6 +32,87 @@ class ReportSerializer(serializers.ModelSerializer):
         return obj.get_key_phrases_list()
 
 
+class ReportListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Lean report row for list views.
+    
+    Leaves out the OCR text, key phrases and error message, which can run to
+    many KB per report. Lists show `text_preview`, the first
+    TEXT_PREVIEW_CHARS characters cut in SQL, so the full text is never
+    read. Detail and `analysis_url` return the full body.
+    
+    Querysets must go through setup_queryset().
+    """
+    
+    TEXT_PREVIEW_CHARS = 200
+    
+    patient_name = serializers.CharField(source='patient.name', read_only=True)
+    text_preview = serializers.CharField(read_only=True, allow_null=True)
+    analysis_url = serializers.SerializerMethodField()
+    
+    field_sources = {'analysis_url': ('id',)}
+    
+    class Meta:
+        model = Report
+        fields = [
+            'id', 'patient', 'patient_name', 'report_image',
+            'uploaded_at', 'uploaded_by', 'analysis_status',
+            'confidence_score', 'doctor_notes', 'text_preview', 'analysis_url'
+        ]
+    
+    @classmethod
+    def setup_queryset(cls, queryset):
+        """Annotate the text preview and skip the heavy columns."""
+        return queryset.defer('extracted_text', 'key_phrases', 'error_message').annotate(
+            text_preview=Substr('extracted_text', 1, cls.TEXT_PREVIEW_CHARS)
+        )
+    
+    def get_analysis_url(self, obj):
+        return reverse('report-analysis', args=[obj.pk])
+
+
+class ReportListValuesSerializer(ValuesSerializer):
+    """ReportListSerializer output for report lists, read with values_list()."""
+    
+    serializer_class = ReportListSerializer
+    
+    @cached_property
+    def _analysis_url(self):
+        # reverse() once per list instead of once per row; only the id varies
+        return reverse('report-analysis', args=[0]).rsplit('/0/', 1)
+    
+    def get_analysis_url(self, raw):
+        prefix, suffix = self._analysis_url
+        return f"{prefix}/{raw['id']}/{suffix}"
+
+
+class ReportSummarySerializer(serializers.ModelSerializer):
+    """
+    Report without its OCR text, for views that list many reports.
+    
+    Pair with queryset.defer('extracted_text'); clients load the text on
+    demand from `analysis_url`.
+    """
+    
+    key_phrases_list = serializers.SerializerMethodField()
+    analysis_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Report
+        fields = [
+            'id', 'patient', 'report_image', 'uploaded_at', 'uploaded_by',
+            'analysis_status', 'key_phrases_list', 'confidence_score',
+            'error_message', 'doctor_notes', 'analysis_url'
+        ]
+    
+    def get_key_phrases_list(self, obj):
+        """Return key phrases as a list"""
+        return obj.get_key_phrases_list()
+    
+    def get_analysis_url(self, obj):
+        return reverse('report-analysis', args=[obj.pk])
+
+
 class ReportCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating reports"""
     
@@ -1,17 +1,15 @@
 import os
+import asyncio
 import logging
 import json
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import AnalyzeDocumentRequest, AnalyzeResult
 
-# Import OpenAI at module level to avoid timeout during request
-try:
-    from openai import AzureOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    AzureOpenAI = None
+from monitoring import metrics
+
+# The Azure and OpenAI SDKs are imported by the providers when a client is
+# first built (and preloaded by the gunicorn master), not with this module
+from . import providers
+
+OPENAI_AVAILABLE = providers.openai_available()
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +22,10 @@ class AzureDocumentIntelligenceService:
     1. OCR (Optical Character Recognition) to extract text from images
     2. Key phrase extraction to identify important medical terms
     3. Document analysis with confidence scores
+    
+    The a-prefixed methods (aanalyze_document_from_bytes, aanalyze_document)
+    are async versions for async views: they await Azure and OpenAI instead of
+    blocking a worker, and request the summary and key phrases concurrently.
     """
     
     def __init__(self):
@@ -36,11 +38,7 @@ class AzureDocumentIntelligenceService:
             self.client = None
         else:
             try:
-                credential = AzureKeyCredential(self.api_key)
-                self.client = DocumentIntelligenceClient(
-                    endpoint=self.endpoint,
-                    credential=credential
-                )
+                self.client = providers.document_intelligence_client(self.endpoint, self.api_key)
             except Exception as e:
                 logger.error(f"Failed to initialize Azure Document Intelligence client: {str(e)}")
                 self.client = None
@@ -68,14 +66,15 @@ class AzureDocumentIntelligenceService:
         try:
             logger.info("=== STARTING DOCUMENT ANALYSIS ===")
             # Use the read model for general document analysis
-            poller = self.client.begin_analyze_document(
-                "prebuilt-read",  # Using prebuilt read model for OCR
-                body=file_data,
-                content_type="application/octet-stream"
-            )
-            
-            # Wait for the analysis to complete
-            result = poller.result()
+            with metrics.time_external_call('azure_document_intelligence', 'ocr'):
+                poller = self.client.begin_analyze_document(
+                    "prebuilt-read",  # Using prebuilt read model for OCR
+                    body=file_data,
+                    content_type="application/octet-stream"
+                )
+                
+                # Wait for the analysis to complete
+                result = poller.result()
             
             # Extract raw OCR text
             raw_ocr_text = ""
@@ -90,28 +89,44 @@ class AzureDocumentIntelligenceService:
             # Extract key phrases using OpenAI
             key_phrases = self._extract_key_phrases(raw_ocr_text)
             
-            # Calculate average confidence score
-            confidence_score = self._calculate_confidence(result)
+            return self._analysis_result(result, extracted_text, key_phrases)
             
-            logger.info(f"=== ANALYSIS COMPLETE: {len(key_phrases)} key phrases, confidence {confidence_score} ===")
+        except Exception as e:
+            logger.error(f"Error analyzing document from bytes: {str(e)}")
+            return self._analysis_error(e)
+    
+    async def aanalyze_document_from_bytes(self, file_data):
+        """
+        Async analyze_document_from_bytes(); same arguments and result.
+        """
+        if not self.is_configured():
+            raise Exception("Azure Document Intelligence service is not configured. Please set AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT and AZURE_DOCUMENT_INTELLIGENCE_KEY environment variables.")
+        
+        try:
+            logger.info("=== STARTING DOCUMENT ANALYSIS (async) ===")
+            # A client per call: its HTTP session belongs to the running event loop
+            async with providers.async_document_intelligence_client(self.endpoint, self.api_key) as client:
+                with metrics.time_external_call('azure_document_intelligence', 'ocr'):
+                    poller = await client.begin_analyze_document(
+                        "prebuilt-read",
+                        body=file_data,
+                        content_type="application/octet-stream"
+                    )
+                    result = await poller.result()
             
-            return {
-                'success': True,
-                'extracted_text': extracted_text,  # Now contains OpenAI-formatted summary
-                'key_phrases': key_phrases,
-                'confidence_score': confidence_score,
-                'page_count': len(result.pages) if result.pages else 0
-            }
+            raw_ocr_text = result.content or ""
+            logger.info(f"OCR extracted {len(raw_ocr_text)} characters")
+            
+            # The summary and the key phrases don't depend on each other
+            extracted_text, key_phrases = await asyncio.gather(
+                self._agenerate_readable_summary(raw_ocr_text),
+                self._aextract_key_phrases(raw_ocr_text),
+            )
+            return self._analysis_result(result, extracted_text, key_phrases)
             
         except Exception as e:
             logger.error(f"Error analyzing document from bytes: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'extracted_text': None,
-                'key_phrases': [],
-                'confidence_score': None
-            }
+            return self._analysis_error(e)
     
     def analyze_document(self, file_url):
         """
@@ -147,14 +162,15 @@ class AzureDocumentIntelligenceService:
             
             # Use the read model for general document analysis
             # This model extracts text, layout, and structure
-            poller = self.client.begin_analyze_document(
-                "prebuilt-read",  # Using prebuilt read model for OCR
-                body=file_data,
-                content_type="application/octet-stream"
-            )
-            
-            # Wait for the analysis to complete
-            result = poller.result()
+            with metrics.time_external_call('azure_document_intelligence', 'ocr'):
+                poller = self.client.begin_analyze_document(
+                    "prebuilt-read",  # Using prebuilt read model for OCR
+                    body=file_data,
+                    content_type="application/octet-stream"
+                )
+                
+                # Wait for the analysis to complete
+                result = poller.result()
             
             # Extract text content
             raw_ocr_text = ""
@@ -167,26 +183,57 @@ class AzureDocumentIntelligenceService:
             # Extract key phrases using OpenAI
             key_phrases = self._extract_key_phrases(raw_ocr_text)
             
-            # Calculate average confidence score
-            confidence_score = self._calculate_confidence(result)
-            
-            return {
-                'success': True,
-                'extracted_text': extracted_text,  # Now contains OpenAI-formatted summary
-                'key_phrases': key_phrases,
-                'confidence_score': confidence_score,
-                'page_count': len(result.pages) if result.pages else 0
-            }
+            return self._analysis_result(result, extracted_text, key_phrases)
             
         except Exception as e:
             logger.error(f"Error analyzing document: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'extracted_text': None,
-                'key_phrases': [],
-                'confidence_score': None
-            }
+            return self._analysis_error(e)
+    
+    async def aanalyze_document(self, file_url):
+        """
+        Async analyze_document(); same arguments and result.
+        """
+        if not self.is_configured():
+            raise Exception("Azure Document Intelligence service is not configured. Please set AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT and AZURE_DOCUMENT_INTELLIGENCE_KEY environment variables.")
+        
+        try:
+            if file_url.startswith('http://') or file_url.startswith('https://'):
+                import aiohttp
+                
+                async with aiohttp.ClientSession(raise_for_status=True) as session:
+                    async with session.get(file_url) as response:
+                        file_data = await response.read()
+            else:
+                with open(file_url, "rb") as f:
+                    file_data = f.read()
+        except Exception as e:
+            logger.error(f"Error analyzing document: {str(e)}")
+            return self._analysis_error(e)
+        
+        return await self.aanalyze_document_from_bytes(file_data)
+    
+    def _analysis_result(self, result, extracted_text, key_phrases):
+        # Calculate average confidence score
+        confidence_score = self._calculate_confidence(result)
+        
+        logger.info(f"=== ANALYSIS COMPLETE: {len(key_phrases)} key phrases, confidence {confidence_score} ===")
+        
+        return {
+            'success': True,
+            'extracted_text': extracted_text,  # Now contains OpenAI-formatted summary
+            'key_phrases': key_phrases,
+            'confidence_score': confidence_score,
+            'page_count': len(result.pages) if result.pages else 0
+        }
+    
+    def _analysis_error(self, error):
+        return {
+            'success': False,
+            'error': str(error),
+            'extracted_text': None,
+            'key_phrases': [],
+            'confidence_score': None
+        }
     
     def _extract_key_phrases(self, text):
         """
@@ -224,30 +271,46 @@ class AzureDocumentIntelligenceService:
         
         try:
             logger.info(f"Calling Azure OpenAI for summary generation with deployment: {openai_deployment}")
-            client = AzureOpenAI(
-                api_key=openai_key,
-                api_version="2024-02-15-preview",
-                azure_endpoint=openai_endpoint
-            )
+            client = providers.openai_client(openai_endpoint, openai_key)
             
-            prompt = f"""Clean up and organize this medical report text into a clear, readable format.
-Structure the information logically with proper headings and formatting.
-Correct any OCR errors and make the text easy to understand for healthcare professionals.
-
-Raw OCR Text:
-{raw_ocr_text[:3000]}
-
-Return a well-formatted, professional medical report summary."""
+            with metrics.time_external_call('azure_openai', 'summary'):
+                response = client.chat.completions.create(
+                    model=openai_deployment,
+                    messages=self._summary_messages(raw_ocr_text),
+                    temperature=0.3,
+                    max_tokens=1500
+                )
             
-            response = client.chat.completions.create(
-                model=openai_deployment,
-                messages=[
-                    {"role": "system", "content": "You are a medical document assistant that formats and cleans medical report text for healthcare professionals."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1500
-            )
+            formatted_text = response.choices[0].message.content.strip()
+            logger.info(f"✅ Successfully generated readable summary using Azure OpenAI (length: {len(formatted_text)} chars)")
+            return formatted_text
+            
+        except Exception as e:
+            logger.error(f"❌ Error generating readable summary with OpenAI: {str(e)}", exc_info=True)
+            return raw_ocr_text  # Fallback to raw OCR text
+    
+    async def _agenerate_readable_summary(self, raw_ocr_text):
+        """Async _generate_readable_summary()."""
+        if not raw_ocr_text:
+            return ""
+        
+        openai_endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT')
+        openai_key = os.environ.get('AZURE_OPENAI_API_KEY')
+        openai_deployment = os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o-mini')
+        
+        if not openai_endpoint or not openai_key or not OPENAI_AVAILABLE:
+            logger.warning(f"Azure OpenAI not configured - Endpoint: {bool(openai_endpoint)}, Key: {bool(openai_key)}, Available: {OPENAI_AVAILABLE}")
+            return raw_ocr_text
+        
+        try:
+            async with providers.async_openai_client(openai_endpoint, openai_key) as client:
+                with metrics.time_external_call('azure_openai', 'summary'):
+                    response = await client.chat.completions.create(
+                        model=openai_deployment,
+                        messages=self._summary_messages(raw_ocr_text),
+                        temperature=0.3,
+                        max_tokens=1500
+                    )
             
             formatted_text = response.choices[0].message.content.strip()
             logger.info(f"✅ Successfully generated readable summary using Azure OpenAI (length: {len(formatted_text)} chars)")
@@ -257,6 +320,21 @@ Return a well-formatted, professional medical report summary."""
             logger.error(f"❌ Error generating readable summary with OpenAI: {str(e)}", exc_info=True)
             return raw_ocr_text  # Fallback to raw OCR text
     
+    @staticmethod
+    def _summary_messages(raw_ocr_text):
+        prompt = f"""Clean up and organize this medical report text into a clear, readable format.
+Structure the information logically with proper headings and formatting.
+Correct any OCR errors and make the text easy to understand for healthcare professionals.
+
+Raw OCR Text:
+{raw_ocr_text[:3000]}
+
+Return a well-formatted, professional medical report summary."""
+        return [
+            {"role": "system", "content": "You are a medical document assistant that formats and cleans medical report text for healthcare professionals."},
+            {"role": "user", "content": prompt}
+        ]
+    
     def _extract_key_phrases(self, text):
         """
         Extract key medical phrases from text using Azure OpenAI.
@@ -289,13 +367,64 @@ Return a well-formatted, professional medical report summary."""
         
         try:
             logger.info(f"Calling Azure OpenAI for key phrase extraction with deployment: {openai_deployment}")
-            client = AzureOpenAI(
-                api_key=openai_key,
-                api_version="2024-02-15-preview",
-                azure_endpoint=openai_endpoint
-            )
+            client = providers.openai_client(openai_endpoint, openai_key)
+            
+            with metrics.time_external_call('azure_openai', 'key_phrases'):
+                response = client.chat.completions.create(
+                    model=openai_deployment,
+                    messages=self._key_phrase_messages(text),
+                    temperature=0.3,
+                    max_tokens=500
+                )
+            
+            return self._parse_key_phrases(response)
+            
+        except Exception as e:
+            logger.error(f"❌ Error using Azure OpenAI for key phrase extraction: {str(e)}", exc_info=True)
+        
+        return None
+    
+    async def _aextract_key_phrases(self, text):
+        """Async _extract_key_phrases()."""
+        if not text:
+            return []
+        
+        openai_phrases = await self._aextract_key_phrases_with_openai(text)
+        if openai_phrases:
+            return openai_phrases
+        
+        return self._extract_key_phrases_simple(text)
+    
+    async def _aextract_key_phrases_with_openai(self, text):
+        """Async _extract_key_phrases_with_openai()."""
+        openai_endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT')
+        openai_key = os.environ.get('AZURE_OPENAI_API_KEY')
+        openai_deployment = os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o-mini')
+        
+        if not openai_endpoint or not openai_key or not OPENAI_AVAILABLE:
+            logger.warning(f"Azure OpenAI not configured for key phrases - Endpoint: {bool(openai_endpoint)}, Key: {bool(openai_key)}, Available: {OPENAI_AVAILABLE}")
+            return None
+        
+        try:
+            async with providers.async_openai_client(openai_endpoint, openai_key) as client:
+                with metrics.time_external_call('azure_openai', 'key_phrases'):
+                    response = await client.chat.completions.create(
+                        model=openai_deployment,
+                        messages=self._key_phrase_messages(text),
+                        temperature=0.3,
+                        max_tokens=500
+                    )
+            
+            return self._parse_key_phrases(response)
             
-            prompt = f"""Analyze this medical report text and extract 5-10 key medical findings in clear, understandable format.
+        except Exception as e:
+            logger.error(f"❌ Error using Azure OpenAI for key phrase extraction: {str(e)}", exc_info=True)
+        
+        return None
+    
+    @staticmethod
+    def _key_phrase_messages(text):
+        prompt = f"""Analyze this medical report text and extract 5-10 key medical findings in clear, understandable format.
 Format each finding as a short phrase (3-7 words).
 Focus on: diagnoses, test results, measurements, conditions, medications, and recommendations.
 
@@ -303,31 +432,24 @@ Medical Report Text:
 {text[:2000]}
 
 Return ONLY a JSON array of strings, like: ["Finding 1", "Finding 2", "Finding 3"]"""
-            
-            response = client.chat.completions.create(
-                model=openai_deployment,
-                messages=[
-                    {"role": "system", "content": "You are a medical assistant that extracts key findings from medical reports."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            result_text = response.choices[0].message.content.strip()
-            
-            # Parse JSON response
-            key_phrases = json.loads(result_text)
-            
-            if isinstance(key_phrases, list):
-                logger.info(f"✅ Extracted {len(key_phrases)} key phrases using Azure OpenAI")
-                return key_phrases[:10]  # Limit to 10
-            else:
-                logger.warning(f"OpenAI returned non-list response: {type(key_phrases)}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error using Azure OpenAI for key phrase extraction: {str(e)}", exc_info=True)
+        return [
+            {"role": "system", "content": "You are a medical assistant that extracts key findings from medical reports."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _parse_key_phrases(response):
+        """The phrase list of a key phrase completion, or None if it isn't a JSON list."""
+        result_text = response.choices[0].message.content.strip()
+        
+        # Parse JSON response
+        key_phrases = json.loads(result_text)
+        
+        if isinstance(key_phrases, list):
+            logger.info(f"✅ Extracted {len(key_phrases)} key phrases using Azure OpenAI")
+            return key_phrases[:10]  # Limit to 10
         
+        logger.warning(f"OpenAI returned non-list response: {type(key_phrases)}")
         return None
     
     def _extract_key_phrases_simple(self, text):
@@ -10,4 +10,5 @@ urlpatterns = [
     path('patients/<int:patient_id>/reports/', views.patient_reports_list, name='patient-reports-list'),
     path('patients/<int:patient_id>/reports/latest/', views.patient_reports_latest, name='patient-reports-latest'),
     path('reports/<int:report_id>/analysis/', views.report_analysis, name='report-analysis'),
+    path('reports/<int:report_id>/reanalyze/', views.report_reanalyze, name='report-reanalyze'),
 ]
@@ -1,14 +1,22 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action
+from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
 import os
 import logging
 
+from ashwini_backend.async_utils import aget_object_or_404
+from ashwini_backend.fieldsets import prune_queryset, requested_fields
 from .models import Report
-from .serializers import ReportSerializer, ReportCreateSerializer, ReportAnalysisSerializer
+from .serializers import (
+    ReportSerializer, ReportCreateSerializer, ReportAnalysisSerializer,
+    ReportListSerializer, ReportListValuesSerializer
+)
 from .services import get_document_intelligence_service
 from patients.models import Patient
+from monitoring.query_budget import query_budget
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +26,48 @@ class ReportViewSet(viewsets.ModelViewSet):
     ViewSet for Report model.
     
     Endpoints:
-    - GET /api/reports/ - List all reports
+    - GET /api/reports/ - List all reports (lean rows with a text preview,
+      see ReportListSerializer; ?fields= on list and detail)
     - POST /api/reports/ - Upload a new report (triggers analysis)
     - GET /api/reports/{id}/ - Get specific report details
     - PATCH /api/reports/{id}/ - Update report (e.g., doctor notes)
     - DELETE /api/reports/{id}/ - Delete report
+    
+    Re-analysis is the async report_reanalyze view.
     """
     
-    queryset = Report.objects.all()
+    queryset = Report.objects.select_related('patient')
+    
+    # Max SQL queries per action, enforced by QueryBudgetMiddleware
+    query_budgets = {
+        'list': 2,
+        'retrieve': 2,
+    }
     
     def get_serializer_class(self):
         if self.action == 'create':
             return ReportCreateSerializer
         return ReportSerializer
     
+    def list(self, request, *args, **kwargs):
+        """All reports as lean rows, serialized from values_list()."""
+        fields = requested_fields(request, ReportListSerializer)
+        queryset = ReportListSerializer.setup_queryset(self.filter_queryset(self.get_queryset()))
+        serializer = ReportListValuesSerializer(queryset, context=self.get_serializer_context(), fields=fields)
+        return Response(serializer.data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Report details, reading only the columns of the ?fields= selected."""
+        fields = requested_fields(request, ReportSerializer)
+        queryset = Report.objects.all()
+        if fields is None or 'patient_name' in fields:
+            queryset = queryset.select_related('patient')
+        queryset = prune_queryset(self.filter_queryset(queryset), ReportSerializer, fields)
+        report = get_object_or_404(queryset, pk=kwargs['pk'])
+        self.check_object_permissions(request, report)
+        serializer = ReportSerializer(report, context=self.get_serializer_context(), fields=fields)
+        return Response(serializer.data)
+    
     def create(self, request, *args, **kwargs):
         """
         Upload and analyze a report.
@@ -88,44 +124,86 @@ class ReportViewSet(viewsets.ModelViewSet):
             report.error_message = result.get('error', 'Unknown error occurred')
         
         report.save()
+
+
+async def _aanalyze_report(report, analyze):
+    """
+    Analyze a report with `analyze(service)` - an async
+    AzureDocumentIntelligenceService call - and store the outcome on it.
+    The analysis awaits Azure/OpenAI without holding a worker.
+    """
+    service = get_document_intelligence_service()
     
-    @action(detail=True, methods=['post'])
-    def reanalyze(self, request, pk=None):
-        """
-        Re-analyze an existing report.
-        """
-        report = self.get_object()
-        
-        try:
-            self._analyze_report(report)
-            report.refresh_from_db()
-            serializer = ReportSerializer(report)
-            return Response(serializer.data)
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    if not service.is_configured():
+        report.analysis_status = 'failed'
+        report.error_message = "Azure Document Intelligence is not configured. Please set the required environment variables."
+        await report.asave()
+        return
+    
+    report.analysis_status = 'processing'
+    await report.asave()
+    
+    result = await analyze(service)
+    
+    if result['success']:
+        report.extracted_text = result['extracted_text']
+        report.key_phrases = result['key_phrases']
+        report.confidence_score = result['confidence_score']
+        report.analysis_status = 'completed'
+        report.error_message = None
+    else:
+        report.analysis_status = 'failed'
+        report.error_message = result.get('error', 'Unknown error occurred')
+    
+    await report.asave()
+
+
+@async_api_view(['POST'])
+async def report_reanalyze(request, report_id):
+    """
+    Re-analyze an existing report (async).
+    
+    POST /api/reports/<report_id>/reanalyze/
+    """
+    report = await aget_object_or_404(Report.objects.select_related('patient'), id=report_id)
+    patient = report.patient
+    
+    try:
+        await _aanalyze_report(report, lambda service: service.aanalyze_document(report.report_image.url))
+        await report.arefresh_from_db()
+        report.patient = patient  # refresh_from_db drops the cached patient
+        serializer = ReportSerializer(report)
+        return Response(serializer.data)
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
 
-@api_view(['GET', 'POST'])
-def patient_reports_list(request, patient_id):
+@query_budget(3, methods=['GET'])
+@async_api_view(['GET', 'POST'])
+async def patient_reports_list(request, patient_id):
     """
-    Get all reports for a patient or create a new one.
+    Get all reports for a patient or create a new one (async: the upload
+    awaits storage and analysis instead of blocking a worker).
     
     GET /api/patients/<patient_id>/reports/
-    Returns a list of all reports for the patient.
+    Returns the patient's reports as lean rows (no OCR text, see
+    ReportListSerializer; ?fields= selects a subset). The full text is at
+    each row's analysis_url.
     
     POST /api/patients/<patient_id>/reports/
     Upload a new report for the patient.
     Body: multipart/form-data with 'report_image' file
     """
-    patient = get_object_or_404(Patient, id=patient_id)
+    patient = await aget_object_or_404(Patient, id=patient_id)
     
     if request.method == 'GET':
-        reports = patient.reports.all()
-        serializer = ReportSerializer(reports, many=True)
-        return Response(serializer.data)
+        reports = ReportListSerializer.setup_queryset(patient.reports.all())
+        fields = requested_fields(request, ReportListSerializer)
+        serializer = ReportListValuesSerializer(reports, fields=fields)
+        return Response(await sync_to_async(lambda: serializer.data)())
     
     elif request.method == 'POST':
         # Create report for this patient
@@ -180,49 +258,31 @@ def patient_reports_list(request, patient_id):
                 logger.warning(f"File too large for Azure analysis: {file_size_mb:.2f}MB (max {AZURE_MAX_SIZE_MB}MB)")
             
             serializer = ReportCreateSerializer(data=data)
-            if serializer.is_valid():
+            if await sync_to_async(serializer.is_valid)():
                 logger.info("Serializer valid, attempting to save...")
-                report = serializer.save(analysis_status='pending')
+                # Uploads the file to storage (Cloudinary in production)
+                report = await sync_to_async(serializer.save)(analysis_status='pending')
                 logger.info(f"Report saved successfully with ID: {report.id}")
                 
                 # Trigger analysis using the file data we already read
                 # Only if file is small enough for Azure (4MB limit)
                 if can_analyze:
                     try:
-                        service = get_document_intelligence_service()
-                        if service.is_configured():
-                            report.analysis_status = 'processing'
-                            report.save()
-                            
-                            # Analyze from bytes directly - no Cloudinary URL needed!
-                            result = service.analyze_document_from_bytes(file_data)
-                            
-                            if result['success']:
-                                report.extracted_text = result['extracted_text']
-                                report.key_phrases = result['key_phrases']
-                                report.confidence_score = result['confidence_score']
-                                report.analysis_status = 'completed'
-                                report.error_message = None
-                            else:
-                                report.analysis_status = 'failed'
-                                report.error_message = result.get('error', 'Unknown error')
-                            report.save()
-                        else:
-                            report.analysis_status = 'failed'
-                            report.error_message = "Azure Document Intelligence is not configured"
-                            report.save()
+                        # Analyze from bytes directly - no Cloudinary URL needed!
+                        await _aanalyze_report(report, lambda service: service.aanalyze_document_from_bytes(file_data))
                     except Exception as e:
                         logger.error(f"Error analyzing report {report.id}: {str(e)}")
                         report.analysis_status = 'failed'
                         report.error_message = str(e)
-                        report.save()
+                        await report.asave()
                 else:
                     # File too large for Azure - mark as failed with helpful message
                     report.analysis_status = 'failed'
                     report.error_message = f"File too large for analysis ({file_size_mb:.1f}MB). Maximum size is {AZURE_MAX_SIZE_MB}MB. Please upload a smaller file or compress the PDF."
-                    report.save()
+                    await report.asave()
                 
-                report.refresh_from_db()
+                await report.arefresh_from_db()
+                report.patient = patient  # refresh_from_db drops the cached patient
                 output_serializer = ReportSerializer(report)
                 return Response(output_serializer.data, status=status.HTTP_201_CREATED)
             
@@ -237,6 +297,7 @@ def patient_reports_list(request, patient_id):
             )
 
 
+@query_budget(3)
 @api_view(['GET'])
 def patient_reports_latest(request, patient_id):
     """
@@ -254,6 +315,7 @@ def patient_reports_latest(request, patient_id):
         return Response(None, status=status.HTTP_200_OK)
 
 
+@query_budget(2)
 @api_view(['GET'])
 def report_analysis(request, report_id):
     """
@@ -261,6 +323,6 @@ def report_analysis(request, report_id):
     
     GET /api/reports/<report_id>/analysis/
     """
-    report = get_object_or_404(Report, id=report_id)
+    report = get_object_or_404(Report.objects.select_related('patient'), id=report_id)
     serializer = ReportAnalysisSerializer(report)
     return Response(serializer.data)
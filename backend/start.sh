@@ -1,6 +1,5 @@
 #!/usr/bin/env bash
 # Startup script for Render deployment
-# This ensures migrations and superuser setup run before starting the server
 
 set -e  # Exit on error
 
@@ -14,40 +13,11 @@ echo "Starting Ashwini Backend"
 echo "Current directory: $(pwd)"
 echo "========================================"
 
-# Run migrations
-echo ""
-echo "Running database migrations..."
-
-# Fix for migration conflict: Fake old 0002_initial migrations if they exist in DB history
-echo "Checking for migration conflicts..."
-python manage.py migrate devices 0002_initial --fake 2>/dev/null || echo "devices.0002_initial not in migration history"
-python manage.py migrate measurements 0002_initial --fake 2>/dev/null || echo "measurements.0002_initial not in migration history"
-
-# Now run migrations normally
-python manage.py migrate --no-input
-echo "✓ Migrations completed"
-
-# Create/update superuser
-echo ""
-echo "=== Superuser Configuration ==="
-echo "Username: ${DJANGO_SUPERUSER_USERNAME:-admin}"
-echo "Email: ${DJANGO_SUPERUSER_EMAIL:-admin@ashwini.com}"
-if [ -z "$DJANGO_SUPERUSER_PASSWORD" ]; then
-    echo "Password set: No"
-    echo "⚠️  WARNING: DJANGO_SUPERUSER_PASSWORD not set!"
-else
-    echo "Password set: Yes (${#DJANGO_SUPERUSER_PASSWORD} characters)"
-    python manage.py create_default_superuser
-fi
-echo "========================================"
+# Migrations and the superuser setup are release steps (python manage.py
+# release); gunicorn runs the ones not done yet before forking its workers
+# and logs a boot-time breakdown (see gunicorn.conf.py)
 
+# Workers, worker class (SERVER_MODE) and the rest are set in gunicorn.conf.py
 echo ""
-echo "Starting Gunicorn server on port ${PORT:-8000}..."
-exec gunicorn ashwini_backend.wsgi \
-    --bind 0.0.0.0:${PORT:-8000} \
-    --workers 2 \
-    --timeout 120 \
-    --log-file - \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info
+echo "Starting Gunicorn server (${SERVER_MODE:-wsgi}) on port ${PORT:-8000}..."
+exec gunicorn --config gunicorn.conf.py